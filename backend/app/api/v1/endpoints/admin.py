@@ -14,6 +14,7 @@ from app.config import settings
 from app.core.errors import AuthorizationError
 from app.core.limiter import limiter
 from app.core.logging import get_logger
+from app.services import analysis_cache, scrape_cache
 
 logger = get_logger(__name__)
 router = APIRouter()
@@ -303,3 +304,20 @@ async def get_all_analyses(
         "limit": limit,
         "offset": offset,
     }
+
+
+@router.get("/cache")
+@limiter.limit("30/minute")
+async def get_cache_stats(
+    request: Request,
+    user_id: CurrentUserID,
+    supabase: Supabase,
+):
+    """Get hit/miss statistics of the scrape and analysis caches."""
+    if not await verify_admin(user_id, supabase):
+        raise AuthorizationError("Admin access required")
+
+    return {
+        "scrape": await scrape_cache.get_stats(),
+        "analysis": await analysis_cache.get_stats(),
+    }
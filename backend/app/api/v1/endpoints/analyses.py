@@ -28,6 +28,10 @@ router = APIRouter()
 class CreateAnalysisRequest(BaseModel):
     """Request to create a new analysis."""
     url: str = Field(..., description="URL of the landing page to analyze")
+    batch: bool = Field(
+        False,
+        description="Low priority: analyze through the Message Batches API (cheaper, may take hours)",
+    )
     
     @field_validator("url")
     @classmethod
@@ -84,6 +88,7 @@ class AnalysisResponse(BaseModel):
     created_at: str
     started_at: Optional[str] = None
     completed_at: Optional[str] = None
+    progress: Optional[dict] = None
 
 
 class AnalysisListResponse(BaseModel):
@@ -140,7 +145,7 @@ async def create_analysis(
 
     # Queue the analysis task (graceful if worker not available)
     try:
-        analyze_page_task.delay(analysis["id"])
+        analyze_page_task.apply_async(args=[analysis["id"]], kwargs={"batch": body.batch})
     except Exception as e:
         logger.warning("celery_dispatch_failed", analysis_id=analysis["id"], error=str(e))
     
@@ -183,6 +188,7 @@ async def list_analyses(
                 created_at=a["created_at"],
                 started_at=a.get("started_at"),
                 completed_at=a.get("completed_at"),
+                progress=a.get("progress"),
             )
             for a in analyses
         ],
@@ -220,5 +226,6 @@ async def get_analysis(
             created_at=analysis["created_at"],
             started_at=analysis.get("started_at"),
             completed_at=analysis.get("completed_at"),
+            progress=analysis.get("progress"),
         )
     )
@@ -51,9 +51,71 @@ class Settings(BaseSettings):
     # Anthropic
     ANTHROPIC_API_KEY: str = ""
     ANTHROPIC_MODEL: str = "claude-sonnet-4-20250514"
+    ANTHROPIC_TIMEOUT: float = 120.0  # Seconds, further limited by the task deadline
+    ANTHROPIC_BASE_URL: str = ""  # Override the API endpoint (e.g. a local stand-in)
+    ANTHROPIC_MAX_CONNECTIONS: int = 10  # Pooled connections per worker loop
+    ANALYSIS_INPUT_TOKEN_BUDGET: int = 2500  # Tokens for the page prompt (system prompt excluded)
+    ANALYSIS_MAX_TOKENS_MIN: int = 2000  # Bounds for the max_tokens sized from expected issues
+    ANALYSIS_MAX_TOKENS_MAX: int = 8000
+    ANALYSIS_TOOL_OUTPUT: bool = True  # Return the report as a forced tool call instead of JSON text
+    ANALYSIS_MIN_CATEGORIES: int = 4  # Complete categories a truncated report needs to be used
+    ANALYSIS_CACHE_ENABLED: bool = True
+    ANALYSIS_CACHE_TTL: int = 24 * 3600  # Seconds a cached analysis may be reused
+    ANALYSIS_BATCH_ENABLED: bool = True  # Send low-priority analyses through Message Batches
+    ANALYSIS_BATCH_MAX_REQUESTS: int = 1000  # Requests per submitted batch
+    ANALYSIS_BATCH_SUBMIT_INTERVAL: int = 60  # Seconds between batch submissions
+    ANALYSIS_BATCH_POLL_INTERVAL: int = 60  # Seconds between checks for ended batches
+    ANALYSIS_BATCH_CLAIM_TTL: int = 120  # Seconds a poll holds an ended batch, renewed per result
+
+    # Task deadline: stages share what is left of the Celery soft time limit
+    TASK_DEADLINE_MARGIN: float = 10.0          # Seconds kept free before the soft limit
+    DEADLINE_ANALYSIS_RESERVE: float = 60.0     # Held back from scraping for the LLM and saving
+    DEADLINE_PERSIST_RESERVE: float = 10.0      # Held back from the LLM for saving the report
+    DEADLINE_SCREENSHOT_MIN: float = 15.0       # Skip screenshots with less time than this left
+    DEADLINE_SHORT_PROMPT_BELOW: float = 45.0   # Shorten the prompt below this LLM budget
     
     # Playwright
     PLAYWRIGHT_TIMEOUT: int = 30000
+    BROWSER_POOL_SIZE: int = 1        # Warm browsers per worker process
+    BROWSER_MAX_PAGES: int = 50       # Recycle a browser after N contexts
+    BROWSER_MAX_RSS_MB: int = 1024    # Recycle a browser above this RSS (0 = off)
+
+    # Scraping
+    SCRAPER_MODE: str = "fast"  # "fast" blocks trackers/media/fonts, "full" loads everything
+    SCRAPER_BLOCKED_RESOURCE_TYPES: List[str] = ["media", "font"]
+    SCRAPER_EXTRA_BLOCKED_DOMAINS: List[str] = []
+    SCRAPER_PREFLIGHT_ENABLED: bool = True   # HTTP probe before launching a browser
+    SCRAPER_PREFLIGHT_TIMEOUT: float = 10.0
+    SCRAPER_PREFLIGHT_MAX_BYTES: int = 5_000_000  # Max HTML body read by the preflight
+    SCRAPER_STATIC_ENABLED: bool = True      # Skip the browser for server-rendered pages
+    SCRAPER_STATIC_MIN_WORDS: int = 150      # Visible words needed to trust the static HTML
+    SCRAPER_DOMAIN_MAX_CONCURRENCY: int = 2     # Concurrent scrapes per registrable domain
+    SCRAPER_DOMAIN_MIN_INTERVAL_MS: int = 2000  # Spacing between scrapes of one domain
+    SCRAPER_DOMAIN_MAX_WAIT: int = 30           # Seconds to wait in-task before requeueing
+    SCRAPER_DOMAIN_MAX_REQUEUES: int = 10
+    SCRAPER_DOMAIN_RETRY_AFTER: int = 30        # Seconds before a scrape requeued off a busy domain retries
+    SCRAPER_DOMAIN_LEASE_TTL: int = 240         # Seconds before a crashed worker's slot frees
+    SCRAPE_CACHE_ENABLED: bool = True
+    SCRAPE_CACHE_TTL: int = 6 * 3600           # Seconds a cached scrape may be reused
+    SCRAPER_CAPTURE_MOBILE: bool = True      # Render a phone viewport alongside desktop
+    SCRAPER_BATCH_CONCURRENCY: int = 4       # Pages rendered at once by scrape_many()
+    SCRAPER_READINESS_STRATEGY: str = "adaptive"  # "adaptive" or "networkidle"
+    SCRAPER_LOAD_BUDGET_MS: int = 10000      # Max wait for the load event after DOMContentLoaded
+    SCRAPER_NETWORK_QUIET_MS: int = 500      # Quiet network window required
+    SCRAPER_NETWORK_BUDGET_MS: int = 5000    # Max wait for the quiet window
+    SCRAPER_DOM_SETTLE_MS: int = 500         # Mutation-free window required
+    SCRAPER_DOM_SETTLE_BUDGET_MS: int = 3000 # Max wait for the DOM to settle
+
+    # Screenshots
+    SCREENSHOT_FORMAT: str = "jpeg"         # png | jpeg | webp
+    SCREENSHOT_QUALITY: int = 75            # jpeg/webp quality
+    SCREENSHOT_MAX_HEIGHT: int = 8000       # Full-page capture is clipped beyond this (px)
+    SCREENSHOT_DOWNSCALE_WIDTH: int = 0     # Resize full-page capture to this width (0 = off)
+    SCREENSHOT_FOLD_WIDTH: int = 640        # Above-the-fold thumbnail width (0 = off)
+
+    # Scrape artifacts (HTML, text, screenshots) held by a running task
+    ARTIFACT_SPILL_BYTES: int = 256 * 1024  # Larger values are moved to temp files
+    ARTIFACT_DIR: str = ""                  # Temp directory (empty = system default)
     
     # Monitoring
     SENTRY_DSN: str = ""
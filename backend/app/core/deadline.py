@@ -0,0 +1,112 @@
+"""
+End-to-end deadlines.
+
+An analysis has one overall time limit (the Celery soft limit), but each
+stage used to pick its own timeout. A Deadline is created when the task
+starts and each stage runs inside ``deadline.stage(...)``, which activates a
+child deadline holding the stage's share of the remaining time. Code deep
+in the pipeline asks ``remaining_budget(cap)`` for the time it may spend, so
+timeouts shrink as the task runs late and stages can degrade early.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Never hand out a zero budget: Playwright reads timeout=0 as "no timeout"
+MIN_BUDGET_S = 0.1
+
+_current: ContextVar[Optional["Deadline"]] = ContextVar("deadline", default=None)
+
+
+class Deadline:
+    """A point in time by which some work must be finished."""
+
+    def __init__(self, seconds: float, name: str = "task"):
+        self.name = name
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    @property
+    def remaining(self) -> float:
+        """Seconds left, never negative."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining <= 0
+
+    def budget(self, cap: Optional[float] = None, reserve: float = 0.0) -> float:
+        """Time available now, keeping reserve seconds back for later stages."""
+        available = self.remaining - reserve
+        if cap is not None:
+            available = min(available, cap)
+        return max(MIN_BUDGET_S, available)
+
+    @contextmanager
+    def activate(self) -> Iterator["Deadline"]:
+        """Make this the deadline returned by current_deadline()."""
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    @contextmanager
+    def stage(
+        self,
+        name: str,
+        cap: Optional[float] = None,
+        reserve: float = 0.0,
+    ) -> Iterator["Deadline"]:
+        """
+        Run a stage of the work within its share of the remaining time.
+
+        Args:
+            name: Stage name for logging
+            cap: Most seconds the stage may take
+            reserve: Seconds kept back for the stages after this one
+
+        Yields:
+            The stage's own Deadline, active for the duration of the block
+        """
+        child = Deadline(self.budget(cap, reserve), name=name)
+        start = time.monotonic()
+        try:
+            with child.activate():
+                yield child
+        finally:
+            elapsed = time.monotonic() - start
+            logger.info(
+                "deadline_stage",
+                deadline=self.name,
+                stage=name,
+                budget_s=round(child.seconds, 1),
+                elapsed_s=round(elapsed, 1),
+                remaining_s=round(self.remaining, 1),
+                overran=elapsed > child.seconds,
+            )
+
+
+def current_deadline() -> Optional[Deadline]:
+    """The innermost active deadline, if any."""
+    return _current.get()
+
+
+def remaining_budget(cap: float, reserve: float = 0.0) -> float:
+    """
+    Seconds an operation may take: cap, shortened by the active deadline.
+
+    Args:
+        cap: The operation's own timeout
+        reserve: Seconds of the active deadline to leave unused
+    """
+    deadline = _current.get()
+    if deadline is None:
+        return cap
+    return deadline.budget(cap, reserve)
@@ -0,0 +1,48 @@
+"""
+Shared async Anthropic client.
+
+One AsyncAnthropic per event loop keeps a pool of warm HTTP connections to
+the API, so concurrent analyses on a worker loop reuse connections instead of
+each blocking a thread on its own request. Like the Redis client, it is bound
+to the loop that created it and rebuilt if requested from another loop.
+"""
+
+import asyncio
+from typing import Optional
+
+import anthropic
+import httpx
+
+from app.config import settings
+
+_client: Optional[anthropic.AsyncAnthropic] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_anthropic() -> anthropic.AsyncAnthropic:
+    """Get the Anthropic client for the running event loop."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        _client = anthropic.AsyncAnthropic(
+            api_key=settings.ANTHROPIC_API_KEY,
+            base_url=settings.ANTHROPIC_BASE_URL or None,
+            timeout=settings.ANTHROPIC_TIMEOUT,
+            http_client=anthropic.DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=settings.ANTHROPIC_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.ANTHROPIC_MAX_CONNECTIONS,
+                ),
+            ),
+        )
+        _client_loop = loop
+    return _client
+
+
+async def close_anthropic() -> None:
+    """Close the shared Anthropic client."""
+    global _client, _client_loop
+    if _client is not None:
+        await _client.close()
+        _client = None
+        _client_loop = None
@@ -0,0 +1,36 @@
+"""
+Shared async Redis client.
+
+Used for state shared across API processes and Celery workers (caches,
+per-domain scheduling). The client is bound to the event loop that created it
+and is rebuilt if requested from another loop.
+"""
+
+import asyncio
+from typing import Optional
+
+from redis.asyncio import Redis
+
+from app.config import settings
+
+_redis: Optional[Redis] = None
+_redis_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_redis() -> Redis:
+    """Get the Redis client for the running event loop."""
+    global _redis, _redis_loop
+    loop = asyncio.get_running_loop()
+    if _redis is None or _redis_loop is not loop:
+        _redis = Redis.from_url(settings.REDIS_URL)
+        _redis_loop = loop
+    return _redis
+
+
+async def close_redis() -> None:
+    """Close the shared Redis client."""
+    global _redis, _redis_loop
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+        _redis_loop = None
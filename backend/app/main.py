@@ -53,6 +53,12 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning("auth_client_close_failed", error=str(e))
 
+    try:
+        from app.core.redis import close_redis
+        await close_redis()
+    except Exception as e:
+        logger.warning("redis_close_failed", error=str(e))
+
     logger.info("application_stopped")
 
 
@@ -0,0 +1,206 @@
+"""
+Message Batches backend for the analyzer.
+
+Bulk runs and scheduled re-checks do not need an answer within seconds. Their
+prompts are queued in Redis, and a beat task submits whatever is queued as one
+message batch. That is billed at half price and does not compete with
+interactive analyses for the rate limit. Another beat task polls the
+submitted batches and hands back the results once a batch has ended.
+"""
+
+import dataclasses
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import anthropic
+import httpx
+
+from app.config import settings
+from app.core.errors import AnalysisError
+from app.core.llm import get_anthropic
+from app.core.logging import get_logger
+from app.core.redis import get_redis
+
+logger = get_logger(__name__)
+
+QUEUE_KEY = "analysis_batches:queue"
+ACTIVE_KEY = "analysis_batches:active"  # batch ID -> submission time
+ITEMS_KEY = "analysis_batches:items:{batch_id}"  # analysis ID -> BatchItem, until finished
+CLAIM_KEY = "analysis_batches:claim:{batch_id}"  # Held while a poll reads the results
+
+# Client errors worth retrying as they are: timeout, conflict, rate limit
+RETRYABLE_STATUSES = frozenset({408, 409, 429})
+
+
+@dataclass
+class BatchItem:
+    """A queued analysis, with what is needed to finish it when its result arrives."""
+    analysis_id: str
+    user_id: str
+    url: str
+    params: Dict[str, Any]
+    cache_key: str
+    page_metadata: Dict[str, Any] = field(default_factory=dict)
+    screenshot_url: Optional[str] = None
+    budget: Dict[str, Any] = field(default_factory=dict)
+    queued_at: float = field(default_factory=time.time)
+
+
+class BatchRejectedError(AnalysisError):
+    """The API refused the batch itself; resubmitting its analyses unchanged would fail again."""
+    def __init__(self, items: List[BatchItem], error: str):
+        super().__init__(f"Batch request rejected: {error}")
+        self.items = items
+
+
+@dataclass
+class BatchOutcome:
+    """The result of one batched analysis: a Message, or why there is none."""
+    item: BatchItem
+    message: Optional[Any] = None
+    error: Optional[str] = None
+
+
+async def enqueue(item: BatchItem) -> None:
+    """Queue an analysis for the next batch."""
+    await get_redis().rpush(QUEUE_KEY, json.dumps(dataclasses.asdict(item)))
+    logger.info("analysis_batch_queued", analysis_id=item.analysis_id)
+
+
+async def submit_pending(
+    client: Optional[anthropic.AsyncAnthropic] = None,
+    limit: Optional[int] = None,
+) -> Optional[str]:
+    """
+    Submit queued analyses as one message batch.
+
+    Args:
+        client: Anthropic client (defaults to the shared one)
+        limit: Most requests to submit (defaults to ANALYSIS_BATCH_MAX_REQUESTS)
+
+    Returns:
+        The batch ID, or None if nothing was queued
+
+    Raises:
+        BatchRejectedError: If the API rejected the batch (a 4xx other than
+            RETRYABLE_STATUSES); its analyses are not requeued
+        anthropic.APIError: If the batch could not be created for another
+            reason; the analyses are put back at the head of the queue
+    """
+    redis = get_redis()
+    raw = await redis.lpop(QUEUE_KEY, limit or settings.ANALYSIS_BATCH_MAX_REQUESTS)
+    if not raw:
+        return None
+
+    # custom_id must be unique in a batch; a re-queued analysis keeps its latest prompt
+    items = {}
+    for entry in raw:
+        item = BatchItem(**json.loads(entry))
+        items[item.analysis_id] = item
+
+    client = client or get_anthropic()
+    try:
+        batch = await client.messages.batches.create(
+            requests=[
+                {"custom_id": item.analysis_id, "params": item.params}
+                for item in items.values()
+            ],
+        )
+    except anthropic.APIStatusError as e:
+        if e.status_code < 500 and e.status_code not in RETRYABLE_STATUSES:
+            logger.error("analysis_batch_rejected", requests=len(items), status=e.status_code, error=str(e))
+            raise BatchRejectedError(list(items.values()), str(e)) from e
+        await redis.lpush(QUEUE_KEY, *reversed(raw))
+        raise
+    except Exception:
+        # Connection failures, timeouts and anything unexpected: retry next run
+        await redis.lpush(QUEUE_KEY, *reversed(raw))
+        raise
+
+    # The prompts are not needed again once submitted
+    pending = {
+        analysis_id: json.dumps(dataclasses.asdict(dataclasses.replace(item, params={})))
+        for analysis_id, item in items.items()
+    }
+    await redis.hset(ITEMS_KEY.format(batch_id=batch.id), mapping=pending)
+    await redis.hset(ACTIVE_KEY, batch.id, json.dumps({"submitted_at": time.time()}))
+    logger.info("analysis_batch_submitted", batch_id=batch.id, requests=len(items))
+    return batch.id
+
+
+async def collect_results(
+    client: Optional[anthropic.AsyncAnthropic] = None,
+) -> AsyncIterator[BatchOutcome]:
+    """
+    Yield the outcome of every unfinished analysis in submitted batches that have ended.
+
+    Batches still processing are left for the next poll. An ended batch is
+    claimed with a short-lived lock, so overlapping polls do not both report
+    it. Each analysis is removed from the batch once the caller has handled
+    its outcome (when it asks for the next one), and the batch is dropped
+    once none are left. If reading the results fails, or the worker stops,
+    the analyses not yet handled are picked up by a later poll.
+    """
+    redis = get_redis()
+    client = client or get_anthropic()
+    ttl = settings.ANALYSIS_BATCH_CLAIM_TTL
+
+    for batch_id, raw in (await redis.hgetall(ACTIVE_KEY)).items():
+        batch_id = batch_id.decode()
+        try:
+            batch = await client.messages.batches.retrieve(batch_id)
+        except anthropic.APIError as e:
+            logger.warning("analysis_batch_poll_failed", batch_id=batch_id, error=str(e))
+            continue
+        if batch.processing_status != "ended":
+            continue
+        claim_key = CLAIM_KEY.format(batch_id=batch_id)
+        if not await redis.set(claim_key, "1", nx=True, ex=ttl):
+            continue
+
+        items_key = ITEMS_KEY.format(batch_id=batch_id)
+        try:
+            items = {
+                analysis_id.decode(): BatchItem(**json.loads(data))
+                for analysis_id, data in (await redis.hgetall(items_key)).items()
+            }
+            logger.info(
+                "analysis_batch_ended",
+                batch_id=batch_id,
+                requests=len(items),
+                duration_s=round(time.time() - json.loads(raw)["submitted_at"]),
+            )
+            async for outcome in _outcomes(client, batch_id, items):
+                yield outcome
+                await redis.hdel(items_key, outcome.item.analysis_id)
+                await redis.expire(claim_key, ttl)
+            if not await redis.hlen(items_key):
+                await redis.hdel(ACTIVE_KEY, batch_id)
+        except (anthropic.APIError, httpx.HTTPError) as e:
+            logger.warning("analysis_batch_results_failed", batch_id=batch_id, error=str(e))
+        finally:
+            await redis.delete(claim_key)
+
+
+async def _outcomes(
+    client: anthropic.AsyncAnthropic,
+    batch_id: str,
+    items: Dict[str, BatchItem],
+) -> AsyncIterator[BatchOutcome]:
+    """The outcomes of the given analyses in an ended batch; others are skipped."""
+    items = dict(items)
+    async for entry in await client.messages.batches.results(batch_id):
+        item = items.pop(entry.custom_id, None)
+        if item is None:
+            continue
+        if entry.result.type == "succeeded":
+            yield BatchOutcome(item, message=entry.result.message)
+        elif entry.result.type == "errored":
+            yield BatchOutcome(item, error=entry.result.error.error.message)
+        else:
+            yield BatchOutcome(item, error=f"request {entry.result.type}")
+
+    for item in items.values():
+        yield BatchOutcome(item, error="missing from the batch results")
@@ -0,0 +1,75 @@
+"""
+Analysis result cache.
+
+Stores parsed Claude analyses in Redis keyed by a hash of everything the
+prompt is built from (model, prompt version, page text and structure, key
+stats), so a page that has not changed is not paid for twice. Changing
+PROMPT_VERSION in the analyzer invalidates every entry.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+from app.config import settings
+from app.core.logging import get_logger
+from app.core.redis import get_redis
+
+logger = get_logger(__name__)
+
+KEY_PREFIX = "analysis_cache:"
+STATS_KEY = "analysis_cache:stats"
+
+
+def cache_key(inputs: Dict[str, Any]) -> str:
+    """Redis key for a set of prompt inputs (any JSON-serializable mapping)."""
+    canonical = json.dumps(inputs, sort_keys=True, separators=(",", ":"), default=str)
+    return f"{KEY_PREFIX}{hashlib.sha256(canonical.encode()).hexdigest()}"
+
+
+async def load(key: str) -> Optional[Dict[str, Any]]:
+    """Load a cached analysis result, or None if missing or unreadable."""
+    try:
+        raw = await get_redis().get(key)
+        return json.loads(raw) if raw else None
+    except Exception as e:
+        logger.warning("analysis_cache_load_failed", error=str(e))
+        return None
+
+
+async def store(key: str, result: Dict[str, Any]) -> None:
+    """Store an analysis result for ANALYSIS_CACHE_TTL seconds."""
+    try:
+        await get_redis().set(key, json.dumps(result), ex=settings.ANALYSIS_CACHE_TTL)
+    except Exception as e:
+        logger.warning("analysis_cache_store_failed", error=str(e))
+
+
+async def record_hit(tokens_saved: int) -> None:
+    """Count a cache hit and the tokens it saved."""
+    try:
+        redis = get_redis()
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.hincrby(STATS_KEY, "hits", 1)
+            pipe.hincrby(STATS_KEY, "tokens_saved", tokens_saved)
+            await pipe.execute()
+    except Exception as e:
+        logger.warning("analysis_cache_stats_failed", error=str(e))
+
+
+async def record_miss() -> None:
+    """Count a cache miss."""
+    try:
+        await get_redis().hincrby(STATS_KEY, "misses", 1)
+    except Exception as e:
+        logger.warning("analysis_cache_stats_failed", error=str(e))
+
+
+async def get_stats() -> Dict[str, Any]:
+    """Hit/miss counters, hit ratio and tokens saved since the stats were reset."""
+    raw = await get_redis().hgetall(STATS_KEY)
+    stats = {key.decode(): int(value) for key, value in raw.items()}
+    hits = stats.get("hits", 0)
+    misses = stats.get("misses", 0)
+    stats["hit_ratio"] = round(hits / (hits + misses), 3) if hits + misses else 0.0
+    return stats
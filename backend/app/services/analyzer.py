@@ -3,24 +3,34 @@ Analyzer service using Claude API.
 Analyzes landing pages for conversion optimization issues.
 """
 
+import asyncio
 import json
 import re
-from typing import Any, Dict, List
+from dataclasses import dataclass, field, replace
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
 
 import anthropic
+from pydantic import ValidationError
 
 from app.config import settings
+from app.core.deadline import remaining_budget
 from app.core.errors import AnalysisError
+from app.core.llm import get_anthropic
 from app.core.logging import get_logger
+from app.schemas.analysis import analysis_result_adapter, category_adapter
+from app.services import analysis_cache, prompt_budget, rules
+from app.services.artifacts import read_text
+from app.services.page_performance import rate
+from app.services.scrape_cache import normalize_url
 from app.services.scraper import ScrapedPage, summarize_html
 
 logger = get_logger(__name__)
 
-# Initialize Anthropic client
-client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+# Bump whenever the prompts or the response format change: cached analyses
+# made with an older prompt are then no longer reused
+PROMPT_VERSION = "4"
 
-# Analysis system prompt
-SYSTEM_PROMPT = """You are an expert in Conversion Rate Optimization (CRO) and UX Design with 15 years of experience.
+_ANALYST_PROMPT = """You are an expert in Conversion Rate Optimization (CRO) and UX Design with 15 years of experience.
 You analyze landing pages to identify issues that drive visitors away and reduce conversions.
 
 For each page, you must evaluate these 8 categories:
@@ -78,7 +88,23 @@ For each issue found, provide:
 - **description**: Detailed explanation of the issue and its impact
 - **recommendation**: Concrete and specific action to take
 
-Respond ONLY with valid JSON using this exact structure (no markdown, no comments):
+"""
+
+_GUIDELINES = """Be precise, actionable, and constructive. Do not invent issues that do not exist.
+
+LANGUAGE RULES:
+- Category names (headline, cta, social_proof, etc.) must ALWAYS be in English (they are JSON keys).
+- The "label" field for each category must ALWAYS be in English.
+- For "summary", "title", "description", and "recommendation" fields:
+  - Detect the primary language of the page content.
+  - Write these fields in the SAME language as the page.
+  - If the page is in French, write in French. If in English, write in English. If in German, write in German.
+  - If the language is unclear or mixed, default to English.
+
+"""
+
+# Analysis system prompt, for a JSON response
+SYSTEM_PROMPT = _ANALYST_PROMPT + """Respond ONLY with valid JSON using this exact structure (no markdown, no comments):
 {
   "score": <number 0-100>,
   "summary": "<string: 2-3 sentences summarizing the analysis>",
@@ -99,18 +125,13 @@ Respond ONLY with valid JSON using this exact structure (no markdown, no comment
   ]
 }
 
-Be precise, actionable, and constructive. Do not invent issues that do not exist.
+""" + _GUIDELINES + """CRITICAL: Your response must be ONLY valid JSON. No markdown, no code blocks, no explanations before or after the JSON. Start with { and end with }."""
 
-LANGUAGE RULES:
-- Category names (headline, cta, social_proof, etc.) must ALWAYS be in English (they are JSON keys).
-- The "label" field for each category must ALWAYS be in English.
-- For "summary", "title", "description", and "recommendation" fields:
-  - Detect the primary language of the page content.
-  - Write these fields in the SAME language as the page.
-  - If the page is in French, write in French. If in English, write in English. If in German, write in German.
-  - If the language is unclear or mixed, default to English.
+# The same, for the report submitted through REPORT_TOOL
+TOOL_SYSTEM_PROMPT = _ANALYST_PROMPT + """Submit the analysis by calling the submit_analysis tool, with one entry in
+"categories" for each of the 8 categories.
 
-CRITICAL: Your response must be ONLY valid JSON. No markdown, no code blocks, no explanations before or after the JSON. Start with { and end with }."""
+""" + _GUIDELINES.rstrip()
 
 USER_PROMPT_TEMPLATE = """Analyze this landing page for conversion issues:
 
@@ -118,84 +139,689 @@ USER_PROMPT_TEMPLATE = """Analyze this landing page for conversion issues:
 **Page title**: {title}
 **Meta description**: {meta_description}
 
-**Load time**: {load_time_ms}ms
 **Word count**: {word_count}
 **Image count**: {image_count}
 **Form present**: {has_form}
+{measurements}
+
+**Automated checks** (verified from the page: use these results as given instead of re-checking them; report each FAIL as an issue in its category and do not mention PASS items):
+{checks}
 
 **Visible text content**:
 {text_content}
 
-**HTML structure (summarized)**:
-{html_summary}
+**Page structure**:
+{page_structure}
+
+{closing}"""
+
+# Last line of the user prompt, matching how the report comes back
+JSON_CLOSING = "Generate your JSON analysis now."
+TOOL_CLOSING = "Submit the analysis with the submit_analysis tool."
+
+MEASUREMENTS_TEMPLATE = """**Load time**: {load_time_ms}ms
+**Measured performance**: {performance}
+**Third-party requests blocked during scan**: {blocked_requests}
+**Mobile rendering**: {mobile}"""
+
+# Static scrapes are analyzed from the server HTML, before or without a render
+STATIC_MEASUREMENTS = (
+    "**Load time, performance and mobile rendering**: Not measured (the page was read from "
+    "its server-rendered HTML without a browser); judge speed and mobile from the HTML alone"
+)
+
+# Categories the system prompt asks for
+CATEGORY_COUNT = 8
+
+# Raw HTML read per character of page structure in the prompt, when the
+# page has no DOM digest
+HTML_READ_FACTOR = 50
+
+# The system prompt is identical on every call, so mark it as a prompt-cache
+# breakpoint: later analyses read it from the cache instead of re-processing it.
+# (Requests whose prefix is below the model's minimum cacheable length are
+# simply not cached.)
+SYSTEM_BLOCKS = [
+    {
+        "type": "text",
+        "text": SYSTEM_PROMPT,
+        "cache_control": {"type": "ephemeral"},
+    },
+]
+TOOL_SYSTEM_BLOCKS = [
+    {
+        "type": "text",
+        "text": TOOL_SYSTEM_PROMPT,
+        "cache_control": {"type": "ephemeral"},
+    },
+]
 
-Generate your JSON analysis now."""
+# The report as a tool whose input is the analysis. With tool_choice forcing
+# the call, the API returns the input already parsed: no prefill and no
+# cleanup of free-form text. Tools come before the system prompt, so the
+# cache breakpoint above covers this definition as well.
+REPORT_TOOL_NAME = "submit_analysis"
+REPORT_TOOL = {
+    "name": REPORT_TOOL_NAME,
+    "description": "Submit the conversion analysis of the landing page.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "score": {"type": "integer", "minimum": 0, "maximum": 100},
+            "summary": {"type": "string", "description": "2-3 sentences summarizing the analysis"},
+            "categories": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "name": {
+                            "type": "string",
+                            "enum": [
+                                "headline", "cta", "social_proof", "form",
+                                "visual_hierarchy", "trust", "mobile", "speed",
+                            ],
+                        },
+                        "label": {"type": "string", "description": "Human-readable label"},
+                        "score": {"type": "integer", "minimum": 0, "maximum": 100},
+                        "issues": {
+                            "type": "array",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "severity": {"type": "string", "enum": ["critical", "warning", "info"]},
+                                    "title": {"type": "string"},
+                                    "description": {"type": "string"},
+                                    "recommendation": {"type": "string"},
+                                },
+                                "required": ["severity", "title", "description", "recommendation"],
+                            },
+                        },
+                    },
+                    "required": ["name", "label", "score", "issues"],
+                },
+            },
+        },
+        "required": ["score", "summary", "categories"],
+    },
+}
 
 
-async def analyze_page(scraped: ScrapedPage) -> Dict[str, Any]:
+def format_blocked_requests(blocked: Dict[str, Any]) -> str:
     """
-    Analyze a scraped page using Claude API.
-    
-    Args:
-        scraped: The scraped page data
-        
-    Returns:
-        Analysis result with score, summary, and categories
-        
-    Raises:
-        AnalysisError: If analysis fails
+    Describe requests blocked by the fast scrape mode for the prompt.
+
+    The measured load time excludes these requests, so the model is told what
+    the real page would also have loaded.
     """
-    logger.info("analysis_started", url=scraped.url)
-    
-    # Prepare the prompt (reduced lengths for faster processing)
-    html_summary = summarize_html(scraped.html, max_length=2000)
-    text_content = scraped.text_content[:2000] if scraped.text_content else ""
-    
-    user_prompt = USER_PROMPT_TEMPLATE.format(
+    if not blocked or not blocked.get("total"):
+        return "None"
+
+    categories = ", ".join(
+        f"{count} {category}"
+        for category, count in sorted(blocked.get("by_category", {}).items())
+    )
+    text = f"{blocked['total']} ({categories}); load time excludes them"
+    if blocked.get("top_domains"):
+        text += f". Domains: {', '.join(blocked['top_domains'][:5])}"
+    return text
+
+
+def format_mobile_stats(mobile: Optional[Dict[str, Any]]) -> str:
+    """Describe the emulated phone rendering so the mobile category is measured, not guessed."""
+    if not mobile:
+        return "Not captured"
+
+    parts = [
+        f"{mobile['viewportWidth']}px viewport",
+        f"viewport meta tag {'present' if mobile['hasViewportMeta'] else 'MISSING'}",
+        (
+            f"horizontal scrolling ({mobile['scrollWidth']}px wide)"
+            if mobile["horizontalScroll"]
+            else "no horizontal scrolling"
+        ),
+        f"{mobile['smallTapTargets']} of {mobile['tapTargets']} tap targets under 44px",
+        f"{mobile['smallTextElements']} of {mobile['textElements']} text elements under 12px",
+    ]
+    if mobile.get("loadTimeMs"):
+        parts.append(f"load time {mobile['loadTimeMs']}ms")
+    return "; ".join(parts)
+
+
+def format_performance(performance: Dict[str, Any]) -> str:
+    """Describe the in-browser speed metrics so the speed category is measured, not guessed."""
+    if not performance:
+        return "Not measured"
+
+    parts = []
+    for label, key, unit in (
+        ("TTFB", "ttfb_ms", "ms"),
+        ("LCP", "lcp_ms", "ms"),
+        ("CLS", "cls", ""),
+        ("Total blocking time", "tbt_ms", "ms"),
+    ):
+        value = performance.get(key)
+        if value is None:
+            continue
+        rating = rate(key, value)
+        parts.append(f"{label} {value}{unit}" + (f" ({rating})" if rating else ""))
+
+    transfer_kb = round(performance.get("transfer_bytes", 0) / 1024)
+    parts.append(f"{performance.get('request_count', 0)} requests, {transfer_kb} KB transferred")
+
+    by_type = sorted(
+        performance.get("bytes_by_type", {}).items(), key=lambda item: item[1], reverse=True
+    )
+    heaviest = [f"{kind} {round(size / 1024)} KB" for kind, size in by_type[:3] if size]
+    if heaviest:
+        parts.append("heaviest: " + ", ".join(heaviest))
+    return "; ".join(parts)
+
+
+def _fold_marker(item: Dict[str, Any]) -> str:
+    return " [above fold]" if item.get("fold") else ""
+
+
+def format_dom_digest(digest: Dict[str, Any]) -> str:
+    """Render the structured DOM digest as a compact outline for the prompt."""
+    lines = []
+
+    headings = digest.get("headings") or []
+    if headings:
+        lines.append("Headings:")
+        lines.extend(
+            f"{'  ' * (h['level'] - 1)}- H{h['level']}: {h['text']}{_fold_marker(h)}"
+            for h in headings
+        )
+
+    ctas = digest.get("ctas") or []
+    if ctas:
+        lines.append("Buttons and CTA links:")
+        lines.extend(
+            f"- \"{cta['text']}\"" + (f" -> {cta['href']}" if cta.get("href") else "") + _fold_marker(cta)
+            for cta in ctas
+        )
+    else:
+        lines.append("Buttons and CTA links: none found")
+
+    forms = digest.get("forms") or []
+    for index, form in enumerate(forms, 1):
+        fields = ", ".join(
+            (field["label"] or field["type"]) + (" (required)" if field.get("required") else "")
+            for field in form.get("fields", [])
+        )
+        submit = f"; submit \"{form['submit']}\"" if form.get("submit") else ""
+        lines.append(f"Form {index}{_fold_marker(form)}: {fields or 'no fields'}{submit}")
+
+    testimonials = digest.get("testimonials") or []
+    if testimonials:
+        lines.append("Testimonial candidates:")
+        lines.extend(f"- {quote}" for quote in testimonials)
+    if digest.get("logoCount"):
+        names = ", ".join(digest.get("logoNames") or [])
+        lines.append(f"Logo images: {digest['logoCount']}" + (f" ({names})" if names else ""))
+
+    styles = digest.get("styles") or {}
+    for key, label in (("h1", "H1"), ("primaryCta", "Primary CTA"), ("bodyText", "Body text")):
+        style = styles.get(key)
+        if style:
+            lines.append(
+                f"{label} style: {style['fontSize']}px, weight {style['fontWeight']}, "
+                f"contrast {style['contrast']}:1"
+            )
+
+    return "\n".join(lines)
+
+
+class CategoryStreamParser:
+    """
+    Pick complete category objects out of a streamed analysis response.
+
+    The response is fed in as it arrives. Only the JSON nesting depth and
+    string state are tracked, and each character is read once. When a
+    category object in the top-level "categories" array closes, it is
+    parsed and returned from feed().
+    """
+
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string: List[str] = []
+        self._last_key: Optional[str] = None
+        self._in_categories = False
+        self._capture: Optional[List[str]] = None
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Consume the next chunk of the response.
+
+        Returns:
+            Cleaned categories completed by this chunk, in order
+        """
+        completed = []
+        for ch in text:
+            if self._capture is not None:
+                self._capture.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_key = "".join(self._string)
+                elif self._depth == 1:
+                    self._string.append(ch)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string = []
+            elif ch == "{" or ch == "[":
+                if ch == "{" and self._in_categories and self._depth == 2 and self._capture is None:
+                    self._capture = [ch]
+                elif ch == "[" and self._depth == 1 and self._last_key == "categories":
+                    self._in_categories = True
+                self._depth += 1
+            elif ch == "}" or ch == "]":
+                self._depth -= 1
+                if self._capture is not None and self._depth == 2:
+                    category = self._parse("".join(self._capture))
+                    self._capture = None
+                    if category is not None:
+                        completed.append(category)
+                elif ch == "]" and self._depth == 1:
+                    self._in_categories = False
+        return completed
+
+    @staticmethod
+    def _parse(text: str) -> Optional[Dict[str, Any]]:
+        try:
+            category = json.loads(text)
+            if not isinstance(category, dict):
+                return None
+            return _clean_category(category)
+        except (ValueError, TypeError, AttributeError):
+            # The final parse has more fallbacks; just leave it out of progress
+            return None
+
+
+async def _stream_message(request: Dict[str, Any], parser: CategoryStreamParser, on_category):
+    """Stream a Messages API request, passing each completed category to on_category."""
+    async with get_anthropic().messages.stream(**request) as stream:
+        async for event in stream:
+            # Report text in JSON mode, the tool input as it is written in tool mode
+            if event.type == "text":
+                chunk = event.text
+            elif event.type == "input_json":
+                chunk = event.partial_json
+            else:
+                continue
+            for category in parser.feed(chunk):
+                if on_category is not None:
+                    await on_category(category)
+        return await stream.get_final_message()
+
+
+def _cache_inputs(
+    scraped: ScrapedPage,
+    text_content: str,
+    page_structure: str,
+    input_budget: int,
+) -> Dict[str, Any]:
+    """
+    What an analysis depends on, for the analysis cache key.
+
+    Timings vary between scrapes of an unchanged page, so only their
+    ratings and whole seconds of load time are included.
+    """
+    mobile = dict(scraped.mobile or {})
+    mobile.pop("loadTimeMs", None)
+    return {
+        "model": settings.ANTHROPIC_MODEL,
+        "prompt_version": PROMPT_VERSION,
+        "input_budget": input_budget,
+        "url": normalize_url(scraped.url),
+        "title": scraped.title,
+        "meta_description": scraped.meta_description,
+        "text": " ".join(text_content.split()),
+        "page_structure": page_structure,
+        "word_count": scraped.word_count,
+        "image_count": scraped.image_count,
+        "has_form": scraped.has_form,
+        "load_time_s": round((scraped.load_time_ms or 0) / 1000),
+        "performance": {
+            key: rate(key, value) for key, value in (scraped.performance or {}).items()
+            if rate(key, value) is not None
+        },
+        "mobile": mobile,
+        "blocked_requests": (scraped.blocked_requests or {}).get("by_category"),
+    }
+
+
+@dataclass
+class AnalysisRequest:
+    """A prepared analysis: the Messages API parameters and the result cache key."""
+    url: str
+    params: Dict[str, Any]
+    cache_key: str
+    budget: Dict[str, Any] = field(default_factory=dict)  # Token allocation, for tuning
+    checks: Optional[rules.RuleReport] = None
+
+    @property
+    def tool_output(self) -> bool:
+        """Whether the report comes back as a REPORT_TOOL call rather than JSON text."""
+        return "tool_choice" in self.params
+
+
+def _format_user_prompt(
+    scraped: ScrapedPage,
+    checks: rules.RuleReport,
+    text_content: str,
+    page_structure: str,
+) -> str:
+    return USER_PROMPT_TEMPLATE.format(
+        checks=checks.to_prompt(),
         url=scraped.url,
         title=scraped.title or "Not defined",
         meta_description=scraped.meta_description or "Not defined",
-        load_time_ms=scraped.load_time_ms,
         word_count=scraped.word_count,
         image_count=scraped.image_count,
         has_form="Yes" if scraped.has_form else "No",
+        measurements=format_measurements(scraped),
         text_content=text_content,
-        html_summary=html_summary,
+        page_structure=page_structure,
+        closing=TOOL_CLOSING if settings.ANALYSIS_TOOL_OUTPUT else JSON_CLOSING,
     )
-    
-    try:
-        # Call Claude API with prefill to force clean JSON output
-        message = client.messages.create(
-            model=settings.ANTHROPIC_MODEL,
-            max_tokens=3000,
-            system=SYSTEM_PROMPT,
-            messages=[
+
+
+def format_measurements(scraped: ScrapedPage) -> str:
+    """The browser measurements for the prompt, or a note that there are none."""
+    if scraped.engine == "static":
+        return STATIC_MEASUREMENTS
+    return MEASUREMENTS_TEMPLATE.format(
+        load_time_ms=scraped.load_time_ms,
+        performance=format_performance(scraped.performance),
+        blocked_requests=format_blocked_requests(scraped.blocked_requests),
+        mobile=format_mobile_stats(scraped.mobile),
+    )
+
+
+def _analysis_view(scraped: ScrapedPage) -> ScrapedPage:
+    """
+    The page as the analysis sees it.
+
+    A static scrape gets its load time, performance and mobile rendering
+    from capture_deferred(), which runs alongside the analysis (and before
+    it for batched ones). Leaving them out entirely keeps the prompt, checks
+    and cache key the same whichever finished first.
+    """
+    if scraped.engine != "static":
+        return scraped
+    return replace(scraped, load_time_ms=None, performance={}, mobile=None, blocked_requests={})
+
+
+def _problem_signals(scraped: ScrapedPage) -> List[bool]:
+    """Problems already measured on the page, each likely to become an issue."""
+    mobile = scraped.mobile or {}
+    ratings = [rate(key, value) for key, value in (scraped.performance or {}).items()]
+    return [
+        not scraped.title,
+        not scraped.meta_description,
+        (scraped.load_time_ms or 0) > 3000,
+        bool(mobile.get("horizontalScroll")),
+        bool(mobile) and not mobile.get("hasViewportMeta"),
+        bool(mobile.get("smallTapTargets")),
+        bool(mobile.get("smallTextElements")),
+    ] + [rating in ("needs improvement", "poor") for rating in ratings]
+
+
+def prepare_request(scraped: ScrapedPage, input_budget: Optional[int] = None) -> AnalysisRequest:
+    """
+    Build the analysis prompt for a scraped page.
+
+    The deterministic checks are run first and their results included. The
+    page structure and text share what the budget leaves after the
+    fixed metadata, by token estimate rather than character count.
+    max_tokens is sized from the number of issues the page is likely to have.
+
+    Args:
+        scraped: The scraped page data
+        input_budget: Tokens for the user prompt (defaults to ANALYSIS_INPUT_TOKEN_BUDGET)
+
+    Returns:
+        The request, ready for the Messages API or a message batch
+    """
+    scraped = _analysis_view(scraped)
+    checks = rules.evaluate(scraped)
+    budget = input_budget or settings.ANALYSIS_INPUT_TOKEN_BUDGET
+    fixed_prompt = _format_user_prompt(scraped, checks, "", "")
+    variable_budget = max(0, budget - prompt_budget.estimate_tokens(fixed_prompt))
+
+    # Never read more of a huge page than any allocation could use
+    char_cap = budget * 8
+    if scraped.dom_digest:
+        page_structure = format_dom_digest(scraped.dom_digest)
+    else:
+        # Scripts and styles are dropped, so read well past the summary length
+        page_structure = summarize_html(
+            read_text(scraped.html, limit=char_cap * HTML_READ_FACTOR), max_length=char_cap
+        )
+    text_content = prompt_budget.compact(read_text(scraped.text_content, limit=char_cap))
+
+    fitted = prompt_budget.fit(
+        [
+            prompt_budget.Section(
+                "page_structure", page_structure, priority=0,
+                min_tokens=variable_budget // 4, max_share=0.5,
+            ),
+            prompt_budget.Section(
+                "text_content", text_content, priority=1,
+                min_tokens=variable_budget // 4, max_share=0.5,
+            ),
+        ],
+        variable_budget,
+    )
+    text_content = fitted.texts["text_content"]
+    page_structure = fitted.texts["page_structure"]
+    user_prompt = _format_user_prompt(scraped, checks, text_content, page_structure)
+
+    issues = prompt_budget.expected_issues(CATEGORY_COUNT, _problem_signals(scraped), scraped.word_count or 0)
+    max_tokens = prompt_budget.response_max_tokens(
+        issues,
+        CATEGORY_COUNT,
+        floor=settings.ANALYSIS_MAX_TOKENS_MIN,
+        ceiling=settings.ANALYSIS_MAX_TOKENS_MAX,
+    )
+
+    if settings.ANALYSIS_TOOL_OUTPUT:
+        system_prompt = TOOL_SYSTEM_PROMPT + json.dumps(REPORT_TOOL)
+        params = {
+            "model": settings.ANTHROPIC_MODEL,
+            "max_tokens": max_tokens,
+            "system": TOOL_SYSTEM_BLOCKS,
+            "tools": [REPORT_TOOL],
+            "tool_choice": {"type": "tool", "name": REPORT_TOOL_NAME},
+            "messages": [{"role": "user", "content": user_prompt}],
+        }
+    else:
+        # Prefill the assistant turn with "{" to force clean JSON output
+        system_prompt = SYSTEM_PROMPT
+        params = {
+            "model": settings.ANTHROPIC_MODEL,
+            "max_tokens": max_tokens,
+            "system": SYSTEM_BLOCKS,
+            "messages": [
                 {"role": "user", "content": user_prompt},
                 {"role": "assistant", "content": "{"},
             ],
-        )
+        }
+    return AnalysisRequest(
+        url=scraped.url,
+        params=params,
+        cache_key=analysis_cache.cache_key(
+            {
+                **_cache_inputs(scraped, text_content, page_structure, budget),
+                "checks": checks.summary(),
+                "tool_output": settings.ANALYSIS_TOOL_OUTPUT,
+            }
+        ),
+        budget={
+            "input_budget": budget,
+            "allocated": fitted.allocated,
+            "needed": fitted.needed,
+            "estimated_input_tokens": (
+                prompt_budget.estimate_tokens(system_prompt) + prompt_budget.estimate_tokens(user_prompt)
+            ),
+            "expected_issues": issues,
+            "max_tokens": max_tokens,
+        },
+        checks=checks,
+    )
+
+
+async def load_cached_result(request: AnalysisRequest) -> Optional[Dict[str, Any]]:
+    """The cached result of an identical earlier analysis, if any (counted as a hit or miss)."""
+    if not settings.ANALYSIS_CACHE_ENABLED:
+        return None
+    cached = await analysis_cache.load(request.cache_key)
+    if cached is None:
+        await analysis_cache.record_miss()
+        return None
+
+    usage = cached.get("_usage", {})
+    tokens_saved = usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+    await analysis_cache.record_hit(tokens_saved)
+    logger.info("analysis_cache_hit", url=request.url, tokens_saved=tokens_saved)
+    cached["_usage"] = {
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "cache_read_input_tokens": 0,
+        "cache_creation_input_tokens": 0,
+    }
+    cached["_cache"] = {"hit": True, "tokens_saved": tokens_saved}
+    cached.pop("_budget", None)
+    return cached
+
+
+async def store_result(request: AnalysisRequest, result: Dict[str, Any]) -> None:
+    """Cache a fresh analysis result for identical later requests."""
+    # A repaired, truncated response is missing categories; let the next run retry
+    if settings.ANALYSIS_CACHE_ENABLED and not result.get("_truncated"):
+        await analysis_cache.store(request.cache_key, result)
 
-        # Extract response text (prepend "{" since we used it as prefill)
-        response_text = "{" + message.content[0].text
 
-        # Log token usage
-        usage = message.usage
-        tokens_input = usage.input_tokens if usage else 0
-        tokens_output = usage.output_tokens if usage else 0
+def result_from_message(message: Any, request: Optional[AnalysisRequest] = None) -> Dict[str, Any]:
+    """
+    Turn a Messages API response to the analysis prompt into a result.
+
+    Args:
+        message: The Message returned for a request from prepare_request()
+        request: That request, to compare its token budget with actual usage
+
+    Returns:
+        Parsed analysis result, with token usage under "_usage" and the
+        budget against usage under "_budget"
+
+    Raises:
+        AnalysisError: If the response cannot be parsed
+    """
+    # Log token usage
+    usage = message.usage
+    tokens_input = usage.input_tokens if usage else 0
+    tokens_output = usage.output_tokens if usage else 0
+    cache_read = (getattr(usage, "cache_read_input_tokens", None) or 0) if usage else 0
+    cache_write = (getattr(usage, "cache_creation_input_tokens", None) or 0) if usage else 0
+    logger.info(
+        "claude_usage",
+        input_tokens=tokens_input,
+        output_tokens=tokens_output,
+        cache_read_input_tokens=cache_read,
+        cache_creation_input_tokens=cache_write,
+    )
+
+    result = parse_message(message)
+
+    # Attach token usage to result for downstream tracking
+    result["_usage"] = {
+        "input_tokens": tokens_input,
+        "output_tokens": tokens_output,
+        "cache_read_input_tokens": cache_read,
+        "cache_creation_input_tokens": cache_write,
+    }
+    result["_cache"] = {"hit": False, "tokens_saved": 0}
+
+    if request is not None and request.budget:
+        result["_budget"] = {
+            **request.budget,
+            "input_tokens": tokens_input + cache_read + cache_write,
+            "output_tokens": tokens_output,
+        }
         logger.info(
-            "claude_usage",
-            input_tokens=tokens_input,
+            "prompt_budget",
+            url=request.url,
+            estimated_input_tokens=request.budget["estimated_input_tokens"],
+            input_tokens=result["_budget"]["input_tokens"],
+            max_tokens=request.budget["max_tokens"],
             output_tokens=tokens_output,
+            allocated=request.budget["allocated"],
         )
+    return result
 
-        # Parse JSON response
-        result = parse_analysis_response(response_text)
 
-        # Attach token usage to result for downstream tracking
-        result["_usage"] = {
-            "input_tokens": tokens_input,
-            "output_tokens": tokens_output,
-        }
+async def analyze_page(
+    scraped: ScrapedPage,
+    on_category: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+    on_preview: Optional[Callable[[List[Dict[str, Any]]], Awaitable[None]]] = None,
+) -> Dict[str, Any]:
+    """
+    Analyze a scraped page using Claude API.
+
+    The response is streamed, and each category is handed to on_category
+    as soon as the model finishes writing it. Results are cached by their
+    prompt inputs; a cached result is returned without calling the API.
+
+    Args:
+        scraped: The scraped page data
+        on_category: Awaited with each cleaned category as it completes
+        on_preview: Awaited with the provisional categories from the
+            deterministic checks, before the API is called
+
+    Returns:
+        Analysis result with score, summary, and categories
+        
+    Raises:
+        AnalysisError: If analysis fails
+    """
+    logger.info("analysis_started", url=scraped.url)
+
+    # Short on time: send a smaller prompt, which also shortens the response time
+    timeout = remaining_budget(settings.ANTHROPIC_TIMEOUT)
+    input_budget = settings.ANALYSIS_INPUT_TOKEN_BUDGET
+    if timeout < settings.DEADLINE_SHORT_PROMPT_BELOW:
+        input_budget //= 2
+        logger.warning("analysis_prompt_shortened", url=scraped.url, timeout_s=round(timeout, 1))
+
+    request = prepare_request(scraped, input_budget)
+    cached = await load_cached_result(request)
+    if cached is not None:
+        return cached
+    if on_preview is not None:
+        await on_preview(request.checks.preview())
+
+    try:
+        # The client's timeout applies per read, so bound the whole call as well
+        parser = CategoryStreamParser()
+        if not request.tool_output:
+            parser.feed("{")  # The prefill, which the stream does not repeat
+        message = await asyncio.wait_for(
+            _stream_message({**request.params, "timeout": timeout}, parser, on_category),
+            timeout=timeout,
+        )
+        result = result_from_message(message, request)
+        await store_result(request, result)
 
         logger.info(
             "analysis_completed",
@@ -206,6 +832,9 @@ async def analyze_page(scraped: ScrapedPage) -> Dict[str, Any]:
 
         return result
         
+    except asyncio.TimeoutError:
+        logger.error("claude_api_timeout", timeout_s=round(timeout, 1), url=scraped.url)
+        raise AnalysisError(f"Claude API did not respond within {timeout:.0f}s")
     except anthropic.APIError as e:
         logger.error("claude_api_error", error=str(e), url=scraped.url)
         raise AnalysisError(f"Claude API error: {str(e)}")
@@ -214,116 +843,254 @@ async def analyze_page(scraped: ScrapedPage) -> Dict[str, Any]:
         raise AnalysisError(f"Analysis failed: {str(e)}")
 
 
+def parse_message(message: Any) -> Dict[str, Any]:
+    """
+    The analysis in a Messages API response.
+
+    In tool output mode this is the input of the REPORT_TOOL call, already
+    parsed by the API and only validated here. Otherwise it is the JSON
+    text after the "{" prefill, which goes through parse_analysis_response.
+
+    Raises:
+        AnalysisError: If the response holds no valid analysis
+    """
+    for block in message.content:
+        if block.type == "tool_use" and block.name == REPORT_TOOL_NAME:
+            return parse_tool_input(block.input, truncated=message.stop_reason == "max_tokens")
+    text = next((block.text for block in message.content if block.type == "text"), None)
+    if text is None:
+        raise AnalysisError("Invalid analysis response: no report in the response")
+    return parse_analysis_response("{" + text)
+
+
+def parse_tool_input(tool_input: Any, truncated: bool = False) -> Dict[str, Any]:
+    """
+    Validate and normalize the input of a REPORT_TOOL call.
+
+    Args:
+        tool_input: The tool_use block's input
+        truncated: The response hit max_tokens, so the input was cut off
+            (the SDK parses what arrived); its last category is dropped
+            unless it has all its fields
+
+    Raises:
+        AnalysisError: If the input is not a valid analysis, or was cut
+            off with fewer than ANALYSIS_MIN_CATEGORIES categories
+    """
+    if truncated and isinstance(tool_input, dict) and tool_input.get("categories"):
+        if not _is_complete_category(tool_input["categories"][-1]):
+            tool_input = {**tool_input, "categories": tool_input["categories"][:-1]}
+    try:
+        result = analysis_result_adapter.validate_python(tool_input)
+    except ValidationError as e:
+        raise _invalid_response(e.errors()[0])
+    if truncated:
+        logger.warning("analysis_tool_input_truncated", categories=len(result["categories"]))
+        _check_truncated(result)
+        result["_truncated"] = True
+    return result
+
+
+def _is_complete_category(category: Any) -> bool:
+    """Whether a category of a cut-off tool input has every required field, in it and its issues."""
+    item = REPORT_TOOL["input_schema"]["properties"]["categories"]["items"]
+    issue_fields = item["properties"]["issues"]["items"]["required"]
+    if not isinstance(category, dict) or not all(field in category for field in item["required"]):
+        return False
+    issues = category["issues"]
+    return isinstance(issues, list) and all(
+        isinstance(issue, dict) and all(field in issue for field in issue_fields) for issue in issues
+    )
+
+
+def _check_truncated(result: Dict[str, Any]) -> None:
+    """Reject a cut-off report that kept too few categories to be worth saving."""
+    if len(result["categories"]) < settings.ANALYSIS_MIN_CATEGORIES:
+        logger.error("analysis_truncated_too_short", categories=len(result["categories"]))
+        raise AnalysisError(
+            f"Analysis response was cut off after {len(result['categories'])} of {CATEGORY_COUNT} categories"
+        )
+
+
 def parse_analysis_response(response_text: str) -> Dict[str, Any]:
     """
     Parse the JSON response from Claude.
-    
+
+    The response is validated against the compiled AnalysisResult schema,
+    which parses and normalizes it in one pass. Responses that are not
+    plain JSON are retried as: the outermost {...} span, then with smart
+    quotes and control characters cleaned, then with a truncated tail
+    repaired (see repair_truncated_json).
+
     Args:
         response_text: Raw response text from Claude
-        
+
     Returns:
-        Parsed analysis result
-        
+        Parsed analysis result; "_truncated" is set if the tail was repaired
+
     Raises:
-        AnalysisError: If parsing fails
+        AnalysisError: If parsing fails, or the repaired response kept
+            fewer than ANALYSIS_MIN_CATEGORIES categories
     """
-    try:
-        # Clean up response (remove markdown code blocks if present)
-        text = response_text.strip()
-        if text.startswith("```json"):
-            text = text[7:]
-        if text.startswith("```"):
-            text = text[3:]
-        if text.endswith("```"):
-            text = text[:-3]
-        text = text.strip()
-
-        # Try parsing JSON with multiple fallback strategies
-        result = None
-        parse_error = None
-
-        # Strategy 1: Direct parse
+    text = _strip_code_fences(response_text)
+    parse_error: Optional[str] = None
+
+    for candidate in _parse_candidates(text):
         try:
-            result = json.loads(text)
-        except json.JSONDecodeError as e:
-            parse_error = e
-
-        # Strategy 2: Extract JSON with regex
-        if result is None:
-            try:
-                match = re.search(r'\{[\s\S]*\}', text)
-                if match:
-                    result = json.loads(match.group())
-            except json.JSONDecodeError:
-                pass
-
-        # Strategy 3: Clean common issues (smart quotes, control chars)
-        if result is None:
-            try:
-                cleaned = text
-                # Replace smart/curly quotes with straight quotes
-                cleaned = cleaned.replace('"', '"').replace('"', '"')
-                cleaned = cleaned.replace(''', "'").replace(''', "'")
-                # Remove control characters except newlines and tabs
-                cleaned = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]', '', cleaned)
-                result = json.loads(cleaned)
-            except json.JSONDecodeError:
-                pass
-
-        # If all strategies failed, raise the original error
-        if result is None:
-            logger.error(
-                "json_parse_failed_all_strategies",
-                response_preview=response_text[:500],
-                error=str(parse_error),
-            )
-            raise parse_error
-        
-        # Validate structure
-        if not isinstance(result.get("score"), (int, float)):
-            raise ValueError("Missing or invalid score")
-        if not isinstance(result.get("summary"), str):
-            raise ValueError("Missing or invalid summary")
-        if not isinstance(result.get("categories"), list):
-            raise ValueError("Missing or invalid categories")
-        
-        # Ensure score is within bounds
-        result["score"] = max(0, min(100, int(result["score"])))
-        
-        # Validate and clean categories
-        cleaned_categories = []
-        for cat in result["categories"]:
-            cleaned_cat = {
-                "name": cat.get("name", "unknown"),
-                "label": cat.get("label", cat.get("name", "Unknown")),
-                "score": max(0, min(100, int(cat.get("score", 50)))),
-                "issues": [],
-            }
-            
-            for issue in cat.get("issues", []):
-                cleaned_issue = {
-                    "severity": issue.get("severity", "info"),
-                    "title": issue.get("title", "Issue"),
-                    "description": issue.get("description", ""),
-                    "recommendation": issue.get("recommendation", ""),
-                }
-                # Validate severity
-                if cleaned_issue["severity"] not in ("critical", "warning", "info"):
-                    cleaned_issue["severity"] = "info"
-                cleaned_cat["issues"].append(cleaned_issue)
-            
-            cleaned_categories.append(cleaned_cat)
-        
-        result["categories"] = cleaned_categories
-        
+            result = analysis_result_adapter.validate_json(candidate)
+        except ValidationError as e:
+            error = e.errors()[0]
+            if error["type"] != "json_invalid":
+                raise _invalid_response(error)
+            parse_error = parse_error or error["msg"]
+            if "EOF while parsing" in error["msg"]:
+                break  # cut off, not malformed: the other candidates fail too
+            continue
         return result
-        
-    except json.JSONDecodeError as e:
-        logger.error("json_parse_error", error=str(e), response_preview=response_text[:500])
-        raise AnalysisError(f"Failed to parse analysis response: {str(e)}")
-    except ValueError as e:
-        logger.error("validation_error", error=str(e))
-        raise AnalysisError(f"Invalid analysis response: {str(e)}")
+
+    # Truncated output: keep everything up to the last complete category
+    result = _parse_truncated(text)
+    if result is not None:
+        logger.warning(
+            "analysis_response_repaired",
+            response_chars=len(response_text),
+            categories=len(result["categories"]),
+        )
+        return result
+
+    logger.error(
+        "json_parse_failed_all_strategies",
+        response_preview=response_text[:500],
+        error=parse_error,
+    )
+    raise AnalysisError(f"Failed to parse analysis response: {parse_error}")
+
+
+def _strip_code_fences(response_text: str) -> str:
+    text = response_text.strip()
+    if text.startswith("```json"):
+        text = text[7:]
+    if text.startswith("```"):
+        text = text[3:]
+    if text.endswith("```"):
+        text = text[:-3]
+    return text.strip()
+
+
+_CONTROL_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]')
+
+
+def _clean_text(text: str) -> str:
+    """Replace smart quotes and drop control characters other than newlines and tabs."""
+    text = text.replace("\u201c", '"').replace("\u201d", '"')
+    text = text.replace("\u2018", "'").replace("\u2019", "'")
+    return _CONTROL_CHARS.sub("", text)
+
+
+def _parse_candidates(text: str) -> Iterator[str]:
+    """Texts to try in turn, cheapest first, skipping ones already tried."""
+    yield text
+    # Outermost object, e.g. when Claude adds a sentence around the JSON
+    start, end = text.find("{"), text.rfind("}")
+    span = text[start:end + 1] if 0 <= start < end else text
+    if span != text:
+        yield span
+    cleaned = _clean_text(span)
+    if cleaned != span:
+        yield cleaned
+
+
+def _parse_truncated(text: str) -> Optional[Dict[str, Any]]:
+    """Parse a cut-off response, dropping the category it was cut off in."""
+    repaired = repair_truncated_json(_clean_text(text))
+    if repaired is None:
+        return None
+    repaired_text, closed = repaired
+    try:
+        result = analysis_result_adapter.validate_json(repaired_text)
+    except ValidationError as e:
+        error = e.errors()[0]
+        if error["type"] == "json_invalid":
+            return None
+        raise _invalid_response(error)
+    # Closing more than the root object and the categories array means the
+    # last category was still open
+    if closed > 2 and result["categories"]:
+        result["categories"].pop()
+    _check_truncated(result)
+    return {**result, "_truncated": True}
+
+
+def _invalid_response(error: Dict[str, Any]) -> AnalysisError:
+    field_path = ".".join(str(part) for part in error["loc"])
+    logger.error("validation_error", field=field_path, error=error["msg"])
+    return AnalysisError(f"Invalid analysis response: Missing or invalid {field_path}")
+
+
+# A complete string, a lone quote opening an unterminated one, a
+# structural character, or a run of literal characters (number/true/null)
+_JSON_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|"|[{}\[\],:]|[^\s{}\[\],:"]+')
+
+
+def repair_truncated_json(text: str) -> Optional[Tuple[str, int]]:
+    """
+    Close a JSON document that was cut off, e.g. when max_tokens ran out.
+
+    The text is cut back to the end of the last complete value (so a
+    half-written string, number or key is dropped) and the arrays and
+    objects still open there are closed. The text is scanned once, a
+    token at a time.
+
+    Returns:
+        The repaired JSON text and how many containers were closed, or
+        None if no complete value was found
+    """
+    start = text.find("{")
+    if start < 0:
+        return None
+
+    stack: List[str] = []
+    expect_key = False
+    cut: Optional[int] = None
+    cut_stack: List[str] = []
+
+    for match in _JSON_TOKEN.finditer(text, start):
+        token = match.group()
+        end = match.end()
+        if token == '"':
+            break  # unterminated string
+        if token[0] == '"':
+            if expect_key:
+                expect_key = False
+                continue
+        elif token == "{" or token == "[":
+            stack.append("}" if token == "{" else "]")
+            expect_key = token == "{"
+            continue
+        elif token == "}" or token == "]":
+            if not stack:
+                break
+            stack.pop()
+            expect_key = False
+            if not stack:
+                return text[start:end], 0
+        elif token == ",":
+            expect_key = stack[-1] == "}"
+            continue
+        elif token == ":":
+            continue
+        elif end == len(text):
+            break  # a number or literal may have been cut short
+        cut, cut_stack = end, list(stack)
+
+    if cut is None:
+        return None
+    return text[start:cut] + "".join(reversed(cut_stack)), len(cut_stack)
+
+
+def _clean_category(cat: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize one category object from the response."""
+    return category_adapter.validate_python(cat)
 
 
 def calculate_overall_score(categories: List[Dict[str, Any]]) -> int:
@@ -0,0 +1,183 @@
+"""
+Scrape artifact storage.
+
+The full HTML, text and screenshots of a page can reach tens of megabytes,
+yet after the prompt is built they are only needed again for uploads. An
+ArtifactStore moves large values into temp files for the lifetime of a task
+so they are not resident while waiting on the LLM, and reads them back
+lazily — in bounded chunks for uploads.
+"""
+
+import asyncio
+import codecs
+import shutil
+import tempfile
+from pathlib import Path
+from typing import AsyncIterator, Iterator, Optional, Union
+
+from app.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+CHUNK_SIZE = 256 * 1024
+
+# Characters repeated between consecutive iter_text() windows, so a pattern
+# match up to this long is never split between two of them
+TEXT_OVERLAP = 4096
+
+
+class Artifact:
+    """A value held in memory or spilled to a file, read on demand."""
+
+    def __init__(
+        self,
+        name: str,
+        size: int,
+        data: Optional[bytes] = None,
+        path: Optional[Path] = None,
+        is_text: bool = False,
+    ):
+        self.name = name
+        self.size = size
+        self.is_text = is_text
+        self._data = data
+        self._path = path
+
+    @property
+    def spilled(self) -> bool:
+        return self._path is not None
+
+    def read(self) -> bytes:
+        """The whole value as bytes."""
+        if self._path is None:
+            return self._data or b""
+        return self._path.read_bytes()
+
+    def read_text(self, limit: Optional[int] = None) -> str:
+        """
+        The value decoded as UTF-8.
+
+        Args:
+            limit: Only read enough of the file for this many characters
+        """
+        if limit is None:
+            return self.read().decode("utf-8", errors="replace")
+        if self._path is None:
+            raw = (self._data or b"")[: limit * 4]
+        else:
+            with self._path.open("rb") as f:
+                raw = f.read(limit * 4)
+        # A multi-byte character cut at the read boundary is dropped
+        return raw.decode("utf-8", errors="ignore")[:limit]
+
+    def iter_text(self, chunk_size: int = CHUNK_SIZE, overlap: int = TEXT_OVERLAP) -> Iterator[str]:
+        """
+        The value decoded as UTF-8, in overlapping windows.
+
+        A value in memory comes back whole. A spilled one is read chunk by
+        chunk, each window starting with the last `overlap` characters of
+        the previous one.
+        """
+        if self._path is None:
+            yield (self._data or b"").decode("utf-8", errors="replace")
+            return
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        tail = ""
+        with self._path.open("rb") as f:
+            while chunk := f.read(chunk_size):
+                window = tail + decoder.decode(chunk)
+                yield window
+                tail = window[-overlap:]
+        rest = decoder.decode(b"", final=True)
+        if rest:
+            yield tail + rest
+
+    async def iter_chunks(self, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Stream the value without holding more than one chunk in memory."""
+        if self._path is None:
+            data = self._data or b""
+            for start in range(0, len(data), chunk_size):
+                yield data[start:start + chunk_size]
+            return
+        f = await asyncio.to_thread(self._path.open, "rb")
+        try:
+            while chunk := await asyncio.to_thread(f.read, chunk_size):
+                yield chunk
+        finally:
+            f.close()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __bool__(self) -> bool:
+        return self.size > 0
+
+    def __repr__(self) -> str:
+        where = "disk" if self.spilled else "memory"
+        return f"Artifact({self.name!r}, {self.size} bytes, {where})"
+
+
+class ArtifactStore:
+    """
+    Task-scoped temp directory for large artifacts.
+
+    Values under ARTIFACT_SPILL_BYTES stay in memory. The directory and all
+    files are removed on close().
+    """
+
+    def __init__(self, prefix: str = "artifacts-", spill_bytes: Optional[int] = None):
+        self.spill_bytes = settings.ARTIFACT_SPILL_BYTES if spill_bytes is None else spill_bytes
+        self._prefix = prefix
+        self._dir: Optional[Path] = None
+        self.spilled_bytes = 0
+
+    def put(self, name: str, value: Union[bytes, str]) -> Artifact:
+        """Store a value, spilling it to disk if it is large."""
+        is_text = isinstance(value, str)
+        data = value.encode("utf-8") if is_text else value
+        if len(data) < self.spill_bytes:
+            return Artifact(name, len(data), data=data, is_text=is_text)
+
+        if self._dir is None:
+            self._dir = Path(tempfile.mkdtemp(prefix=self._prefix, dir=settings.ARTIFACT_DIR or None))
+        path = self._dir / name
+        path.write_bytes(data)
+        self.spilled_bytes += len(data)
+        return Artifact(name, len(data), path=path, is_text=is_text)
+
+    def close(self) -> None:
+        """Delete every spilled file."""
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            logger.debug("artifacts_removed", spilled_bytes=self.spilled_bytes)
+            self._dir = None
+
+    def __enter__(self) -> "ArtifactStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def read_bytes(value: Union[bytes, Artifact, None]) -> bytes:
+    """Bytes of a value that may have been spilled."""
+    if isinstance(value, Artifact):
+        return value.read()
+    return value or b""
+
+
+def read_text(value: Union[str, Artifact, None], limit: Optional[int] = None) -> str:
+    """Text of a value that may have been spilled, optionally only its start."""
+    if isinstance(value, Artifact):
+        return value.read_text(limit)
+    value = value or ""
+    return value if limit is None else value[:limit]
+
+
+def iter_text(value: Union[str, Artifact, None]) -> Iterator[str]:
+    """Text of a value that may have been spilled, in overlapping windows (see Artifact.iter_text)."""
+    if isinstance(value, Artifact):
+        yield from value.iter_text()
+    else:
+        yield value or ""
@@ -0,0 +1,222 @@
+"""
+Browser pool for Playwright scraping.
+
+Keeps warm Chromium instances alive for the lifetime of a worker process so
+analyses do not pay a full browser cold start each time. Every scrape gets its
+own isolated BrowserContext; browsers are recycled after a number of pages or
+once their memory footprint grows past a threshold.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, List, Optional
+
+from playwright.async_api import Browser, BrowserContext, Playwright, async_playwright
+
+from app.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class PoolStats:
+    """Snapshot of the browser pool state."""
+    size: int
+    in_use: int
+    idle: int
+    launched: int
+    recycled: int
+    avg_launch_ms: int
+    last_launch_ms: int
+
+
+class PooledBrowser:
+    """A warm browser leased from the pool."""
+
+    def __init__(self, browser: Browser):
+        self.browser = browser
+        self.pages_served = 0
+        self.launched_at = time.monotonic()
+
+    async def new_context(self, **kwargs: Any) -> BrowserContext:
+        """Open a fresh, isolated context on this browser."""
+        self.pages_served += 1
+        return await self.browser.new_context(**kwargs)
+
+
+async def _browser_rss_mb(browser: Browser) -> int:
+    """
+    Resident memory of all Chromium processes of a browser, in MB.
+
+    Uses the CDP SystemInfo domain to list process IDs and reads their RSS
+    from /proc. Returns 0 when the information is unavailable (non-Linux).
+    """
+    session = await browser.new_browser_cdp_session()
+    try:
+        info = await session.send("SystemInfo.getProcessInfo")
+    finally:
+        await session.detach()
+
+    total_kb = 0
+    for process in info.get("processInfo", []):
+        try:
+            with open(f"/proc/{process['id']}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+        except (OSError, ValueError, KeyError):
+            continue
+    return total_kb // 1024
+
+
+class BrowserPool:
+    """Worker-scoped pool of warm Chromium browsers."""
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        max_pages: Optional[int] = None,
+        max_rss_mb: Optional[int] = None,
+    ):
+        self.size = size or settings.BROWSER_POOL_SIZE
+        self.max_pages = max_pages or settings.BROWSER_MAX_PAGES
+        self.max_rss_mb = settings.BROWSER_MAX_RSS_MB if max_rss_mb is None else max_rss_mb
+        self.loop = asyncio.get_running_loop()
+
+        self._playwright: Optional[Playwright] = None
+        self._idle: List[PooledBrowser] = []
+        self._slots = asyncio.Semaphore(self.size)
+        self._lock = asyncio.Lock()
+        self._in_use = 0
+        self._launched = 0
+        self._recycled = 0
+        self._launch_ms_total = 0
+        self._last_launch_ms = 0
+
+    async def _launch(self) -> PooledBrowser:
+        async with self._lock:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+
+        start = time.monotonic()
+        browser = await self._playwright.chromium.launch(headless=True)
+        launch_ms = int((time.monotonic() - start) * 1000)
+
+        self._launched += 1
+        self._launch_ms_total += launch_ms
+        self._last_launch_ms = launch_ms
+        logger.info("browser_launched", launch_ms=launch_ms, launched=self._launched)
+        return PooledBrowser(browser)
+
+    async def _should_recycle(self, pooled: PooledBrowser) -> Optional[str]:
+        if not pooled.browser.is_connected():
+            return "disconnected"
+        if pooled.pages_served >= self.max_pages:
+            return "max_pages"
+        if self.max_rss_mb:
+            try:
+                rss_mb = await _browser_rss_mb(pooled.browser)
+            except Exception as e:
+                logger.debug("browser_rss_check_failed", error=str(e))
+                return None
+            if rss_mb >= self.max_rss_mb:
+                return "max_rss"
+        return None
+
+    async def _retire(self, pooled: PooledBrowser, reason: str) -> None:
+        self._recycled += 1
+        logger.info(
+            "browser_recycled",
+            reason=reason,
+            pages_served=pooled.pages_served,
+            age_s=int(time.monotonic() - pooled.launched_at),
+        )
+        try:
+            await pooled.browser.close()
+        except Exception as e:
+            logger.warning("browser_close_failed", error=str(e))
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[PooledBrowser]:
+        """
+        Lease a warm browser for the duration of the block.
+
+        Waits for a free slot when all browsers are in use, and launches a new
+        browser if no idle one is available.
+        """
+        async with self._slots:
+            pooled = None
+            while self._idle:
+                candidate = self._idle.pop()
+                if candidate.browser.is_connected():
+                    pooled = candidate
+                    break
+                await self._retire(candidate, "disconnected")
+            if pooled is None:
+                pooled = await self._launch()
+
+            self._in_use += 1
+            try:
+                yield pooled
+            finally:
+                self._in_use -= 1
+                reason = await self._should_recycle(pooled)
+                if reason:
+                    await self._retire(pooled, reason)
+                else:
+                    self._idle.append(pooled)
+
+    def stats(self) -> PoolStats:
+        """Current pool statistics."""
+        return PoolStats(
+            size=self.size,
+            in_use=self._in_use,
+            idle=len(self._idle),
+            launched=self._launched,
+            recycled=self._recycled,
+            avg_launch_ms=self._launch_ms_total // self._launched if self._launched else 0,
+            last_launch_ms=self._last_launch_ms,
+        )
+
+    async def close(self) -> None:
+        """Close every idle browser and stop Playwright."""
+        while self._idle:
+            pooled = self._idle.pop()
+            try:
+                await pooled.browser.close()
+            except Exception as e:
+                logger.warning("browser_close_failed", error=str(e))
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+
+_browser_pool: Optional[BrowserPool] = None
+
+
+def get_browser_pool() -> BrowserPool:
+    """
+    Get the browser pool for the running event loop.
+
+    Playwright objects are bound to the loop that created them, so the pool is
+    rebuilt if it is requested from a different loop.
+    """
+    global _browser_pool
+    loop = asyncio.get_running_loop()
+    if _browser_pool is None or _browser_pool.loop is not loop:
+        if _browser_pool is not None:
+            logger.warning("browser_pool_loop_changed")
+        _browser_pool = BrowserPool()
+    return _browser_pool
+
+
+async def close_browser_pool() -> None:
+    """Close the shared browser pool."""
+    global _browser_pool
+    if _browser_pool is not None:
+        await _browser_pool.close()
+        _browser_pool = None
@@ -0,0 +1,168 @@
+"""
+Per-domain politeness scheduler for scraping.
+
+Limits how many scrapes hit the same registrable domain at once, across all
+Celery workers, and spaces consecutive scrapes of a domain apart. State lives
+in Redis: a sorted set of leases (scored by expiry, so a crashed worker's
+slot frees itself) and the earliest time the next scrape may start.
+"""
+
+import asyncio
+import ipaddress
+import math
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from urllib.parse import urlparse
+
+from app.config import settings
+from app.core.deadline import remaining_budget
+from app.core.errors import AppError
+from app.core.logging import get_logger
+from app.core.redis import get_redis
+
+logger = get_logger(__name__)
+
+KEY_PREFIX = "domain_scheduler:"
+
+# Two-label public suffixes, enough to avoid grouping every *.co.uk together
+MULTI_LABEL_SUFFIXES = frozenset({
+    "co.uk", "org.uk", "ac.uk", "gov.uk", "me.uk", "ltd.uk", "plc.uk",
+    "com.au", "net.au", "org.au", "co.nz", "org.nz", "co.jp", "ne.jp",
+    "com.br", "com.mx", "com.ar", "co.in", "co.za", "com.tr", "com.cn",
+    "com.sg", "com.hk", "co.kr", "co.il", "com.es", "com.pl", "gouv.fr",
+})
+
+# Returns 0 when a slot was acquired, -1 when every slot is held, otherwise
+# how many ms until the spacing since the previous scrape has elapsed
+ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local lease_ttl = tonumber(ARGV[2])
+local max_concurrency = tonumber(ARGV[3])
+local min_interval = tonumber(ARGV[4])
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+
+local next_at = tonumber(redis.call('GET', KEYS[2]) or '0')
+if now < next_at then
+    return next_at - now
+end
+
+if redis.call('ZCARD', KEYS[1]) >= max_concurrency then
+    return -1
+end
+
+redis.call('ZADD', KEYS[1], now + lease_ttl, ARGV[1])
+redis.call('PEXPIRE', KEYS[1], lease_ttl)
+if min_interval > 0 then
+    redis.call('SET', KEYS[2], now + min_interval, 'PX', min_interval)
+end
+return 0
+"""
+
+# Poll interval while every slot is held: holders release as soon as their
+# scrape ends, long before the lease expiry that only frees crashed workers' slots
+MAX_POLL_MS = 500
+
+
+class DomainBusyError(AppError):
+    """The target domain has no free scrape slot; retry later."""
+    def __init__(self, domain: str, retry_after: int):
+        super().__init__(
+            code="DOMAIN_BUSY",
+            message=f"Too many concurrent scrapes of {domain}",
+            status_code=503,
+            details={"retry_after": retry_after},
+        )
+        self.retry_after = retry_after
+
+
+def registrable_domain(host: str) -> str:
+    """
+    Approximate the registrable domain of a host (www.shop.example.co.uk
+    -> example.co.uk). IP addresses are returned unchanged.
+    """
+    host = host.lower().rstrip(".")
+    try:
+        ipaddress.ip_address(host)
+        return host
+    except ValueError:
+        pass
+
+    labels = host.split(".")
+    if len(labels) >= 3 and ".".join(labels[-2:]) in MULTI_LABEL_SUFFIXES:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+@asynccontextmanager
+async def domain_slot(url: str, max_wait: Optional[float] = None) -> AsyncIterator[None]:
+    """
+    Hold one of the domain's scrape slots for the duration of the block.
+
+    Waits (without failing) until a slot is free and the minimum spacing
+    since the previous scrape has elapsed. If Redis is unavailable the
+    scheduler fails open.
+
+    Args:
+        url: URL about to be scraped
+        max_wait: Seconds to wait for a slot (defaults to settings, limited
+            by the active deadline)
+
+    Raises:
+        DomainBusyError: If no slot freed up within max_wait
+    """
+    domain = registrable_domain(urlparse(url).hostname or "")
+    if max_wait is None:
+        max_wait = remaining_budget(settings.SCRAPER_DOMAIN_MAX_WAIT)
+    slots_key = f"{KEY_PREFIX}{domain}:slots"
+    next_key = f"{KEY_PREFIX}{domain}:next"
+    lease_id = uuid.uuid4().hex
+
+    redis = get_redis()
+    start = time.monotonic()
+    acquired = False
+    try:
+        while True:
+            wait_ms = await redis.eval(
+                ACQUIRE_SCRIPT,
+                2,
+                slots_key,
+                next_key,
+                lease_id,
+                settings.SCRAPER_DOMAIN_LEASE_TTL * 1000,
+                settings.SCRAPER_DOMAIN_MAX_CONCURRENCY,
+                settings.SCRAPER_DOMAIN_MIN_INTERVAL_MS,
+            )
+            if wait_ms == 0:
+                acquired = True
+                break
+            if wait_ms < 0:
+                delay, retry_after = MAX_POLL_MS / 1000, settings.SCRAPER_DOMAIN_RETRY_AFTER
+            else:
+                delay, retry_after = wait_ms / 1000, math.ceil(wait_ms / 1000)
+            waited = time.monotonic() - start
+            if waited + delay > max_wait:
+                logger.info("domain_slot_busy", domain=domain, waited_s=round(waited, 1))
+                raise DomainBusyError(domain, retry_after=max(1, retry_after))
+            await asyncio.sleep(min(delay, MAX_POLL_MS / 1000))
+    except DomainBusyError:
+        raise
+    except Exception as e:
+        logger.warning("domain_scheduler_unavailable", domain=domain, error=str(e))
+
+    if acquired:
+        waited_ms = int((time.monotonic() - start) * 1000)
+        if waited_ms:
+            logger.info("domain_slot_acquired", domain=domain, waited_ms=waited_ms)
+
+    try:
+        yield
+    finally:
+        if acquired:
+            try:
+                await redis.zrem(slots_key, lease_id)
+            except Exception as e:
+                logger.warning("domain_slot_release_failed", domain=domain, error=str(e))
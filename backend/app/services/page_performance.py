@@ -0,0 +1,86 @@
+"""
+In-browser performance metrics for scraped pages.
+
+A wall-clock timer around navigation says little about how fast a page feels.
+Observers installed before the page's own scripts record Core Web Vitals
+(LCP, CLS, long tasks) and are read back, with navigation and resource
+timing, after the page is ready. No extra navigation is needed.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from playwright.async_api import Page
+
+from app.core.logging import get_logger
+from app.services.page_scripts import PERFORMANCE_COLLECT_SCRIPT, PERFORMANCE_OBSERVER_SCRIPT
+
+logger = get_logger(__name__)
+
+# Core Web Vitals "good" / "poor" thresholds
+THRESHOLDS = {
+    "lcp_ms": (2500, 4000),
+    "cls": (0.1, 0.25),
+    "tbt_ms": (200, 600),
+    "ttfb_ms": (800, 1800),
+}
+
+
+@dataclass
+class PerformanceMetrics:
+    """Speed signals measured inside the browser."""
+    ttfb_ms: Optional[int] = None
+    fcp_ms: Optional[int] = None
+    lcp_ms: Optional[int] = None
+    cls: float = 0.0
+    tbt_ms: int = 0
+    long_task_count: int = 0
+    dom_content_loaded_ms: Optional[int] = None
+    request_count: int = 0
+    transfer_bytes: int = 0
+    bytes_by_type: Dict[str, int] = field(default_factory=dict)
+
+
+def rate(metric: str, value: Optional[float]) -> Optional[str]:
+    """Rate a metric as "good", "needs improvement" or "poor" (None if unmeasured)."""
+    if value is None or metric not in THRESHOLDS:
+        return None
+    good, poor = THRESHOLDS[metric]
+    if value <= good:
+        return "good"
+    if value <= poor:
+        return "needs improvement"
+    return "poor"
+
+
+async def install_observers(page: Page) -> None:
+    """Register the performance observers; call before navigating."""
+    await page.add_init_script(PERFORMANCE_OBSERVER_SCRIPT)
+
+
+async def collect_metrics(page: Page) -> PerformanceMetrics:
+    """
+    Read the metrics recorded so far.
+
+    Returns:
+        PerformanceMetrics, empty if the page could not be evaluated — the
+        metrics never fail a scrape
+    """
+    try:
+        data = await page.evaluate(PERFORMANCE_COLLECT_SCRIPT)
+    except Exception as e:
+        logger.warning("performance_metrics_failed", error=str(e))
+        return PerformanceMetrics()
+
+    return PerformanceMetrics(
+        ttfb_ms=data["ttfbMs"],
+        fcp_ms=data["fcpMs"],
+        lcp_ms=data["lcpMs"],
+        cls=data["cls"],
+        tbt_ms=data["tbtMs"],
+        long_task_count=data["longTaskCount"],
+        dom_content_loaded_ms=data["domContentLoadedMs"],
+        request_count=data["requestCount"],
+        transfer_bytes=data["transferBytes"],
+        bytes_by_type=data["bytesByType"],
+    )
@@ -0,0 +1,177 @@
+"""
+Page readiness detection for scraping.
+
+``wait_until="networkidle"`` never resolves on pages with long-polling or
+streaming connections, which made them time out even though their content was
+long available. The adaptive strategy navigates to DOMContentLoaded and then
+waits, each within its own hard budget, for the load event, a quiet network
+window and a settled DOM. A phase that exhausts its budget is recorded and
+the scrape continues with what has rendered.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from playwright.async_api import Page, Request, Response
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import TimeoutError as PlaywrightTimeout
+
+from app.config import settings
+from app.core.deadline import remaining_budget
+from app.core.logging import get_logger
+from app.services.page_scripts import DOM_SETTLE_SCRIPT
+
+logger = get_logger(__name__)
+
+# Requests still in flight that do not prevent the network being "quiet"
+# (long-polling, analytics keep-alives)
+NETWORK_QUIET_MAX_INFLIGHT = 2
+
+
+@dataclass
+class Readiness:
+    """How a page was judged ready, and the time spent in each phase."""
+    strategy: str
+    load_time_ms: int = 0
+    phases: Dict[str, int] = field(default_factory=dict)
+    timed_out: List[str] = field(default_factory=list)
+
+
+class _InflightTracker:
+    """Counts the page's requests that have not finished yet."""
+
+    def __init__(self, page: Page):
+        self.inflight = 0
+        page.on("request", self._started)
+        page.on("requestfinished", self._ended)
+        page.on("requestfailed", self._ended)
+
+    def _started(self, request: Request) -> None:
+        self.inflight += 1
+
+    def _ended(self, request: Request) -> None:
+        self.inflight = max(0, self.inflight - 1)
+
+
+def _elapsed_ms(start: float) -> int:
+    return int((time.monotonic() - start) * 1000)
+
+
+def _budget_ms(cap_ms: int) -> int:
+    """A phase budget, shortened by the active deadline."""
+    return int(remaining_budget(cap_ms / 1000) * 1000)
+
+
+async def _wait_network_quiet(tracker: _InflightTracker, quiet_ms: int, budget_ms: int) -> bool:
+    """Wait until few enough requests are in flight for quiet_ms, within budget_ms."""
+    deadline = time.monotonic() + budget_ms / 1000
+    quiet_since: Optional[float] = None
+    while time.monotonic() < deadline:
+        if tracker.inflight <= NETWORK_QUIET_MAX_INFLIGHT:
+            quiet_since = quiet_since or time.monotonic()
+            if (time.monotonic() - quiet_since) * 1000 >= quiet_ms:
+                return True
+        else:
+            quiet_since = None
+        await asyncio.sleep(0.05)
+    return False
+
+
+async def _navigate_networkidle(page: Page, url: str) -> Tuple[Optional[Response], Readiness]:
+    readiness = Readiness(strategy="networkidle")
+    start = time.monotonic()
+    response = await page.goto(
+        url,
+        wait_until="networkidle",
+        timeout=_budget_ms(settings.PLAYWRIGHT_TIMEOUT),
+    )
+    readiness.load_time_ms = readiness.phases["networkidle"] = _elapsed_ms(start)
+    return response, readiness
+
+
+async def _navigate_adaptive(page: Page, url: str) -> Tuple[Optional[Response], Readiness]:
+    readiness = Readiness(strategy="adaptive")
+    tracker = _InflightTracker(page)
+    start = time.monotonic()
+
+    # Phase 1: DOMContentLoaded — the only phase allowed to fail the scrape
+    response = await page.goto(
+        url,
+        wait_until="domcontentloaded",
+        timeout=_budget_ms(settings.PLAYWRIGHT_TIMEOUT),
+    )
+    readiness.phases["dom_content_loaded"] = _elapsed_ms(start)
+
+    # Phase 2: load event
+    phase_start = time.monotonic()
+    try:
+        await page.wait_for_load_state("load", timeout=_budget_ms(settings.SCRAPER_LOAD_BUDGET_MS))
+    except PlaywrightTimeout:
+        readiness.timed_out.append("load")
+    readiness.phases["load"] = _elapsed_ms(phase_start)
+    readiness.load_time_ms = _elapsed_ms(start)
+
+    # Phase 3: quiet network window
+    phase_start = time.monotonic()
+    if not await _wait_network_quiet(
+        tracker,
+        settings.SCRAPER_NETWORK_QUIET_MS,
+        _budget_ms(settings.SCRAPER_NETWORK_BUDGET_MS),
+    ):
+        readiness.timed_out.append("network_quiet")
+    readiness.phases["network_quiet"] = _elapsed_ms(phase_start)
+
+    # Phase 4: DOM mutations settle (late client-side rendering)
+    phase_start = time.monotonic()
+    budget_ms = _budget_ms(settings.SCRAPER_DOM_SETTLE_BUDGET_MS)
+    try:
+        settle = await asyncio.wait_for(
+            page.evaluate(DOM_SETTLE_SCRIPT, [settings.SCRAPER_DOM_SETTLE_MS, budget_ms]),
+            timeout=budget_ms / 1000 + 1,
+        )
+        if not settle["settled"]:
+            readiness.timed_out.append("dom_settle")
+    except (asyncio.TimeoutError, PlaywrightError):
+        # Budget exceeded, or a client-side redirect replaced the document
+        readiness.timed_out.append("dom_settle")
+    readiness.phases["dom_settle"] = _elapsed_ms(phase_start)
+
+    return response, readiness
+
+
+async def navigate(
+    page: Page,
+    url: str,
+    strategy: Optional[str] = None,
+) -> Tuple[Optional[Response], Readiness]:
+    """
+    Navigate to url and wait until the page is ready to be scraped.
+
+    Args:
+        page: The page to navigate
+        url: Target URL
+        strategy: "adaptive" or "networkidle" (defaults to settings)
+
+    Returns:
+        The main navigation response and the readiness record
+
+    Raises:
+        PlaywrightTimeout: If the page did not reach DOMContentLoaded
+            ("adaptive") or network idle ("networkidle") in time
+    """
+    strategy = strategy or settings.SCRAPER_READINESS_STRATEGY
+    if strategy == "networkidle":
+        response, readiness = await _navigate_networkidle(page, url)
+    else:
+        response, readiness = await _navigate_adaptive(page, url)
+
+    logger.info(
+        "page_ready",
+        strategy=readiness.strategy,
+        load_time_ms=readiness.load_time_ms,
+        phases=readiness.phases,
+        timed_out=readiness.timed_out,
+    )
+    return response, readiness
@@ -0,0 +1,311 @@
+"""
+JavaScript evaluated inside scraped pages.
+
+Kept apart from the scraper so the in-page logic can be read and reviewed on
+its own. Each script is a function expression passed to ``page.evaluate``.
+"""
+
+# Everything the scraper needs from the DOM, in a single round trip.
+# innerText forces a layout walk, so it is computed exactly once.
+EXTRACT_SCRIPT = """
+() => {
+    const meta = document.querySelector('meta[name="description"]');
+    const text = document.body ? document.body.innerText : '';
+    const words = text.split(/\\s+/).filter(w => w.length > 0);
+
+    const doctype = document.doctype
+        ? new XMLSerializer().serializeToString(document.doctype)
+        : '';
+
+    return {
+        title: document.title || '',
+        metaDescription: meta ? meta.getAttribute('content') : null,
+        text: text,
+        html: doctype + document.documentElement.outerHTML,
+        wordCount: words.length,
+        imageCount: document.querySelectorAll('img').length,
+        linkCount: document.querySelectorAll('a').length,
+        hasForm: document.querySelector('form') !== null,
+        pageHeight: document.documentElement.scrollHeight,
+    };
+}
+"""
+
+# Resolves once the DOM has gone quietMs without a mutation, or after budgetMs.
+DOM_SETTLE_SCRIPT = """
+([quietMs, budgetMs]) => new Promise(resolve => {
+    const start = performance.now();
+    let mutations = 0;
+    let quietTimer = null;
+    let budgetTimer = null;
+
+    const finish = (settled) => {
+        observer.disconnect();
+        clearTimeout(quietTimer);
+        clearTimeout(budgetTimer);
+        resolve({settled, mutations, elapsedMs: Math.round(performance.now() - start)});
+    };
+    const observer = new MutationObserver(records => {
+        mutations += records.length;
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(() => finish(true), quietMs);
+    });
+
+    observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+    quietTimer = setTimeout(() => finish(true), quietMs);
+    budgetTimer = setTimeout(() => finish(false), budgetMs);
+})
+"""
+
+# Mobile usability checks, run in the emulated phone context.
+MOBILE_CHECKS_SCRIPT = """
+() => {
+    const isVisible = (el) => {
+        const rect = el.getBoundingClientRect();
+        if (rect.width === 0 || rect.height === 0) return false;
+        const style = getComputedStyle(el);
+        return style.visibility !== 'hidden' && style.display !== 'none';
+    };
+
+    const targets = Array.from(document.querySelectorAll(
+        'a[href], button, input:not([type="hidden"]), select, textarea, [role="button"]'
+    )).filter(isVisible);
+    const smallTargets = targets.filter(el => {
+        const rect = el.getBoundingClientRect();
+        return rect.width < 44 || rect.height < 44;
+    });
+
+    const textElements = Array.from(document.querySelectorAll('p, li, span, a, td, label'))
+        .filter(el => el.childElementCount === 0 && el.textContent.trim().length > 0)
+        .slice(0, 500);
+    const smallText = textElements.filter(el => parseFloat(getComputedStyle(el).fontSize) < 12);
+
+    const root = document.documentElement;
+    return {
+        viewportWidth: window.innerWidth,
+        scrollWidth: root.scrollWidth,
+        pageHeight: root.scrollHeight,
+        horizontalScroll: root.scrollWidth > window.innerWidth + 1,
+        hasViewportMeta: document.querySelector('meta[name="viewport"]') !== null,
+        tapTargets: targets.length,
+        smallTapTargets: smallTargets.length,
+        textElements: textElements.length,
+        smallTextElements: smallText.length,
+        wordCount: (document.body ? document.body.innerText : '').split(/\\s+/).filter(w => w.length > 0).length,
+    };
+}
+"""
+
+# Installed with add_init_script so the observers run before any page script.
+# Buffered observers also replay entries recorded before they were attached.
+PERFORMANCE_OBSERVER_SCRIPT = """
+(() => {
+    if (window.__lpPerf) return;
+    const perf = window.__lpPerf = {lcp: null, cls: 0, longTasks: []};
+    try { performance.setResourceTimingBufferSize(1000); } catch (e) {}
+
+    const observe = (type, callback) => {
+        try {
+            new PerformanceObserver(list => list.getEntries().forEach(callback))
+                .observe({type, buffered: true});
+        } catch (e) {}
+    };
+
+    observe('largest-contentful-paint', entry => {
+        perf.lcp = entry.renderTime || entry.loadTime || entry.startTime;
+    });
+
+    // CLS is the largest session window of shifts (< 1s apart, < 5s long)
+    let sessionValue = 0, sessionStart = 0, sessionLast = 0;
+    observe('layout-shift', entry => {
+        if (entry.hadRecentInput) return;
+        if (entry.startTime - sessionLast > 1000 || entry.startTime - sessionStart > 5000) {
+            sessionValue = 0;
+            sessionStart = entry.startTime;
+        }
+        sessionValue += entry.value;
+        sessionLast = entry.startTime;
+        perf.cls = Math.max(perf.cls, sessionValue);
+    });
+
+    observe('longtask', entry => {
+        perf.longTasks.push([entry.startTime, entry.duration]);
+    });
+})();
+"""
+
+# Reads what the observers collected plus navigation and resource timing.
+PERFORMANCE_COLLECT_SCRIPT = """
+() => {
+    const perf = window.__lpPerf || {lcp: null, cls: 0, longTasks: []};
+    const nav = performance.getEntriesByType('navigation')[0];
+    const fcpEntry = performance.getEntriesByName('first-contentful-paint')[0];
+    const fcp = fcpEntry ? fcpEntry.startTime : 0;
+
+    // Total blocking time: the part of each long task over 50ms, after FCP
+    const tbt = perf.longTasks
+        .filter(([start]) => start >= fcp)
+        .reduce((sum, [, duration]) => sum + Math.max(0, duration - 50), 0);
+
+    const typeOf = (entry) => {
+        switch (entry.initiatorType) {
+            case 'img': case 'image': case 'imageset': return 'image';
+            case 'script': return 'script';
+            case 'css': return 'stylesheet';
+            case 'link': return /\\.css(\\?|$)/.test(entry.name) ? 'stylesheet' : 'other';
+            case 'fetch': case 'xmlhttprequest': case 'beacon': return 'xhr';
+            case 'video': case 'audio': return 'media';
+            default: return /\\.(woff2?|ttf|otf)(\\?|$)/.test(entry.name) ? 'font' : 'other';
+        }
+    };
+    // Cross-origin resources without Timing-Allow-Origin report a transferSize of 0
+    const sizeOf = (entry) => entry.transferSize || entry.encodedBodySize || 0;
+
+    const bytesByType = {};
+    let transferBytes = 0;
+    const resources = performance.getEntriesByType('resource');
+    for (const entry of resources) {
+        const type = typeOf(entry);
+        const size = sizeOf(entry);
+        bytesByType[type] = (bytesByType[type] || 0) + size;
+        transferBytes += size;
+    }
+    if (nav) {
+        bytesByType.document = sizeOf(nav);
+        transferBytes += sizeOf(nav);
+    }
+
+    return {
+        ttfbMs: nav ? Math.round(nav.responseStart) : null,
+        fcpMs: fcpEntry ? Math.round(fcp) : null,
+        lcpMs: perf.lcp === null ? null : Math.round(perf.lcp),
+        cls: Math.round(perf.cls * 1000) / 1000,
+        tbtMs: Math.round(tbt),
+        longTaskCount: perf.longTasks.length,
+        domContentLoadedMs: nav ? Math.round(nav.domContentLoadedEventEnd) : null,
+        requestCount: resources.length + (nav ? 1 : 0),
+        transferBytes: transferBytes,
+        bytesByType: bytesByType,
+    };
+}
+"""
+
+# Structured outline of the conversion-relevant parts of the page: headings,
+# calls to action, forms, social proof and the styling of key elements.
+DOM_DIGEST_SCRIPT = """
+() => {
+    const foldLine = window.innerHeight;
+    const clean = (s, max = 120) => (s || '').replace(/\\s+/g, ' ').trim().slice(0, max);
+    const isVisible = (el) => {
+        const rect = el.getBoundingClientRect();
+        if (rect.width === 0 || rect.height === 0) return false;
+        const style = getComputedStyle(el);
+        return style.visibility !== 'hidden' && style.display !== 'none' && style.opacity !== '0';
+    };
+    const aboveFold = (el) => el.getBoundingClientRect().top + window.scrollY < foldLine;
+
+    // WCAG contrast of an element's text against its effective background
+    const parseColor = (value) => {
+        const m = (value || '').match(/rgba?\\(([^)]+)\\)/);
+        if (!m) return null;
+        const [r, g, b, a = 1] = m[1].split(/[ ,\\/]+/).filter(Boolean).map(Number);
+        return {r, g, b, a};
+    };
+    const luminance = ({r, g, b}) => {
+        const channel = (c) => {
+            c /= 255;
+            return c <= 0.03928 ? c / 12.92 : Math.pow((c + 0.055) / 1.055, 2.4);
+        };
+        return 0.2126 * channel(r) + 0.7152 * channel(g) + 0.0722 * channel(b);
+    };
+    const background = (el) => {
+        for (let node = el; node && node.nodeType === 1; node = node.parentElement) {
+            const color = parseColor(getComputedStyle(node).backgroundColor);
+            if (color && color.a > 0.5) return color;
+        }
+        return {r: 255, g: 255, b: 255, a: 1};
+    };
+    const styleOf = (el) => {
+        if (!el) return null;
+        const style = getComputedStyle(el);
+        const fg = parseColor(style.color);
+        const bg = background(el);
+        const [light, dark] = [luminance(fg || {r: 0, g: 0, b: 0}), luminance(bg)].sort((x, y) => y - x);
+        return {
+            text: clean(el.innerText, 60),
+            fontSize: Math.round(parseFloat(style.fontSize)),
+            fontWeight: style.fontWeight,
+            contrast: Math.round((light + 0.05) / (dark + 0.05) * 10) / 10,
+        };
+    };
+
+    const headings = Array.from(document.querySelectorAll('h1, h2, h3'))
+        .filter(isVisible)
+        .slice(0, 30)
+        .map(el => ({level: Number(el.tagName[1]), text: clean(el.innerText), fold: aboveFold(el)}));
+
+    const seen = new Set();
+    const ctaElements = Array.from(document.querySelectorAll(
+        'button, input[type="submit"], input[type="button"], [role="button"], ' +
+        'a[class*="btn" i], a[class*="button" i], a[class*="cta" i]'
+    )).filter(el => {
+        const text = clean(el.innerText || el.value || el.getAttribute('aria-label'), 60);
+        if (!text || seen.has(text) || !isVisible(el)) return false;
+        seen.add(text);
+        return true;
+    }).slice(0, 25);
+    const ctas = ctaElements.map(el => ({
+        text: clean(el.innerText || el.value || el.getAttribute('aria-label'), 60),
+        href: el.getAttribute('href'),
+        fold: aboveFold(el),
+    }));
+
+    const labelFor = (field) => {
+        if (field.id) {
+            const label = document.querySelector(`label[for="${CSS.escape(field.id)}"]`);
+            if (label) return clean(label.innerText, 60);
+        }
+        const wrapping = field.closest('label');
+        if (wrapping) return clean(wrapping.innerText, 60);
+        return clean(field.getAttribute('aria-label') || field.placeholder || field.name, 60);
+    };
+    const forms = Array.from(document.forms).filter(isVisible).slice(0, 5).map(form => {
+        const fields = Array.from(form.querySelectorAll('input, select, textarea'))
+            .filter(f => !['hidden', 'submit', 'button'].includes(f.type) && isVisible(f))
+            .slice(0, 15)
+            .map(f => ({type: f.type || f.tagName.toLowerCase(), label: labelFor(f), required: f.required}));
+        const submit = form.querySelector('button, input[type="submit"]');
+        return {
+            fields,
+            submit: submit ? clean(submit.innerText || submit.value, 60) : null,
+            fold: aboveFold(form),
+        };
+    });
+
+    const testimonials = Array.from(document.querySelectorAll(
+        'blockquote, [class*="testimonial" i], [class*="review" i], [itemtype*="Review"]'
+    )).filter(isVisible)
+        .map(el => clean(el.innerText, 160))
+        .filter((text, i, all) => text.length > 20 && all.indexOf(text) === i)
+        .slice(0, 5);
+    const logos = Array.from(document.querySelectorAll('img'))
+        .filter(img => /logo|client|partner|customer/i.test(
+            `${img.alt} ${img.className} ${img.src} ${img.parentElement ? img.parentElement.className : ''}`
+        ))
+        .filter(isVisible);
+
+    return {
+        headings,
+        ctas,
+        forms,
+        testimonials,
+        logoCount: logos.length,
+        logoNames: logos.map(img => clean(img.alt, 40)).filter(Boolean).slice(0, 10),
+        styles: {
+            h1: styleOf(document.querySelector('h1')),
+            primaryCta: styleOf(ctaElements.find(aboveFold) || ctaElements[0]),
+            bodyText: styleOf(Array.from(document.querySelectorAll('p')).find(p => isVisible(p) && p.innerText.trim().length > 40)),
+        },
+    };
+}
+"""
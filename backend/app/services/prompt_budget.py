@@ -0,0 +1,148 @@
+"""
+Token budgeting for the analysis prompt.
+
+The page text and structure used to be cut at fixed character counts. A
+page padded with whitespace then wasted part of its share, and a dense page
+lost content it had room for. This module estimates token counts and shares
+one input budget between the prompt sections by priority. It also sizes
+max_tokens from the number of issues the response is expected to list.
+
+Claude's tokenizer is not available offline, so counts are estimated from
+word and symbol runs. The estimates are recorded next to the API's real
+counts so the constants below can be tuned.
+"""
+
+import math
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# Word, number and symbol runs; whitespace is (nearly) free
+_PIECE = re.compile(r"[^\W\d_]+|\d+|[^\w\s]+|_+")
+
+# Characters per token within a run
+CHARS_PER_WORD_TOKEN = 7
+CHARS_PER_DIGIT_TOKEN = 3
+CHARS_PER_SYMBOL_TOKEN = 2
+
+# Expected response size, in tokens
+RESPONSE_OVERHEAD_TOKENS = 250  # Score, summary, JSON structure
+CATEGORY_TOKENS = 40
+ISSUE_TOKENS = 140
+RESPONSE_SAFETY = 1.3
+
+
+def _piece_tokens(piece: str) -> int:
+    if piece[0].isdigit():
+        return math.ceil(len(piece) / CHARS_PER_DIGIT_TOKEN)
+    if piece[0].isalpha():
+        return 1 + len(piece) // CHARS_PER_WORD_TOKEN
+    return math.ceil(len(piece) / CHARS_PER_SYMBOL_TOKEN)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimated token count of text."""
+    return sum(_piece_tokens(piece) for piece in _PIECE.findall(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """The longest prefix of text estimated at no more than max_tokens."""
+    used = 0
+    for match in _PIECE.finditer(text):
+        used += _piece_tokens(match.group())
+        if used > max_tokens:
+            return text[: match.start()].rstrip()
+    return text
+
+
+_BLANK_LINES = re.compile(r"\n\s*\n\s*")
+_SPACES = re.compile(r"[ \t\r\f\v]+")
+
+
+def compact(text: str) -> str:
+    """Collapse runs of spaces and blank lines, keeping paragraph breaks."""
+    text = _SPACES.sub(" ", text)
+    return _BLANK_LINES.sub("\n\n", text).strip()
+
+
+@dataclass
+class Section:
+    """A variable part of the prompt competing for the input budget."""
+    name: str
+    text: str
+    priority: int  # Lower is served first
+    min_tokens: int = 0  # Guaranteed before lower priorities get anything
+    max_share: float = 1.0  # Share of the budget before leftovers are handed out
+
+    @property
+    def need(self) -> int:
+        return estimate_tokens(self.text)
+
+
+def allocate(sections: List[Section], budget: int) -> Dict[str, int]:
+    """
+    Share a token budget between sections.
+
+    Three passes, each in priority order: every section gets up to its
+    minimum, then up to its share of the budget, and then whatever is left
+    over. A section never gets more than it needs, so space a short section
+    does not use goes to the others.
+
+    Returns:
+        Tokens allocated per section name
+    """
+    ordered = sorted(sections, key=lambda s: s.priority)
+    needs = {s.name: s.need for s in ordered}
+    granted = {s.name: 0 for s in ordered}
+    remaining = budget
+
+    def grant(section: Section, limit: int) -> None:
+        nonlocal remaining
+        extra = max(0, min(limit, needs[section.name]) - granted[section.name])
+        extra = min(extra, remaining)
+        granted[section.name] += extra
+        remaining -= extra
+
+    for section in ordered:
+        grant(section, section.min_tokens)
+    for section in ordered:
+        grant(section, int(budget * section.max_share))
+    for section in ordered:
+        grant(section, needs[section.name])
+    return granted
+
+
+@dataclass
+class BudgetedPrompt:
+    """Section texts cut to their allocations, with the numbers for tuning."""
+    texts: Dict[str, str]
+    allocated: Dict[str, int]
+    needed: Dict[str, int]
+
+
+def fit(sections: List[Section], budget: int) -> BudgetedPrompt:
+    """Allocate the budget and cut each section to its allocation."""
+    allocated = allocate(sections, budget)
+    return BudgetedPrompt(
+        texts={s.name: truncate_to_tokens(s.text, allocated[s.name]) for s in sections},
+        allocated=allocated,
+        needed={s.name: s.need for s in sections},
+    )
+
+
+def expected_issues(categories: int, signals: List[Optional[bool]], word_count: int) -> int:
+    """
+    How many issues the response will probably list.
+
+    Args:
+        categories: Categories the response covers (about two issues each)
+        signals: Measured problems on the page (True for each one found)
+        word_count: Words on the page; long pages give more to comment on
+    """
+    return 2 * categories + sum(1 for s in signals if s) + min(8, word_count // 500)
+
+
+def response_max_tokens(issues: int, categories: int, floor: int, ceiling: int) -> int:
+    """max_tokens for a response listing about this many issues."""
+    expected = RESPONSE_OVERHEAD_TOKENS + categories * CATEGORY_TOKENS + issues * ISSUE_TOKENS
+    return max(floor, min(ceiling, int(expected * RESPONSE_SAFETY)))
@@ -0,0 +1,131 @@
+"""
+Request interception for the fast scrape mode.
+
+Aborts requests that do not affect the landing page content (analytics
+beacons, ad networks, chat widgets, media and web fonts) so pages settle
+sooner, and records what was blocked so the speed analysis can account for it.
+"""
+
+from collections import Counter
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import urlparse
+
+from playwright.async_api import BrowserContext, Route
+
+from app.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Known third-party domains, matched on the host and all its subdomains
+BLOCKED_DOMAINS: Dict[str, str] = {
+    # Analytics & tag managers
+    "google-analytics.com": "analytics",
+    "googletagmanager.com": "analytics",
+    "analytics.google.com": "analytics",
+    "hotjar.com": "analytics",
+    "clarity.ms": "analytics",
+    "segment.com": "analytics",
+    "segment.io": "analytics",
+    "mixpanel.com": "analytics",
+    "amplitude.com": "analytics",
+    "heapanalytics.com": "analytics",
+    "fullstory.com": "analytics",
+    "mouseflow.com": "analytics",
+    "hs-analytics.net": "analytics",
+    "plausible.io": "analytics",
+    "nr-data.net": "analytics",
+    "scorecardresearch.com": "analytics",
+    "quantserve.com": "analytics",
+    # Advertising & retargeting pixels
+    "doubleclick.net": "ads",
+    "googlesyndication.com": "ads",
+    "googleadservices.com": "ads",
+    "facebook.net": "ads",
+    "ads-twitter.com": "ads",
+    "ads.linkedin.com": "ads",
+    "snap.licdn.com": "ads",
+    "analytics.tiktok.com": "ads",
+    "bat.bing.com": "ads",
+    "criteo.com": "ads",
+    "criteo.net": "ads",
+    "adnxs.com": "ads",
+    "taboola.com": "ads",
+    "outbrain.com": "ads",
+    # Chat & support widgets
+    "intercom.io": "chat",
+    "intercomcdn.com": "chat",
+    "widget.intercom.io": "chat",
+    "drift.com": "chat",
+    "driftt.com": "chat",
+    "crisp.chat": "chat",
+    "tawk.to": "chat",
+    "zdassets.com": "chat",
+    "livechatinc.com": "chat",
+    "tidio.co": "chat",
+}
+
+
+def _match_domain(host: str, domains: Dict[str, str]) -> Optional[str]:
+    """Return the category of the first blocked domain matching host or a parent."""
+    parts = host.lower().split(".")
+    for i in range(len(parts) - 1):
+        category = domains.get(".".join(parts[i:]))
+        if category:
+            return category
+    return None
+
+
+class RequestBlocker:
+    """Routes a browser context's requests through a blocklist."""
+
+    def __init__(
+        self,
+        resource_types: Optional[Iterable[str]] = None,
+        extra_domains: Optional[Iterable[str]] = None,
+    ):
+        if resource_types is None:
+            resource_types = settings.SCRAPER_BLOCKED_RESOURCE_TYPES
+        if extra_domains is None:
+            extra_domains = settings.SCRAPER_EXTRA_BLOCKED_DOMAINS
+
+        self.resource_types = frozenset(resource_types)
+        self.domains = dict(BLOCKED_DOMAINS)
+        for domain in extra_domains:
+            self.domains.setdefault(domain.lower(), "custom")
+
+        self._by_category: Counter = Counter()
+        self._by_domain: Counter = Counter()
+
+    def classify(self, url: str, resource_type: str) -> Optional[str]:
+        """Return the block category for a request, or None to let it through."""
+        host = urlparse(url).hostname or ""
+        category = _match_domain(host, self.domains)
+        if category:
+            return category
+        if resource_type in self.resource_types:
+            return resource_type
+        return None
+
+    async def install(self, context: BrowserContext) -> None:
+        """Intercept every request made by the context."""
+        await context.route("**/*", self._handle)
+
+    async def _handle(self, route: Route) -> None:
+        request = route.request
+        category = self.classify(request.url, request.resource_type)
+        if category is None:
+            await route.continue_()
+            return
+
+        self._by_category[category] += 1
+        self._by_domain[urlparse(request.url).hostname or ""] += 1
+        await route.abort("blockedbyclient")
+
+    def summary(self) -> Dict[str, Any]:
+        """Blocked request counts, by category and top domains."""
+        return {
+            "total": sum(self._by_category.values()),
+            "by_category": dict(self._by_category),
+            "top_domains": [domain for domain, _ in self._by_domain.most_common(10)],
+        }
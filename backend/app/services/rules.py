@@ -0,0 +1,233 @@
+"""
+Deterministic checks for the mechanically verifiable parts of the analysis.
+
+Some criteria in the system prompt need no judgement: whether the page is
+served over HTTPS, shows contact details and links its legal notices, how
+many fields its forms have, how long it took to load, how long its headline
+is. These checks run locally on the scraped page in milliseconds. They give
+an instant provisional score for their categories while the model is still
+writing. Their results are also passed to the model, so it does not have to
+re-derive them.
+"""
+
+import re
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Pattern, Union
+from urllib.parse import urlsplit
+
+from app.services.artifacts import Artifact, iter_text
+from app.services.scraper import ScrapedPage
+
+CATEGORY_LABELS = {
+    "headline": "Headline",
+    "form": "Form",
+    "trust": "Trust",
+    "speed": "Performance",
+}
+
+# Points a provisional category score loses per failed check
+SEVERITY_PENALTY = {"critical": 40, "warning": 15, "info": 5}
+
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_PHONE = re.compile(r"(?<![\w.])\+?\d[\d .()-]{7,}\d(?![\w.])")
+_CONTACT_LINK = re.compile(r"""href\s*=\s*["'](?:mailto:|tel:|[^"']*contact)""", re.IGNORECASE)
+_LEGAL_LINK = re.compile(
+    r"""href\s*=\s*["'][^"']*(?:privacy|terms|legal|imprint|impressum|mentions|cgv|cgu|"""
+    r"""datenschutz|confidentialite|rgpd|gdpr|cookie)""",
+    re.IGNORECASE,
+)
+_GENERIC_SUBMIT = frozenset({"submit", "send", "ok", "go", "envoyer", "valider", "absenden", "senden"})
+
+
+@dataclass
+class Finding:
+    """The result of one check."""
+    category: str
+    check: str
+    passed: bool
+    severity: str  # How serious a failure is: critical, warning or info
+    title: str
+    detail: str
+
+
+@dataclass
+class RuleReport:
+    """All findings for a page, with provisional scores for the categories checked."""
+    findings: List[Finding]
+
+    @property
+    def scores(self) -> Dict[str, int]:
+        scores = {}
+        for finding in self.findings:
+            penalty = 0 if finding.passed else SEVERITY_PENALTY[finding.severity]
+            scores[finding.category] = max(0, scores.get(finding.category, 100) - penalty)
+        return scores
+
+    def preview(self) -> List[Dict[str, Any]]:
+        """Provisional report categories, shaped like the model's."""
+        scores = self.scores
+        return [
+            {
+                "name": name,
+                "label": CATEGORY_LABELS[name],
+                "score": scores[name],
+                "issues": [
+                    {
+                        "severity": f.severity,
+                        "title": f.title,
+                        "description": f.detail,
+                        "recommendation": "",
+                    }
+                    for f in self.findings
+                    if f.category == name and not f.passed
+                ],
+            }
+            for name in CATEGORY_LABELS
+            if name in scores
+        ]
+
+    def to_prompt(self) -> str:
+        """The findings as prompt lines."""
+        if not self.findings:
+            return "None"
+        return "\n".join(
+            f"- [{f.category}] {'PASS' if f.passed else 'FAIL (' + f.severity + ')'}: {f.title} - {f.detail}"
+            for f in self.findings
+        )
+
+    def summary(self) -> Dict[str, bool]:
+        """Check -> passed, e.g. for cache keys."""
+        return {f"{f.category}.{f.check}": f.passed for f in self.findings}
+
+    def to_dict(self) -> List[Dict[str, Any]]:
+        return [asdict(f) for f in self.findings]
+
+
+def evaluate(scraped: ScrapedPage) -> RuleReport:
+    """Run every check on a scraped page."""
+    digest = scraped.dom_digest or {}
+    findings = (
+        check_trust(scraped.final_url or scraped.url, scraped.html, scraped.text_content)
+        + check_forms(digest.get("forms") or [])
+        + check_speed(scraped.load_time_ms, scraped.performance or {})
+        + check_headline(digest.get("headings"))
+    )
+    return RuleReport(findings)
+
+
+def _found(pattern: Pattern[str], value: Union[str, Artifact, None]) -> bool:
+    # A spilled page is scanned a window at a time rather than read back whole;
+    # its legal and contact links are usually in the footer
+    return any(pattern.search(window) for window in iter_text(value))
+
+
+def check_trust(url: str, html: Union[str, Artifact, None], text: Union[str, Artifact, None]) -> List[Finding]:
+    """HTTPS, visible contact details and legal notices."""
+    https = urlsplit(url).scheme == "https"
+    contact = _found(_EMAIL, text) or _found(_PHONE, text) or _found(_CONTACT_LINK, html)
+    legal = _found(_LEGAL_LINK, html)
+    return [
+        Finding(
+            "trust", "https", https, "critical",
+            "Served over HTTPS" if https else "Page is not served over HTTPS",
+            "The final URL uses https." if https else "Browsers flag the page as not secure.",
+        ),
+        Finding(
+            "trust", "contact", contact, "warning",
+            "Contact information found" if contact else "No contact information",
+            "An email, phone number or contact link is present." if contact
+            else "No email address, phone number or contact link was found.",
+        ),
+        Finding(
+            "trust", "legal", legal, "warning",
+            "Legal notices linked" if legal else "No legal notices linked",
+            "Links to privacy, terms or legal pages are present." if legal
+            else "No link to a privacy policy, terms or legal notice was found.",
+        ),
+    ]
+
+
+def check_forms(forms: List[Dict[str, Any]]) -> List[Finding]:
+    """Field count, labels, required markers and submit text of the main form."""
+    forms = [form for form in forms if form.get("fields")]
+    if not forms:
+        return []
+    # The form with the most fields is the one visitors are asked to fill in
+    form = max(forms, key=lambda f: len(f["fields"]))
+    fields = form["fields"]
+    count = len(fields)
+    unlabeled = sum(1 for field in fields if not field.get("label"))
+    required = any(field.get("required") for field in fields)
+    submit = (form.get("submit") or "").strip()
+    specific_submit = bool(submit) and submit.lower() not in _GENERIC_SUBMIT
+
+    return [
+        Finding(
+            "form", "field_count", count < 5, "critical" if count > 8 else "warning",
+            f"{count} form fields",
+            "Fewer than 5 fields." if count < 5 else "Each field past the fourth costs completions.",
+        ),
+        Finding(
+            "form", "labels", unlabeled == 0, "warning",
+            "All fields labeled" if unlabeled == 0 else f"{unlabeled} of {count} fields have no label",
+            "Every field has a label." if unlabeled == 0 else "Visitors cannot tell what to enter.",
+        ),
+        Finding(
+            "form", "required_markers", required or count == 1, "info",
+            "Required fields marked" if required or count == 1 else "Required fields not marked",
+            "Required fields are indicated." if required or count == 1
+            else "No field is marked as required.",
+        ),
+        Finding(
+            "form", "submit_text", specific_submit, "info",
+            f"Submit button says \"{submit}\"" if submit else "No submit button text",
+            "The button states the action." if specific_submit
+            else "A generic or missing label does not say what happens next.",
+        ),
+    ]
+
+
+def check_speed(load_time_ms: Optional[int], performance: Dict[str, Any]) -> List[Finding]:
+    """Load time and image weight."""
+    findings = []
+    if load_time_ms:
+        seconds = load_time_ms / 1000
+        findings.append(Finding(
+            "speed", "load_time", load_time_ms <= 3000, "critical" if load_time_ms > 6000 else "warning",
+            f"Loaded in {seconds:.1f}s",
+            "Under 3 seconds." if load_time_ms <= 3000 else "Over the 3 second target.",
+        ))
+    image_bytes = (performance.get("bytes_by_type") or {}).get("image")
+    if image_bytes:
+        mb = image_bytes / 1_000_000
+        findings.append(Finding(
+            "speed", "image_weight", mb <= 1, "critical" if mb > 3 else "warning",
+            f"{mb:.1f} MB of images",
+            "Images are light." if mb <= 1 else "Images over 1 MB slow the first visit.",
+        ))
+    return findings
+
+
+def check_headline(headings: Optional[List[Dict[str, Any]]]) -> List[Finding]:
+    """A single H1 of 6-12 words."""
+    if headings is None:
+        return []
+    h1s = [h for h in headings if h.get("level") == 1 and h.get("text")]
+    if not h1s:
+        return [Finding("headline", "h1", False, "critical", "No H1 headline", "The page has no visible H1.")]
+
+    words = len(h1s[0]["text"].split())
+    good_length = 6 <= words <= 12
+    findings = [
+        Finding(
+            "headline", "length", good_length, "warning" if words > 15 or words < 3 else "info",
+            f"Headline has {words} words",
+            "Within 6-12 words." if good_length else "Outside the 6-12 word range.",
+        ),
+    ]
+    if len(h1s) > 1:
+        findings.append(Finding(
+            "headline", "single_h1", False, "info",
+            f"{len(h1s)} H1 headings", "More than one H1 dilutes the main message.",
+        ))
+    return findings
@@ -0,0 +1,159 @@
+"""
+Scrape result cache.
+
+Stores scrape artifacts in Redis keyed by a normalized URL so repeated
+analyses of an unchanged page skip the browser entirely. Entries carry the
+HTTP validators seen when they were stored (ETag, Last-Modified, body hash)
+and the scraper revalidates them against the origin before reuse.
+"""
+
+import dataclasses
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Type, TypeVar
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from app.config import settings
+from app.core.logging import get_logger
+from app.core.redis import get_redis
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+KEY_PREFIX = "scrape_cache:"
+STATS_KEY = "scrape_cache:stats"
+
+# Click IDs and analytics parameters that never change the page content.
+# Generic names such as "ref" are kept: some sites route on them.
+TRACKING_PARAMS = frozenset({
+    "gclid", "gbraid", "wbraid", "dclid", "fbclid", "msclkid", "yclid",
+    "twclid", "ttclid", "li_fat_id", "igshid", "mc_cid", "mc_eid",
+    "_ga", "_gl", "_hsenc", "_hsmi", "ref_src",
+})
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalize a URL for cache lookups.
+
+    Lowercases scheme and host, drops default ports, fragments, tracking
+    parameters and trailing slashes, and sorts the remaining query string.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path.rstrip("/") or "/"
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith("utm_")
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+def cache_key(url: str, variant: str = "") -> str:
+    """Redis key for a URL (and scrape variant, e.g. the scrape mode)."""
+    digest = hashlib.sha256(f"{normalize_url(url)}|{variant}".encode()).hexdigest()
+    return f"{KEY_PREFIX}{digest}"
+
+
+@dataclass
+class CacheEntry:
+    """A cached scrape and the validators to check it against."""
+    value: Any
+    validators: Dict[str, Optional[str]]
+    size: int
+
+
+def _pack(value: Any) -> Dict[str, Any]:
+    """Split a dataclass into a JSON field map and raw byte blobs."""
+    fields: Dict[str, Any] = {}
+    mapping: Dict[str, Any] = {}
+    for field in dataclasses.fields(value):
+        attr = getattr(value, field.name)
+        if isinstance(attr, bytes):
+            mapping[f"blob:{field.name}"] = attr
+        else:
+            fields[field.name] = attr
+    mapping["fields"] = json.dumps(fields)
+    return mapping
+
+
+def _unpack(cls: Type[T], mapping: Dict[bytes, bytes]) -> T:
+    fields = json.loads(mapping[b"fields"])
+    for key, blob in mapping.items():
+        if key.startswith(b"blob:"):
+            fields[key[5:].decode()] = blob
+    return cls(**fields)
+
+
+async def load(key: str, cls: Type[T]) -> Optional[CacheEntry]:
+    """Load a cached entry, or None if missing or unreadable."""
+    try:
+        mapping = await get_redis().hgetall(key)
+        if not mapping:
+            return None
+        return CacheEntry(
+            value=_unpack(cls, mapping),
+            validators=json.loads(mapping.get(b"validators", b"{}")),
+            size=sum(len(v) for v in mapping.values()),
+        )
+    except Exception as e:
+        logger.warning("scrape_cache_load_failed", error=str(e))
+        return None
+
+
+async def store(key: str, value: Any, validators: Dict[str, Optional[str]]) -> None:
+    """Store a dataclass value with its validators for SCRAPE_CACHE_TTL seconds."""
+    mapping = _pack(value)
+    mapping["validators"] = json.dumps(validators)
+    try:
+        redis = get_redis()
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            pipe.hset(key, mapping=mapping)
+            pipe.expire(key, settings.SCRAPE_CACHE_TTL)
+            await pipe.execute()
+    except Exception as e:
+        logger.warning("scrape_cache_store_failed", error=str(e))
+
+
+async def record_hit(entry: CacheEntry) -> None:
+    """Count a cache hit and the bytes it saved."""
+    try:
+        redis = get_redis()
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.hincrby(STATS_KEY, "hits", 1)
+            pipe.hincrby(STATS_KEY, "bytes_saved", entry.size)
+            await pipe.execute()
+    except Exception as e:
+        logger.warning("scrape_cache_stats_failed", error=str(e))
+
+
+async def record_miss(reason: str) -> None:
+    """Count a cache miss (reason: "absent" or "stale")."""
+    try:
+        redis = get_redis()
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.hincrby(STATS_KEY, "misses", 1)
+            pipe.hincrby(STATS_KEY, f"misses_{reason}", 1)
+            await pipe.execute()
+    except Exception as e:
+        logger.warning("scrape_cache_stats_failed", error=str(e))
+
+
+async def get_stats() -> Dict[str, Any]:
+    """Hit/miss counters, hit ratio and bytes saved since the stats were reset."""
+    raw = await get_redis().hgetall(STATS_KEY)
+    stats = {key.decode(): int(value) for key, value in raw.items()}
+    hits = stats.get("hits", 0)
+    misses = stats.get("misses", 0)
+    stats["hit_ratio"] = round(hits / (hits + misses), 3) if hits + misses else 0.0
+    return stats
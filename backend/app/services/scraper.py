@@ -4,15 +4,33 @@ Captures HTML content and screenshots of landing pages.
 """
 
 import asyncio
-from dataclasses import dataclass
-from typing import Optional
+import hashlib
+import re
+import socket
+import time
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass, field, replace
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple, Union
 from urllib.parse import urlparse
 
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
+import httpx
+from playwright.async_api import BrowserContext, Page
+from playwright.async_api import TimeoutError as PlaywrightTimeout
 
 from app.config import settings
+from app.core.deadline import remaining_budget
 from app.core.errors import AppError
 from app.core.logging import get_logger
+from app.services import scrape_cache
+from app.services.artifacts import Artifact, ArtifactStore
+from app.services.browser_pool import PooledBrowser, get_browser_pool
+from app.services.domain_scheduler import domain_slot, registrable_domain
+from app.services.page_performance import collect_metrics, install_observers
+from app.services.page_readiness import navigate
+from app.services.page_scripts import DOM_DIGEST_SCRIPT, EXTRACT_SCRIPT, MOBILE_CHECKS_SCRIPT
+from app.services.request_blocker import RequestBlocker
+from app.services.screenshot import Screenshots, capture_screenshots
+from app.services.static_scraper import is_representative, parse_static
 
 logger = get_logger(__name__)
 
@@ -24,6 +42,14 @@ USER_AGENT = (
     "AppleWebKit/537.36 (KHTML, like Gecko) "
     "Chrome/121.0.0.0 Safari/537.36"
 )
+MOBILE_VIEWPORT_WIDTH = 390
+MOBILE_VIEWPORT_HEIGHT = 844
+MOBILE_USER_AGENT = (
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_2 like Mac OS X) "
+    "AppleWebKit/605.1.15 (KHTML, like Gecko) "
+    "Version/17.2 Mobile/15E148 Safari/604.1"
+)
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
 
 
 class ScrapingError(AppError):
@@ -53,6 +79,34 @@ class PageBlockedError(ScrapingError):
         super().__init__(message="Access denied (403)", code="PAGE_BLOCKED")
 
 
+@dataclass
+class PreflightResult:
+    """Outcome of the HTTP probe made before launching a browser."""
+    final_url: str
+    status: int
+    content_type: str
+    redirects: int
+    elapsed_ms: int
+    not_modified: bool = False
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+    html: Optional[str] = field(default=None, repr=False)
+
+    @property
+    def validators(self) -> Dict[str, Optional[str]]:
+        """Validators used to revalidate a cached scrape of this page."""
+        return {
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "content_hash": self.content_hash,
+        }
+
+
+# ScrapedPage fields large enough to be worth keeping out of memory
+SPILLABLE_FIELDS = ("html", "text_content", "screenshot", "fold_screenshot", "mobile_screenshot")
+
+
 @dataclass
 class ScrapedPage:
     """Result of a page scrape."""
@@ -60,14 +114,36 @@ class ScrapedPage:
     final_url: str
     title: str
     meta_description: Optional[str]
-    html: str
-    text_content: str
-    screenshot: bytes
-    load_time_ms: int
+    html: Union[str, Artifact]
+    text_content: Union[str, Artifact]
+    screenshot: Union[bytes, Artifact]
+    load_time_ms: Optional[int]  # None until a browser has loaded the page
     word_count: int
     image_count: int
     link_count: int
     has_form: bool
+    scrape_mode: str = "full"
+    blocked_requests: Dict[str, Any] = field(default_factory=dict)
+    screenshot_content_type: str = "image/png"
+    fold_screenshot: Optional[Union[bytes, Artifact]] = None
+    readiness: Dict[str, Any] = field(default_factory=dict)
+    mobile: Optional[Dict[str, Any]] = None
+    mobile_screenshot: Optional[Union[bytes, Artifact]] = None
+    performance: Dict[str, Any] = field(default_factory=dict)
+    dom_digest: Dict[str, Any] = field(default_factory=dict)
+    engine: str = "browser"  # "static" pages have no screenshot until capture_deferred()
+
+    def spill(self, store: ArtifactStore) -> None:
+        """
+        Move the large fields into an artifact store.
+
+        Spilled fields hold Artifacts; read them with artifacts.read_text()
+        and read_bytes(). Fields already spilled are left alone.
+        """
+        for name in SPILLABLE_FIELDS:
+            value = getattr(self, name)
+            if isinstance(value, (str, bytes)) and value:
+                setattr(self, name, store.put(name, value))
 
 
 def _extract_domain(url: str) -> str:
@@ -76,12 +152,178 @@ def _extract_domain(url: str) -> str:
     return parsed.netloc
 
 
-async def scrape_page(url: str) -> ScrapedPage:
+def _is_bot_challenge(response: httpx.Response) -> bool:
+    """Whether an error response is a CDN bot check that a real browser may pass."""
+    if response.headers.get("cf-mitigated") == "challenge":
+        return True
+    server = response.headers.get("server", "").lower()
+    return response.status_code in (403, 429, 503) and any(
+        name in server for name in ("cloudflare", "akamaighost", "ddos-guard", "sucuri")
+    )
+
+
+def _is_dns_failure(error: BaseException) -> bool:
+    """Whether a connection error was caused by the host not resolving."""
+    while error is not None:
+        if isinstance(error, socket.gaierror):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+async def _read_body(response: httpx.Response) -> Optional[bytes]:
+    """The response body, or None if it exceeds the read limit."""
+    chunks = []
+    size = 0
+    async for chunk in response.aiter_bytes():
+        size += len(chunk)
+        if size > settings.SCRAPER_PREFLIGHT_MAX_BYTES:
+            return None
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def preflight(
+    url: str,
+    validators: Optional[Dict[str, Optional[str]]] = None,
+) -> Optional[PreflightResult]:
+    """
+    Probe a URL over plain HTTP before paying for a browser navigation.
+
+    Connects to the host, follows redirects and checks the final status and
+    content type. The HTML body is read when the scrape cache (to revalidate
+    cached scrapes by content hash) or the static engine needs it.
+
+    Args:
+        url: The URL to probe
+        validators: ETag/Last-Modified of a cached scrape, sent as
+            conditional request headers
+
+    Returns:
+        PreflightResult, or None if the probe was inconclusive (timeout,
+        CDN bot challenge, any 4xx) and the browser should decide
+
+    Raises:
+        ScrapingError: If the URL is malformed, the host does not resolve,
+            refuses connections, returns a server error or is not an HTML
+            page
+    """
+    domain = _extract_domain(url)
+    hostname = urlparse(url).hostname
+    start = time.monotonic()
+
+    headers = {}
+    if validators and validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators and validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+
+    try:
+        async with httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=remaining_budget(settings.SCRAPER_PREFLIGHT_TIMEOUT),
+            headers={"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml,*/*;q=0.8"},
+        ) as client:
+            async with client.stream("GET", url, headers=headers) as response:
+                result = PreflightResult(
+                    final_url=str(response.url),
+                    status=response.status_code,
+                    content_type=response.headers.get("content-type", ""),
+                    redirects=len(response.history),
+                    elapsed_ms=int((time.monotonic() - start) * 1000),
+                    not_modified=response.status_code == 304,
+                    etag=response.headers.get("etag"),
+                    last_modified=response.headers.get("last-modified"),
+                )
+                bot_challenge = _is_bot_challenge(response)
+                if response.status_code == 200 and (
+                    settings.SCRAPE_CACHE_ENABLED or settings.SCRAPER_STATIC_ENABLED
+                ):
+                    body = await _read_body(response)
+                    if body is not None:
+                        result.content_hash = hashlib.sha256(body).hexdigest()
+                        try:
+                            result.html = body.decode(response.encoding or "utf-8", errors="replace")
+                        except LookupError:
+                            result.html = body.decode("utf-8", errors="replace")
+    except httpx.ConnectError as e:
+        logger.warning("preflight_connect_failed", url_domain=domain, error=str(e))
+        if _is_dns_failure(e):
+            raise ScrapingError(f"Could not resolve host {hostname}", code="PAGE_UNREACHABLE")
+        raise ScrapingError(f"Could not connect to {hostname}", code="PAGE_UNREACHABLE")
+    except httpx.HTTPError as e:
+        logger.info("preflight_inconclusive", url_domain=domain, error=str(e))
+        return None
+    except (httpx.InvalidURL, UnicodeError) as e:
+        # Malformed host or characters the validator let through (e.g. a bad IDNA label)
+        logger.info("preflight_invalid_url", url_domain=domain, error=str(e))
+        raise ScrapingError(f"Invalid URL: {e}", code="INVALID_URL")
+
+    logger.info(
+        "preflight_completed",
+        url_domain=domain,
+        status=result.status,
+        redirects=result.redirects,
+        elapsed_ms=result.elapsed_ms,
+    )
+
+    if result.not_modified:
+        return result
+    if result.status >= 400 and bot_challenge:
+        logger.info("preflight_bot_challenge", url_domain=domain, status=result.status)
+        return None
+    if 400 <= result.status < 500:
+        # WAFs and bot filters answer plain HTTP clients with 403s, 404s and
+        # the like that a real browser may get past: let the browser decide
+        logger.info("preflight_client_error", url_domain=domain, status=result.status)
+        return None
+    if result.status >= 400:
+        raise ScrapingError(f"Page returned error status {result.status}")
+
+    mime_type = result.content_type.split(";")[0].strip().lower()
+    if mime_type and mime_type not in HTML_CONTENT_TYPES:
+        raise ScrapingError(
+            f"URL is not an HTML page ({mime_type})",
+            code="NOT_HTML",
+        )
+
+    return result
+
+
+def _cache_is_fresh(entry: scrape_cache.CacheEntry, probe: Optional[PreflightResult]) -> bool:
+    """Whether a cached scrape still matches what the origin serves."""
+    if probe is None:
+        # Without a preflight there is nothing to revalidate against
+        return not settings.SCRAPER_PREFLIGHT_ENABLED
+    if probe.not_modified:
+        return True
+    cached = entry.validators
+    if probe.etag and probe.etag == cached.get("etag"):
+        return True
+    return bool(probe.content_hash and probe.content_hash == cached.get("content_hash"))
+
+
+async def scrape_page(
+    url: str,
+    mode: Optional[str] = None,
+    use_cache: bool = True,
+    browser: Optional[PooledBrowser] = None,
+) -> ScrapedPage:
     """
     Scrape a landing page and capture its content.
+
+    Server-rendered pages whose preflight HTML is representative skip the
+    browser and come back with engine="static" and no screenshots; pass
+    them to capture_deferred() once the text is on its way to analysis.
     
     Args:
         url: The URL to scrape (must be valid HTTP/HTTPS)
+        mode: "fast" blocks trackers, ads, chat widgets, media and fonts;
+            "full" loads every resource. Defaults to settings.SCRAPER_MODE.
+        use_cache: Reuse a cached scrape of the same normalized URL if the
+            origin confirms it is unchanged
+        browser: A leased browser to render in (see scrape_many); one is
+            leased from the pool by default
         
     Returns:
         ScrapedPage with all extracted data
@@ -90,144 +332,476 @@ async def scrape_page(url: str) -> ScrapedPage:
         PageNotFoundError: If page returns 404
         PageTimeoutError: If page takes too long to load
         PageBlockedError: If access is denied
+        DomainBusyError: If the target domain has no free scrape slot
         ScrapingError: For other scraping failures
     """
     domain = _extract_domain(url)
-    logger.info("scraping_started", url_domain=domain)
-    
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        
+    mode = mode or settings.SCRAPER_MODE
+    logger.info("scraping_started", url_domain=domain, mode=mode)
+
+    key = None
+    cached = None
+    if use_cache and settings.SCRAPE_CACHE_ENABLED:
+        key = scrape_cache.cache_key(url, variant=mode)
+        cached = await scrape_cache.load(key, ScrapedPage)
+
+    # Hold a per-domain slot for every request that reaches the origin
+    async with domain_slot(url):
+        # Fail fast on unreachable hosts and server errors, and skip redirect hops in the browser
+        probe = None
+        if settings.SCRAPER_PREFLIGHT_ENABLED:
+            probe = await preflight(url, validators=cached.validators if cached else None)
+
+        if cached is not None:
+            if _cache_is_fresh(cached, probe):
+                await scrape_cache.record_hit(cached)
+                logger.info("scrape_cache_hit", url_domain=domain, bytes_saved=cached.size)
+                return replace(cached.value, url=url)
+            await scrape_cache.record_miss("stale")
+        elif key is not None:
+            await scrape_cache.record_miss("absent")
+
+        scraped = None
+        if probe is not None:
+            scraped = await asyncio.to_thread(_scrape_static, url, probe, mode)
+        if scraped is None:
+            target_url = probe.final_url if probe is not None else url
+            scraped = await _scrape_with_browser(url, target_url, mode, browser)
+
+    # Scrapes that skipped their screenshots for the deadline are not reused
+    if key is not None and (scraped.screenshot or scraped.engine == "static"):
+        await scrape_cache.store(key, scraped, probe.validators if probe else {})
+
+    return scraped
+
+
+@dataclass
+class BatchScrapeResult:
+    """Outcome of one URL of a scrape_many() batch."""
+    url: str
+    page: Optional[ScrapedPage] = None
+    error: Optional[AppError] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+async def scrape_many(
+    urls: Iterable[str],
+    concurrency: Optional[int] = None,
+    mode: Optional[str] = None,
+    use_cache: bool = True,
+) -> AsyncIterator[BatchScrapeResult]:
+    """
+    Scrape several pages on one leased browser, yielding each as it completes.
+
+    Each URL goes through the same pipeline as scrape_page (cache, preflight,
+    domain slot, static engine) and renders in its own context of the shared
+    browser. URLs of one domain queue within the batch, up to the domain's
+    slot limit at a time, without taking a render slot from other domains.
+    A failing URL yields a result with its error and does not affect the
+    others. Stopping the iteration early cancels the remaining scrapes.
+
+    Args:
+        urls: Pages to scrape
+        concurrency: Pages rendered at once (defaults to
+            settings.SCRAPER_BATCH_CONCURRENCY); each may open a second
+            context for the mobile capture
+        mode: Scrape mode, as for scrape_page
+        use_cache: As for scrape_page
+
+    Yields:
+        BatchScrapeResult per URL, in completion order
+    """
+    urls = list(urls)
+    concurrency = concurrency or settings.SCRAPER_BATCH_CONCURRENCY
+    semaphore = asyncio.Semaphore(concurrency)
+    # The batch's own share of the per-domain limit, so its URLs of one domain
+    # wait here rather than each spending its domain_slot wait in turn
+    domains: Dict[str, asyncio.Semaphore] = {}
+    for url in urls:
+        domain = registrable_domain(urlparse(url).hostname or "")
+        domains.setdefault(domain, asyncio.Semaphore(settings.SCRAPER_DOMAIN_MAX_CONCURRENCY))
+    logger.info("batch_scrape_started", urls=len(urls), concurrency=concurrency, domains=len(domains))
+
+    async with get_browser_pool().lease() as browser:
+
+        async def scrape_one(url: str) -> BatchScrapeResult:
+            domain_semaphore = domains[registrable_domain(urlparse(url).hostname or "")]
+            async with domain_semaphore, semaphore:
+                try:
+                    page = await scrape_page(url, mode=mode, use_cache=use_cache, browser=browser)
+                    return BatchScrapeResult(url=url, page=page)
+                except AppError as e:
+                    return BatchScrapeResult(url=url, error=e)
+                except Exception as e:
+                    logger.error("batch_scrape_error", url_domain=_extract_domain(url), error=str(e))
+                    return BatchScrapeResult(url=url, error=ScrapingError(f"Failed to scrape page: {e}"))
+
+        tasks = [asyncio.create_task(scrape_one(url)) for url in urls]
+        failed = 0
         try:
-            context = await browser.new_context(
-                viewport={"width": VIEWPORT_WIDTH, "height": VIEWPORT_HEIGHT},
-                user_agent=USER_AGENT,
+            for completed in asyncio.as_completed(tasks):
+                result = await completed
+                failed += not result.ok
+                yield result
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            logger.info("batch_scrape_completed", urls=len(urls), failed=failed)
+
+
+def _scrape_static(url: str, probe: PreflightResult, mode: str) -> Optional[ScrapedPage]:
+    """
+    Build the scrape from the preflight HTML when it represents the page.
+
+    Returns:
+        A ScrapedPage without screenshots (see capture_deferred), or None if
+        the page needs a browser to render
+    """
+    if not settings.SCRAPER_STATIC_ENABLED or not probe.html:
+        return None
+
+    domain = _extract_domain(url)
+    static = parse_static(probe.html)
+    representative, reason = is_representative(static)
+    if not representative:
+        logger.info("static_scrape_rejected", url_domain=domain, reason=reason)
+        return None
+
+    logger.info(
+        "scraping_completed",
+        url_domain=domain,
+        engine="static",
+        preflight_ms=probe.elapsed_ms,
+        word_count=static.word_count,
+    )
+    return ScrapedPage(
+        url=url,
+        final_url=probe.final_url,
+        title=static.title,
+        meta_description=static.meta_description,
+        html=probe.html,
+        text_content=static.text,
+        screenshot=b"",
+        load_time_ms=None,  # The preflight time is not a page load; see capture_deferred()
+        word_count=static.word_count,
+        image_count=static.image_count,
+        link_count=static.link_count,
+        has_form=static.has_form,
+        scrape_mode=mode,
+        dom_digest=static.dom_digest,
+        engine="static",
+    )
+
+
+async def capture_deferred(scraped: ScrapedPage) -> ScrapedPage:
+    """
+    Add the browser-only artifacts to a static scrape.
+
+    Renders the page to take its screenshots, load time, performance metrics
+    and mobile rendering, keeping the static text the analysis already used.
+    Run it alongside the analysis rather than before it.
+
+    Returns:
+        The scrape with screenshots filled in, or unchanged if the capture
+        failed — a missing screenshot never fails the analysis
+    """
+    domain = _extract_domain(scraped.url)
+    try:
+        async with domain_slot(scraped.url):
+            rendered = await _scrape_with_browser(
+                scraped.url, scraped.final_url, scraped.scrape_mode
             )
-            page = await context.new_page()
-            
-            # Track load time
-            start_time = asyncio.get_event_loop().time()
-            
+    except Exception as e:
+        logger.warning("deferred_capture_failed", url_domain=domain, error=str(e))
+        return scraped
+
+    return replace(
+        scraped,
+        screenshot=rendered.screenshot,
+        screenshot_content_type=rendered.screenshot_content_type,
+        fold_screenshot=rendered.fold_screenshot,
+        blocked_requests=rendered.blocked_requests,
+        readiness=rendered.readiness,
+        load_time_ms=rendered.load_time_ms,
+        performance=rendered.performance,
+        mobile=rendered.mobile,
+        mobile_screenshot=rendered.mobile_screenshot,
+    )
+
+
+@asynccontextmanager
+async def _open_context(
+    browser: PooledBrowser,
+    mode: str,
+    **kwargs: Any,
+) -> AsyncIterator[Tuple[BrowserContext, Optional[RequestBlocker]]]:
+    """Open an isolated context on a leased browser, with request blocking in fast mode."""
+    context = await browser.new_context(**kwargs)
+    try:
+        blocker = None
+        if mode == "fast":
+            blocker = RequestBlocker()
+            await blocker.install(context)
+        yield context, blocker
+    finally:
+        await context.close()
+
+
+@asynccontextmanager
+async def _use_browser(browser: Optional[PooledBrowser]) -> AsyncIterator[PooledBrowser]:
+    """Yield the caller's browser, or lease one from the pool."""
+    if browser is not None:
+        yield browser
+        return
+    async with get_browser_pool().lease() as leased:
+        yield leased
+
+
+async def _scrape_with_browser(
+    url: str,
+    target_url: str,
+    mode: str,
+    browser: Optional[PooledBrowser] = None,
+) -> ScrapedPage:
+    """
+    Render the page in a pooled browser and extract its content.
+
+    The mobile capture runs concurrently with the desktop one, in its own
+    context on the same browser, so it adds little to the scrape time.
+    Pass browser to reuse a lease the caller already holds.
+    """
+    domain = _extract_domain(url)
+    pool = get_browser_pool()
+
+    try:
+        async with _use_browser(browser) as browser:
+            mobile_task = None
+            if settings.SCRAPER_CAPTURE_MOBILE and _has_time_for_screenshots():
+                mobile_task = asyncio.create_task(_capture_mobile(browser, target_url, mode))
+
             try:
-                response = await page.goto(
-                    url,
-                    wait_until="networkidle",
-                    timeout=settings.PLAYWRIGHT_TIMEOUT,
-                )
-            except PlaywrightTimeout:
-                logger.warning("scraping_timeout", url_domain=domain)
-                raise PageTimeoutError()
-            
-            load_time_ms = int((asyncio.get_event_loop().time() - start_time) * 1000)
-            
-            # Check response status
-            if response is None:
-                raise ScrapingError("No response received from page")
-            
-            status = response.status
-            if status == 404:
-                raise PageNotFoundError()
-            elif status == 403:
-                raise PageBlockedError()
-            elif status >= 400:
-                raise ScrapingError(f"Page returned error status {status}")
-            
-            # Extract data
-            final_url = page.url
-            title = await page.title() or ""
-            
-            # Meta description
-            meta_description = await page.evaluate("""
-                () => {
-                    const meta = document.querySelector('meta[name="description"]');
-                    return meta ? meta.getAttribute('content') : null;
-                }
-            """)
-            
-            # HTML content
-            html = await page.content()
-            
-            # Text content (visible text only)
-            text_content = await page.evaluate("""
-                () => {
-                    return document.body ? document.body.innerText : '';
-                }
-            """)
-            
-            # Statistics
-            stats = await page.evaluate("""
-                () => {
-                    const text = document.body ? document.body.innerText : '';
-                    const words = text.split(/\\s+/).filter(w => w.length > 0);
-                    const images = document.querySelectorAll('img');
-                    const links = document.querySelectorAll('a');
-                    const forms = document.querySelectorAll('form');
-                    
-                    return {
-                        wordCount: words.length,
-                        imageCount: images.length,
-                        linkCount: links.length,
-                        hasForm: forms.length > 0
-                    };
-                }
-            """)
-            
-            # Screenshot
-            screenshot = await page.screenshot(
-                full_page=True,
-                type="png",
-            )
-            
-            logger.info(
-                "scraping_completed",
-                url_domain=domain,
-                load_time_ms=load_time_ms,
-                word_count=stats["wordCount"],
-            )
-            
-            return ScrapedPage(
-                url=url,
-                final_url=final_url,
-                title=title,
-                meta_description=meta_description,
-                html=html,
-                text_content=text_content,
-                screenshot=screenshot,
-                load_time_ms=load_time_ms,
-                word_count=stats["wordCount"],
-                image_count=stats["imageCount"],
-                link_count=stats["linkCount"],
-                has_form=stats["hasForm"],
-            )
-            
-        except (PageNotFoundError, PageTimeoutError, PageBlockedError):
-            raise
-        except Exception as e:
-            logger.error("scraping_error", url_domain=domain, error=str(e))
-            raise ScrapingError(f"Failed to scrape page: {str(e)}")
-        finally:
-            await browser.close()
+                scraped = await _capture_desktop(browser, url, target_url, mode)
+            except BaseException:
+                # Do not hand the browser back while the mobile context is still open
+                if mobile_task is not None:
+                    mobile_task.cancel()
+                    await asyncio.gather(mobile_task, return_exceptions=True)
+                raise
+
+            if mobile_task is not None:
+                mobile = await mobile_task
+                if mobile is not None:
+                    scraped.mobile, scraped.mobile_screenshot = mobile
+
+            return scraped
+
+    except (PageNotFoundError, PageTimeoutError, PageBlockedError):
+        raise
+    except Exception as e:
+        logger.error("scraping_error", url_domain=domain, error=str(e))
+        raise ScrapingError(f"Failed to scrape page: {str(e)}")
+    finally:
+        logger.info("browser_pool_stats", **asdict(pool.stats()))
+
+
+async def _capture_desktop(
+    browser: PooledBrowser,
+    url: str,
+    target_url: str,
+    mode: str,
+) -> ScrapedPage:
+    """Load the page at desktop size and extract content, stats and screenshots."""
+    domain = _extract_domain(url)
+
+    async with _open_context(
+        browser,
+        mode,
+        viewport={"width": VIEWPORT_WIDTH, "height": VIEWPORT_HEIGHT},
+        user_agent=USER_AGENT,
+    ) as (context, blocker):
+        page = await context.new_page()
+        await install_observers(page)
+
+        try:
+            response, readiness = await navigate(page, target_url)
+        except PlaywrightTimeout:
+            logger.warning("scraping_timeout", url_domain=domain)
+            raise PageTimeoutError()
+
+        load_time_ms = readiness.load_time_ms
+
+        # Check response status
+        if response is None:
+            raise ScrapingError("No response received from page")
+
+        status = response.status
+        if status in (404, 410):
+            raise PageNotFoundError()
+        elif status in (401, 403):
+            raise PageBlockedError()
+        elif status >= 400:
+            raise ScrapingError(f"Page returned error status {status}")
+
+        # Extract everything in a single evaluate round trip
+        final_url = page.url
+        data = await page.evaluate(EXTRACT_SCRIPT)
+        dom_digest = await _collect_dom_digest(page)
+        performance = await collect_metrics(page)
+
+        # Screenshots, unless the task deadline is too close
+        if _has_time_for_screenshots():
+            screenshots = await capture_screenshots(page, data["pageHeight"])
+        else:
+            logger.warning("screenshot_skipped", url_domain=domain, reason="deadline")
+            screenshots = Screenshots(full=b"", fold=None, content_type="image/png")
+
+        blocked_requests = blocker.summary() if blocker else {}
+
+        logger.info(
+            "scraping_completed",
+            url_domain=domain,
+            load_time_ms=load_time_ms,
+            word_count=data["wordCount"],
+            blocked_requests=blocked_requests.get("total", 0),
+            lcp_ms=performance.lcp_ms,
+            transfer_bytes=performance.transfer_bytes,
+        )
+
+        return ScrapedPage(
+            url=url,
+            final_url=final_url,
+            title=data["title"],
+            meta_description=data["metaDescription"],
+            html=data["html"],
+            text_content=data["text"],
+            screenshot=screenshots.full,
+            load_time_ms=load_time_ms,
+            word_count=data["wordCount"],
+            image_count=data["imageCount"],
+            link_count=data["linkCount"],
+            has_form=data["hasForm"],
+            scrape_mode=mode,
+            blocked_requests=blocked_requests,
+            screenshot_content_type=screenshots.content_type,
+            fold_screenshot=screenshots.fold,
+            readiness=asdict(readiness),
+            performance=asdict(performance),
+            dom_digest=dom_digest,
+        )
+
+
+def _has_time_for_screenshots() -> bool:
+    """Whether the active deadline leaves room for screenshots."""
+    minimum = settings.DEADLINE_SCREENSHOT_MIN
+    return remaining_budget(minimum) >= minimum
+
+
+async def _collect_dom_digest(page: Page) -> Dict[str, Any]:
+    """Outline of headings, CTAs, forms and social proof; empty if it fails."""
+    try:
+        return await page.evaluate(DOM_DIGEST_SCRIPT)
+    except Exception as e:
+        logger.warning("dom_digest_failed", error=str(e))
+        return {}
+
+
+async def _capture_mobile(
+    browser: PooledBrowser,
+    target_url: str,
+    mode: str,
+) -> Optional[Tuple[Dict[str, Any], bytes]]:
+    """
+    Load the page in an emulated phone and collect mobile usability stats.
+
+    Returns:
+        (stats, screenshot), or None if the mobile capture failed — it never
+        fails the scrape
+    """
+    domain = _extract_domain(target_url)
+    try:
+        async with _open_context(
+            browser,
+            mode,
+            viewport={"width": MOBILE_VIEWPORT_WIDTH, "height": MOBILE_VIEWPORT_HEIGHT},
+            user_agent=MOBILE_USER_AGENT,
+            is_mobile=True,
+            has_touch=True,
+        ) as (context, _):
+            page = await context.new_page()
+            readiness = (await navigate(page, target_url))[1]
+            stats = await page.evaluate(MOBILE_CHECKS_SCRIPT)
+            stats["loadTimeMs"] = readiness.load_time_ms
+            screenshots = await capture_screenshots(page, stats["pageHeight"], fold=False)
+
+        logger.info("mobile_capture_completed", url_domain=domain, load_time_ms=readiness.load_time_ms)
+        return stats, screenshots.full
+    except Exception as e:
+        logger.warning("mobile_capture_failed", url_domain=domain, error=str(e))
+        return None
+
+
+# Start of a region summarize_html drops: a comment, <script> or <style>
+_SKIPPED_REGION = re.compile(r"<(!--|script|style)", re.IGNORECASE)
+_REGION_END = {
+    "!--": re.compile(r"-->"),
+    "script": re.compile(r"</script>", re.IGNORECASE),
+    "style": re.compile(r"</style>", re.IGNORECASE),
+}
+_WHITESPACE = re.compile(r"\s+")
 
 
 def summarize_html(html: str, max_length: int = 5000) -> str:
     """
     Create a summarized version of HTML for the LLM prompt.
-    Removes scripts, styles, and truncates if needed.
+    Removes scripts, styles, comments and excess whitespace, and truncates
+    if needed.
+
+    Works in a single forward pass and stops reading as soon as the output
+    budget is filled, so multi-megabyte pages cost no more than small ones.
     """
-    import re
-    
-    # Remove script and style tags
-    html = re.sub(r'<script[^>]*>.*?</script>', '', html, flags=re.DOTALL | re.IGNORECASE)
-    html = re.sub(r'<style[^>]*>.*?</style>', '', html, flags=re.DOTALL | re.IGNORECASE)
-    
-    # Remove comments
-    html = re.sub(r'<!--.*?-->', '', html, flags=re.DOTALL)
-    
-    # Remove excessive whitespace
-    html = re.sub(r'\s+', ' ', html)
-    
-    # Truncate if needed
-    if len(html) > max_length:
-        html = html[:max_length] + "... [truncated]"
-    
-    return html
+    out: List[str] = []
+    length = 0
+    last_space = False
+    pos = 0
+    end = len(html)
+
+    while pos < end and length <= max_length:
+        region = _SKIPPED_REGION.search(html, pos)
+        text_end = region.start() if region else end
+
+        # Copy text up to the region in windows, so a huge tail is never
+        # collapsed past the budget
+        while pos < text_end and length <= max_length:
+            window = min(text_end, pos + max(2 * (max_length - length), 1024))
+            chunk = _WHITESPACE.sub(" ", html[pos:window])
+            if last_space and chunk.startswith(" "):
+                chunk = chunk[1:]
+            if chunk:
+                out.append(chunk)
+                length += len(chunk)
+                last_space = chunk.endswith(" ")
+            pos = window
+
+        if region is None or length > max_length:
+            break
+
+        closing = _REGION_END[region.group(1).lower()].search(html, region.end())
+        if region.group(1) != "!--" and html.find(">", region.end(), closing.start() if closing else end) < 0:
+            closing = None
+        if closing is None:
+            # Unterminated: keep the opening "<" as text and move on
+            out.append("<")
+            length += 1
+            last_space = False
+            pos = region.start() + 1
+        else:
+            pos = closing.end()
+
+    summary = "".join(out)
+    if len(summary) > max_length:
+        summary = summary[:max_length] + "... [truncated]"
+    return summary
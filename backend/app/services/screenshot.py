@@ -0,0 +1,116 @@
+"""
+Screenshot capture and encoding for scraped pages.
+
+Full-page PNGs of long landing pages reach tens of megabytes. Captures are
+capped in height, encoded as JPEG or WebP and optionally downscaled, and a
+small above-the-fold image is produced alongside for report previews.
+"""
+
+import asyncio
+import io
+from dataclasses import dataclass
+from typing import Optional
+
+from PIL import Image
+from playwright.async_api import Page
+
+from app.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+CONTENT_TYPES = {
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+}
+
+EXTENSIONS = {
+    "image/png": "png",
+    "image/jpeg": "jpg",
+    "image/webp": "webp",
+}
+
+
+@dataclass
+class Screenshots:
+    """Encoded screenshots of a page."""
+    full: bytes
+    fold: Optional[bytes]
+    content_type: str
+
+
+def _reencode(data: bytes, fmt: str, quality: int, width: int) -> bytes:
+    """Downscale to width (if narrower than the image) and encode to fmt."""
+    image = Image.open(io.BytesIO(data))
+    if width and image.width > width:
+        height = round(image.height * width / image.width)
+        image = image.resize((width, height), Image.LANCZOS)
+    if fmt in ("jpeg", "webp") and image.mode != "RGB":
+        image = image.convert("RGB")
+
+    out = io.BytesIO()
+    if fmt == "png":
+        image.save(out, format="PNG", optimize=True)
+    else:
+        image.save(out, format=fmt.upper(), quality=quality)
+    return out.getvalue()
+
+
+async def capture_screenshots(page: Page, page_height: int, fold: bool = True) -> Screenshots:
+    """
+    Capture the page and its first viewport using the configured pipeline.
+
+    Args:
+        page: The loaded page
+        page_height: Full document height in CSS pixels
+        fold: Also capture the above-the-fold thumbnail
+
+    Returns:
+        Screenshots with the full-page capture and the above-the-fold thumbnail
+    """
+    fmt = settings.SCREENSHOT_FORMAT
+    if fmt not in CONTENT_TYPES:
+        logger.warning("screenshot_format_unsupported", format=fmt)
+        fmt = "png"
+    quality = settings.SCREENSHOT_QUALITY
+
+    # Playwright only encodes PNG and JPEG; WebP is converted afterwards
+    capture_type = "jpeg" if fmt == "jpeg" else "png"
+    options = {"type": capture_type, "scale": "css"}
+    if capture_type == "jpeg":
+        options["quality"] = quality
+
+    viewport = page.viewport_size or {"width": 1280, "height": 800}
+    clip = None
+    if page_height > settings.SCREENSHOT_MAX_HEIGHT:
+        clip = {
+            "x": 0,
+            "y": 0,
+            "width": viewport["width"],
+            "height": settings.SCREENSHOT_MAX_HEIGHT,
+        }
+
+    full = await page.screenshot(full_page=True, clip=clip, **options)
+    if fmt != capture_type or settings.SCREENSHOT_DOWNSCALE_WIDTH:
+        full = await asyncio.to_thread(
+            _reencode, full, fmt, quality, settings.SCREENSHOT_DOWNSCALE_WIDTH
+        )
+
+    fold_image = None
+    if fold and settings.SCREENSHOT_FOLD_WIDTH:
+        fold_image = await page.screenshot(full_page=False, **options)
+        fold_image = await asyncio.to_thread(
+            _reencode, fold_image, fmt, quality, settings.SCREENSHOT_FOLD_WIDTH
+        )
+
+    logger.info(
+        "screenshot_captured",
+        format=fmt,
+        page_height=page_height,
+        clipped=clip is not None,
+        full_bytes=len(full),
+        fold_bytes=len(fold_image) if fold_image else 0,
+    )
+
+    return Screenshots(full=full, fold=fold_image, content_type=CONTENT_TYPES[fmt])
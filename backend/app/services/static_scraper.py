@@ -0,0 +1,309 @@
+"""
+Static HTML extraction for server-rendered pages.
+
+Most submitted landing pages are rendered on the server, and everything the
+analysis needs from their text, meta tags, forms and links is already in the
+HTML returned by the preflight request. This module parses that HTML without
+a browser and decides whether it is representative of what a visitor sees,
+or just the shell of a client-side app that the browser must render.
+"""
+
+import re
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+# Elements whose content is never rendered as text
+HIDDEN_TAGS = frozenset({"script", "style", "noscript", "template", "svg", "iframe", "object"})
+
+# Elements allowed in <head>. Browsers close the head at the first other
+# element when </head> is omitted, which HTMLParser does not do for us.
+HEAD_TAGS = frozenset({"base", "link", "meta", "noscript", "script", "style", "template", "title"})
+
+VOID_TAGS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta",
+    "param", "source", "track", "wbr",
+})
+
+BLOCK_TAGS = frozenset({
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt",
+    "fieldset", "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4",
+    "h5", "h6", "header", "hr", "li", "main", "nav", "ol", "p", "pre", "section",
+    "table", "td", "th", "tr", "ul",
+})
+
+# Mount points of client-side frameworks
+APP_ROOT_IDS = frozenset({"root", "app", "__next", "__nuxt", "___gatsby", "svelte", "q-app"})
+
+# Elements whose text is captured for the DOM digest
+CAPTURED_TAGS = frozenset({"h1", "h2", "h3", "button", "a", "label", "blockquote"})
+
+CTA_CLASS = re.compile(r"btn|button|cta", re.I)
+LOGO_HINT = re.compile(r"logo|client|partner|customer", re.I)
+
+NOSCRIPT_JS_REQUIRED = re.compile(r"(enable|requires?|need)\s+javascript|javascript\s+(is\s+)?(required|disabled)", re.I)
+
+
+@dataclass
+class StaticPage:
+    """What could be extracted from the raw HTML."""
+    title: str
+    meta_description: Optional[str]
+    text: str
+    word_count: int
+    image_count: int
+    link_count: int
+    has_form: bool
+    empty_app_root: bool
+    requires_javascript: bool
+    dom_digest: Dict[str, Any]
+
+
+def _clean(text: str, max_length: int = 120) -> str:
+    return " ".join(text.split())[:max_length]
+
+
+class _Extractor(HTMLParser):
+    """Single pass over the document collecting text, meta, element counts and the digest."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title_parts: List[str] = []
+        self.meta_description: Optional[str] = None
+        self.lines: List[str] = []
+        self.current: List[str] = []
+        self.image_count = 0
+        self.link_count = 0
+        self.has_form = False
+        self.requires_javascript = False
+        self.empty_app_root = False
+
+        self._hidden_depth = 0
+        self._in_head = False
+        self._in_title = False
+        self._in_noscript = False
+        # Open app root: [nesting depth inside it, words seen inside it]
+        self._app_root: Optional[List[int]] = None
+
+        # DOM digest, shaped like the browser's (no fold or style data)
+        self.headings: List[Dict[str, Any]] = []
+        self.ctas: List[Dict[str, Any]] = []
+        self.forms: List[Dict[str, Any]] = []
+        self.testimonials: List[str] = []
+        self.logo_names: List[str] = []
+        self.logo_count = 0
+        self._labels: Dict[str, str] = {}
+        # Open elements whose text is being collected: (tag, attrs, parts, fields)
+        self._captures: List[Tuple[str, Dict[str, str], List[str], List[Dict[str, Any]]]] = []
+        self._form: Optional[Dict[str, Any]] = None
+
+    def _break(self) -> None:
+        line = " ".join(" ".join(self.current).split())
+        if line:
+            self.lines.append(line)
+        self.current = []
+
+    def _start_digest(self, tag: str, attributes: Dict[str, str]) -> None:
+        if tag in CAPTURED_TAGS:
+            self._captures.append((tag, attributes, [], []))
+        elif tag == "form":
+            self._form = {"fields": [], "submit": None, "fold": None}
+            self.forms.append(self._form)
+        elif tag == "img":
+            hint = " ".join((attributes.get(a) or "") for a in ("alt", "class", "src"))
+            if LOGO_HINT.search(hint):
+                self.logo_count += 1
+                if attributes.get("alt"):
+                    self.logo_names.append(_clean(attributes["alt"], 40))
+        elif tag in ("input", "select", "textarea"):
+            kind = (attributes.get("type") or ("text" if tag == "input" else tag)).lower()
+            if kind == "submit":
+                text = _clean(attributes.get("value") or "Submit", 60)
+                self._add_cta(text, None)
+                if self._form is not None and self._form["submit"] is None:
+                    self._form["submit"] = text
+                return
+            if kind in ("hidden", "button") or self._form is None:
+                return
+            field = {
+                "type": kind,
+                "label": _clean(attributes.get("aria-label") or attributes.get("placeholder")
+                                or attributes.get("name") or "", 60),
+                "required": "required" in attributes,
+                "_id": attributes.get("id"),
+            }
+            self._form["fields"].append(field)
+            # A wrapping <label> names the field once it closes
+            for capture in self._captures:
+                if capture[0] == "label":
+                    capture[3].append(field)
+
+    def _end_digest(self, tag: str) -> None:
+        if tag == "form":
+            self._form = None
+            return
+        for index in range(len(self._captures) - 1, -1, -1):
+            if self._captures[index][0] == tag:
+                break
+        else:
+            return
+        _, attributes, parts, fields = self._captures.pop(index)
+        text = _clean(" ".join(parts))
+        if not text:
+            return
+
+        if tag in ("h1", "h2", "h3"):
+            self.headings.append({"level": int(tag[1]), "text": text, "fold": None})
+        elif tag == "button" or (tag == "a" and CTA_CLASS.search(attributes.get("class") or "")):
+            self._add_cta(text[:60], attributes.get("href"))
+            if tag == "button" and self._form is not None and self._form["submit"] is None:
+                self._form["submit"] = text[:60]
+        elif tag == "label":
+            if attributes.get("for"):
+                self._labels[attributes["for"]] = text[:60]
+            for field in fields:
+                field["label"] = text[:60]
+        elif tag == "blockquote" and len(text) > 20:
+            self.testimonials.append(text[:160])
+
+    def _add_cta(self, text: str, href: Optional[str]) -> None:
+        if all(cta["text"] != text for cta in self.ctas):
+            self.ctas.append({"text": text, "href": href, "fold": None})
+
+    def digest(self) -> Dict[str, Any]:
+        forms = []
+        for form in self.forms[:5]:
+            fields = []
+            for field in form["fields"][:15]:
+                field_id = field.pop("_id")
+                if field_id in self._labels:
+                    field["label"] = self._labels[field_id]
+                fields.append(field)
+            forms.append({**form, "fields": fields})
+        return {
+            "headings": self.headings[:30],
+            "ctas": self.ctas[:25],
+            "forms": forms,
+            "testimonials": list(dict.fromkeys(self.testimonials))[:5],
+            "logoCount": self.logo_count,
+            "logoNames": self.logo_names[:10],
+            "styles": {},
+        }
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title":
+            self._in_title = True
+        elif tag == "meta":
+            attributes = dict(attrs)
+            if (attributes.get("name") or "").lower() == "description":
+                self.meta_description = attributes.get("content")
+        elif tag == "img":
+            self.image_count += 1
+        elif tag == "a":
+            self.link_count += 1
+        elif tag == "form":
+            self.has_form = True
+        elif tag == "noscript":
+            self._in_noscript = True
+
+        if tag == "head":
+            self._in_head = True
+            return
+        if self._in_head and tag not in HEAD_TAGS:
+            self._in_head = False
+        if tag in HIDDEN_TAGS:
+            self._hidden_depth += 1
+        if tag in BLOCK_TAGS:
+            self._break()
+        if not self._hidden_depth and not self._in_head:
+            self._start_digest(tag, {k: v or "" for k, v in attrs})
+
+        if tag in VOID_TAGS:
+            return
+        if self._app_root is not None:
+            self._app_root[0] += 1
+        elif self.empty_app_root is False and dict(attrs).get("id") in APP_ROOT_IDS:
+            self._app_root = [1, 0]
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        elif tag == "noscript":
+            self._in_noscript = False
+
+        if tag == "head":
+            self._in_head = False
+            return
+        if tag in HIDDEN_TAGS:
+            self._hidden_depth = max(0, self._hidden_depth - 1)
+        if tag in BLOCK_TAGS:
+            self._break()
+        self._end_digest(tag)
+
+        if tag in VOID_TAGS or self._app_root is None:
+            return
+        self._app_root[0] -= 1
+        if self._app_root[0] <= 0:
+            self.empty_app_root = self._app_root[1] < settings.SCRAPER_STATIC_MIN_WORDS
+            self._app_root = None
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title_parts.append(data)
+            return
+        if self._in_noscript and NOSCRIPT_JS_REQUIRED.search(data):
+            self.requires_javascript = True
+        if self._hidden_depth or self._in_head:
+            return
+        self.current.append(data)
+        for capture in self._captures:
+            capture[2].append(data)
+        if self._app_root is not None:
+            self._app_root[1] += len(data.split())
+
+    def close(self):
+        super().close()
+        self._break()
+        if self._app_root is not None:
+            # Unclosed root: judge it by what it contained
+            self.empty_app_root = self._app_root[1] < settings.SCRAPER_STATIC_MIN_WORDS
+            self._app_root = None
+
+
+def parse_static(html: str) -> StaticPage:
+    """Extract text, meta, element counts and a DOM digest from raw HTML."""
+    extractor = _Extractor()
+    extractor.feed(html)
+    extractor.close()
+
+    text = "\n".join(extractor.lines)
+    return StaticPage(
+        title=" ".join("".join(extractor.title_parts).split()),
+        meta_description=extractor.meta_description,
+        text=text,
+        word_count=len(text.split()),
+        image_count=extractor.image_count,
+        link_count=extractor.link_count,
+        has_form=extractor.has_form,
+        empty_app_root=extractor.empty_app_root,
+        requires_javascript=extractor.requires_javascript,
+        dom_digest=extractor.digest(),
+    )
+
+
+def is_representative(page: StaticPage) -> Tuple[bool, str]:
+    """
+    Whether the static DOM can stand in for the rendered page.
+
+    Returns:
+        (representative, reason) — the reason names the failed check
+    """
+    if page.empty_app_root:
+        return False, "app_shell"
+    if page.requires_javascript:
+        return False, "requires_javascript"
+    if page.word_count < settings.SCRAPER_STATIC_MIN_WORDS:
+        return False, "too_little_text"
+    return True, "ok"
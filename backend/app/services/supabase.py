@@ -11,10 +11,15 @@ from typing import Any, Dict, List, Optional, Tuple
 import httpx
 
 from app.config import settings
+from app.core.deadline import remaining_budget
 from app.core.logging import get_logger
+from app.services.artifacts import Artifact
+from app.services.screenshot import EXTENSIONS
 
 logger = get_logger(__name__)
 
+REQUEST_TIMEOUT = 30.0
+
 
 class SupabaseService:
     """Service for Supabase database operations via REST API."""
@@ -33,7 +38,11 @@ class SupabaseService:
     async def _ensure_client(self):
         """Lazily initialize the async HTTP client."""
         if self._client is None or self._client.is_closed:
-            self._client = httpx.AsyncClient(headers=self._headers, timeout=30.0)
+            self._client = httpx.AsyncClient(headers=self._headers, timeout=REQUEST_TIMEOUT)
+
+    def _timeout(self) -> float:
+        """Request timeout, shortened by the active task deadline."""
+        return remaining_budget(REQUEST_TIMEOUT)
 
     async def close(self):
         """Close the async HTTP client."""
@@ -50,7 +59,7 @@ class SupabaseService:
             headers["Prefer"] = "count=exact"
         if range_header:
             headers["Range"] = range_header
-        response = await self._client.get(f"{self._rest_url}/{table}", params=params or {}, headers=headers)
+        response = await self._client.get(f"{self._rest_url}/{table}", params=params or {}, headers=headers, timeout=self._timeout())
         if response.status_code == 406 and single:
             return None if not count else (None, 0)
         response.raise_for_status()
@@ -70,7 +79,7 @@ class SupabaseService:
         if upsert_conflict:
             headers["Prefer"] = "return=representation,resolution=merge-duplicates"
             headers["on-conflict"] = upsert_conflict
-        response = await self._client.post(f"{self._rest_url}/{table}", json=data, headers=headers)
+        response = await self._client.post(f"{self._rest_url}/{table}", json=data, headers=headers, timeout=self._timeout())
         response.raise_for_status()
         result = response.json()
         return result[0] if isinstance(result, list) and result else result
@@ -78,14 +87,14 @@ class SupabaseService:
     async def _patch(self, table, data, params):
         await self._ensure_client()
         headers = {"Prefer": "return=representation"}
-        response = await self._client.patch(f"{self._rest_url}/{table}", json=data, params=params, headers=headers)
+        response = await self._client.patch(f"{self._rest_url}/{table}", json=data, params=params, headers=headers, timeout=self._timeout())
         response.raise_for_status()
         result = response.json()
         return result[0] if isinstance(result, list) and result else result
 
     async def _rpc(self, function_name, params):
         await self._ensure_client()
-        response = await self._client.post(f"{self._rpc_url}/{function_name}", json=params)
+        response = await self._client.post(f"{self._rpc_url}/{function_name}", json=params, timeout=self._timeout())
         response.raise_for_status()
         # Some RPC functions return void (204 No Content) - handle empty body
         if not response.content or response.status_code == 204:
@@ -130,6 +139,7 @@ class SupabaseService:
         data = {"status": status}
         if status == "processing":
             data["started_at"] = datetime.utcnow().isoformat()
+            data["progress"] = None
         elif status in ("completed", "failed"):
             data["completed_at"] = datetime.utcnow().isoformat()
         if error_code:
@@ -138,6 +148,9 @@ class SupabaseService:
             data["error_message"] = error_message
         await self._patch("analyses", data=data, params={"id": f"eq.{analysis_id}"})
 
+    async def update_analysis_progress(self, analysis_id, progress):
+        await self._patch("analyses", data={"progress": progress}, params={"id": f"eq.{analysis_id}"})
+
     async def create_report(self, analysis_id, score, summary, categories, screenshot_url=None, page_metadata=None):
         return await self._post("reports", {"analysis_id": analysis_id, "score": score, "summary": summary, "categories": categories, "issues": [], "screenshot_url": screenshot_url, "page_metadata": page_metadata or {}})
 
@@ -157,7 +170,7 @@ class SupabaseService:
         if cancel_at:
             data["cancel_at"] = datetime.fromtimestamp(cancel_at).isoformat()
         headers = {"Prefer": "return=representation,resolution=merge-duplicates"}
-        response = await self._client.post(f"{self._rest_url}/subscriptions", json=data, params={"on_conflict": "stripe_subscription_id"}, headers=headers)
+        response = await self._client.post(f"{self._rest_url}/subscriptions", json=data, params={"on_conflict": "stripe_subscription_id"}, headers=headers, timeout=self._timeout())
         response.raise_for_status()
         result = response.json()
         return result[0] if isinstance(result, list) and result else {}
@@ -168,10 +181,15 @@ class SupabaseService:
     async def update_subscription_status(self, stripe_subscription_id, status):
         await self._patch("subscriptions", data={"status": status}, params={"stripe_subscription_id": f"eq.{stripe_subscription_id}"})
 
-    async def upload_screenshot(self, analysis_id, data):
+    async def upload_screenshot(self, analysis_id, data, content_type="image/png", suffix=""):
         await self._ensure_client()
-        path = f"screenshots/{analysis_id}.png"
-        response = await self._client.post(f"{self._storage_url}/object/screenshots/{path}", content=data, headers={"Content-Type": "image/png", "x-upsert": "true"})
+        path = f"screenshots/{analysis_id}{suffix}.{EXTENSIONS.get(content_type, 'png')}"
+        headers = {"Content-Type": content_type, "x-upsert": "true"}
+        if isinstance(data, Artifact):
+            # Stream spilled screenshots from disk instead of loading them
+            headers["Content-Length"] = str(data.size)
+            data = data.iter_chunks()
+        response = await self._client.post(f"{self._storage_url}/object/screenshots/{path}", content=data, headers=headers, timeout=self._timeout())
         response.raise_for_status()
         return f"{settings.SUPABASE_URL}/storage/v1/object/public/screenshots/{path}"
 
@@ -2,11 +2,20 @@
 Usage tracking service for cost monitoring.
 """
 
+from typing import Any, Dict, Optional
+
 from app.core.logging import get_logger
 from app.services.supabase import SupabaseService
 
 logger = get_logger(__name__)
 
+# USD per 1000 tokens
+PRICE_INPUT = 0.003
+PRICE_OUTPUT = 0.015
+PRICE_CACHE_READ = PRICE_INPUT * 0.1
+PRICE_CACHE_WRITE = PRICE_INPUT * 1.25
+BATCH_DISCOUNT = 0.5
+
 
 async def log_analysis_cost(
     supabase: SupabaseService,
@@ -16,20 +25,44 @@ async def log_analysis_cost(
     tokens_output: int,
     duration_ms: int,
     success: bool,
+    cache_read_tokens: int = 0,
+    cache_write_tokens: int = 0,
+    cache_hit: bool = False,
+    tokens_saved: int = 0,
+    batch: bool = False,
+    prompt_budget: Optional[Dict[str, Any]] = None,
 ) -> None:
-    """Log analysis cost for tracking."""
+    """
+    Log analysis cost for tracking.
+
+    cache_hit and tokens_saved describe the analysis result cache (the whole
+    call was skipped); cache_read/write_tokens the API's prompt cache. Batch
+    requests are billed at a discount. prompt_budget holds the allocated
+    and used tokens of the prompt, for tuning the budgeter.
+    """
     try:
-        cost_input = (tokens_input / 1000) * 0.003
-        cost_output = (tokens_output / 1000) * 0.015
-        total_cost = cost_input + cost_output
+        total_cost = (
+            tokens_input * PRICE_INPUT
+            + tokens_output * PRICE_OUTPUT
+            + cache_read_tokens * PRICE_CACHE_READ
+            + cache_write_tokens * PRICE_CACHE_WRITE
+        ) / 1000
+        if batch:
+            total_cost *= BATCH_DISCOUNT
 
-        supabase._post("usage_logs", {
+        await supabase._post("usage_logs", {
             "user_id": user_id,
             "action": "analysis",
             "metadata": {
                 "analysis_id": analysis_id,
                 "tokens_input": tokens_input,
                 "tokens_output": tokens_output,
+                "cache_read_tokens": cache_read_tokens,
+                "cache_write_tokens": cache_write_tokens,
+                "cache_hit": cache_hit,
+                "tokens_saved": tokens_saved,
+                "batch": batch,
+                "prompt_budget": prompt_budget,
                 "duration_ms": duration_ms,
                 "success": success,
                 "estimated_cost": round(total_cost, 4),
@@ -41,6 +74,35 @@ async def log_analysis_cost(
             user_id=user_id,
             analysis_id=analysis_id,
             cost=total_cost,
+            cache_hit=cache_hit,
         )
     except Exception as e:
         logger.warning("usage_log_failed", error=str(e))
+
+
+async def log_result_usage(
+    supabase: SupabaseService,
+    user_id: str,
+    analysis_id: str,
+    result: Dict[str, Any],
+    duration_ms: int,
+    batch: bool = False,
+) -> None:
+    """Log the cost of a successful analysis from the usage attached to its result."""
+    usage = result.get("_usage", {})
+    cache = result.get("_cache", {})
+    await log_analysis_cost(
+        supabase,
+        user_id=user_id,
+        analysis_id=analysis_id,
+        tokens_input=usage.get("input_tokens", 0),
+        tokens_output=usage.get("output_tokens", 0),
+        duration_ms=duration_ms,
+        success=True,
+        cache_read_tokens=usage.get("cache_read_input_tokens", 0),
+        cache_write_tokens=usage.get("cache_creation_input_tokens", 0),
+        cache_hit=cache.get("hit", False),
+        tokens_saved=cache.get("tokens_saved", 0),
+        batch=batch,
+        prompt_budget=result.get("_budget"),
+    )
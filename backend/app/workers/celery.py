@@ -22,7 +22,7 @@ celery_app = Celery(
     "leak_detector",
     broker=settings.REDIS_URL,
     backend=settings.REDIS_URL,
-    include=["app.workers.tasks.analyze"],
+    include=["app.workers.tasks.analyze", "app.workers.tasks.batches"],
 )
 
 # Configure Celery
@@ -53,11 +53,21 @@ celery_app.conf.update(
     # Task routes (optional, for scaling)
     task_routes={
         "app.workers.tasks.analyze.*": {"queue": "analysis"},
+        "app.workers.tasks.batches.*": {"queue": "analysis"},
     },
 )
 
 # Optional: Beat schedule for periodic tasks
 celery_app.conf.beat_schedule = {
+    # Low-priority analyses go through the Message Batches API
+    "submit-analysis-batch": {
+        "task": "app.workers.tasks.batches.submit_analysis_batch",
+        "schedule": settings.ANALYSIS_BATCH_SUBMIT_INTERVAL,
+    },
+    "poll-analysis-batches": {
+        "task": "app.workers.tasks.batches.poll_analysis_batches",
+        "schedule": settings.ANALYSIS_BATCH_POLL_INTERVAL,
+    },
     # Example: Reset quotas monthly (handled by Supabase trigger instead)
     # "reset-monthly-quotas": {
     #     "task": "app.workers.tasks.maintenance.reset_quotas",
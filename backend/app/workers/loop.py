@@ -0,0 +1,80 @@
+"""
+Persistent event loop for Celery worker processes.
+
+Each task used to run in its own ``asyncio.run`` loop, which tore down every
+loop-bound resource (Playwright browsers, HTTP clients) after each analysis.
+Running tasks on one loop per worker process lets those resources stay warm.
+"""
+
+import asyncio
+from typing import Any, Coroutine, Optional, TypeVar
+
+from celery.signals import worker_process_shutdown
+
+from app.core.llm import close_anthropic
+from app.core.logging import get_logger
+from app.core.redis import close_redis
+from app.services.browser_pool import close_browser_pool
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def run_async(coro: Coroutine[Any, Any, T]) -> T:
+    """
+    Run a coroutine to completion on the worker's persistent event loop.
+
+    If the run is interrupted (e.g. SoftTimeLimitExceeded raised from the
+    signal handler while the loop is waiting), the task and anything it
+    started are cancelled before re-raising. Otherwise they would resume
+    during the next task, still holding their browser lease and domain slot.
+    """
+    global _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        _worker_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_worker_loop)
+    try:
+        return _worker_loop.run_until_complete(coro)
+    except BaseException:
+        _cancel_leftover_tasks(_worker_loop)
+        raise
+
+
+def _cancel_leftover_tasks(loop: asyncio.AbstractEventLoop) -> None:
+    """Cancel every pending task on the loop and let them run their cleanup."""
+    tasks = [task for task in asyncio.all_tasks(loop) if not task.done()]
+    if not tasks:
+        return
+    logger.warning("worker_loop_tasks_cancelled", tasks=len(tasks))
+    for task in tasks:
+        task.cancel()
+    try:
+        loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+    except BaseException as e:
+        logger.warning("worker_loop_drain_failed", error=str(e))
+
+
+@worker_process_shutdown.connect
+def _close_worker_loop(**kwargs: Any) -> None:
+    """Release the browser pool and shared clients, and close the loop, when the worker exits."""
+    global _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        return
+    try:
+        _worker_loop.run_until_complete(close_browser_pool())
+    except Exception as e:
+        logger.warning("browser_pool_close_failed", error=str(e))
+    try:
+        _worker_loop.run_until_complete(close_anthropic())
+    except Exception as e:
+        logger.warning("anthropic_close_failed", error=str(e))
+    try:
+        _worker_loop.run_until_complete(close_redis())
+    except Exception as e:
+        logger.warning("redis_close_failed", error=str(e))
+    finally:
+        _worker_loop.close()
+        _worker_loop = None
@@ -0,0 +1,37 @@
+"""
+Per-task memory measurement for worker processes.
+
+Chromium runs in its own processes, so these readings cover what the task
+itself holds: page HTML, text, screenshots and the LLM response.
+"""
+
+from typing import Tuple
+
+
+def process_memory_mb() -> Tuple[int, int]:
+    """
+    Current and peak resident memory of this process, in MB.
+
+    Returns (0, 0) where /proc is unavailable (non-Linux).
+    """
+    current = peak = 0
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    current = int(line.split()[1]) // 1024
+                elif line.startswith("VmHWM:"):
+                    peak = int(line.split()[1]) // 1024
+    except (OSError, ValueError):
+        pass
+    return current, peak
+
+
+def reset_peak_memory() -> None:
+    """Reset the peak RSS counter so the next reading covers one task (Linux)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
@@ -3,16 +3,27 @@ Analysis task - Main Celery task for analyzing landing pages.
 """
 
 import asyncio
-from typing import Any, Dict
+import time
+from typing import Any, Dict, List, Optional
 
 from celery.exceptions import SoftTimeLimitExceeded
 
 from app.workers.celery import celery_app
+from app.workers.loop import run_async
+from app.workers.memory import process_memory_mb, reset_peak_memory
 from app.services.supabase import get_supabase_service
-from app.services.scraper import scrape_page, ScrapingError
+from app.services.artifacts import ArtifactStore
+from app.services.scraper import capture_deferred, scrape_page, PageTimeoutError, ScrapingError
+from app.services.domain_scheduler import DomainBusyError
+from app.config import settings
+from app.services import analysis_batches
+from app.services.analysis_batches import BatchItem
+from app.services.analyzer import CATEGORY_COUNT, load_cached_result, prepare_request
 from app.services.analyzer import analyze_page as analyze_with_claude
 from app.core.errors import AnalysisError
+from app.core.deadline import Deadline
 from app.services.email import send_analysis_complete_email
+from app.services.usage import log_analysis_cost, log_result_usage
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -23,35 +34,63 @@ logger = get_logger(__name__)
     max_retries=1,
     default_retry_delay=5,
 )
-def analyze_page_task(self, analysis_id: str) -> Dict[str, Any]:
+def analyze_page_task(self, analysis_id: str, requeues: int = 0, batch: bool = False) -> Dict[str, Any]:
     """
     Main task for analyzing a landing page.
 
     Steps:
     1. Fetch analysis record from DB
     2. Update status to 'processing'
-    3. Scrape the page (Playwright)
-    4. Upload screenshot to storage
-    5. Analyze with Claude API
+    3. Scrape the page (static HTML or Playwright)
+    4. Analyze with Claude API
+    5. Upload screenshot to storage
     6. Create report in DB
     7. Update analysis status to 'completed'
 
+    In batch mode, step 4 is replaced by queueing the prompt after step 5;
+    steps 6 and 7 run when the batch result arrives.
+
     Args:
         analysis_id: UUID of the analysis record
+        requeues: Times this analysis was put back because its domain was busy
+        batch: Low priority: queue the prompt for the Message Batches API
+            instead of calling Claude; a beat task finishes the analysis
 
     Returns:
         Dict with report_id and score
     """
     logger.info("task_started", analysis_id=analysis_id, task_id=self.request.id)
 
-    # Run async code in sync context
-    return asyncio.run(_analyze_page_async(self, analysis_id))
+    # Every stage shares what is left of the soft time limit
+    deadline = Deadline(_task_time_budget(self), name="analysis")
+
+    # Run async code on the worker's persistent loop (keeps the browser pool warm)
+    with deadline.activate():
+        return run_async(_analyze_page_async(self, analysis_id, requeues, deadline, batch))
+
 
+def _task_time_budget(task) -> float:
+    """Seconds the task may run: its soft time limit minus a safety margin."""
+    timelimit = task.request.timelimit or (None, None)
+    soft_limit = timelimit[1] or celery_app.conf.task_soft_time_limit
+    return soft_limit - settings.TASK_DEADLINE_MARGIN
 
-async def _analyze_page_async(task, analysis_id: str) -> Dict[str, Any]:
+
+async def _analyze_page_async(
+    task,
+    analysis_id: str,
+    requeues: int = 0,
+    deadline: Optional[Deadline] = None,
+    batch: bool = False,
+) -> Dict[str, Any]:
     """Async implementation of the analysis task."""
+    deadline = deadline or Deadline(_task_time_budget(task), name="analysis")
+    batch = batch and settings.ANALYSIS_BATCH_ENABLED
 
     supabase = get_supabase_service()
+    # Page HTML, text and screenshots live here, not in memory, for most of the task
+    artifacts = ArtifactStore(prefix=f"analysis-{analysis_id}-")
+    reset_peak_memory()
 
     try:
         # 1. Fetch analysis record
@@ -66,9 +105,36 @@ async def _analyze_page_async(task, analysis_id: str) -> Dict[str, Any]:
         # 2. Update status to processing
         await supabase.update_analysis_status(analysis_id, "processing")
 
-        # 3. Scrape the page
+        # 3. Scrape the page, leaving time for the analysis and saving
         try:
-            scraped = await scrape_page(url)
+            with deadline.stage("scrape", reserve=settings.DEADLINE_ANALYSIS_RESERVE) as stage:
+                try:
+                    scraped = await asyncio.wait_for(scrape_page(url), timeout=stage.budget())
+                except asyncio.TimeoutError:
+                    raise PageTimeoutError()
+        except DomainBusyError as e:
+            # Free the worker for other domains instead of blocking on this one
+            if requeues < settings.SCRAPER_DOMAIN_MAX_REQUEUES:
+                logger.info(
+                    "analysis_requeued",
+                    analysis_id=analysis_id,
+                    requeues=requeues + 1,
+                    countdown=e.retry_after,
+                )
+                await supabase.update_analysis_status(analysis_id, "pending")
+                task.apply_async(
+                    args=[analysis_id],
+                    kwargs={"requeues": requeues + 1, "batch": batch},
+                    countdown=e.retry_after,
+                )
+                return {"requeued": True, "retry_after": e.retry_after}
+            await supabase.update_analysis_status(
+                analysis_id,
+                status="failed",
+                error_code=e.code,
+                error_message="The site is busy with other scans. Please try again later.",
+            )
+            return {"error": e.message, "code": e.code}
         except ScrapingError as e:
             logger.warning("scraping_failed", analysis_id=analysis_id, error=str(e))
             await supabase.update_analysis_status(
@@ -79,77 +145,107 @@ async def _analyze_page_async(task, analysis_id: str) -> Dict[str, Any]:
             )
             return {"error": e.message, "code": e.code}
 
-        # 4. Upload screenshot
+        scraped.spill(artifacts)
+
+        # 4. Analyze with Claude (static scrapes take their screenshots meanwhile).
+        # Batched analyses are queued instead, once the screenshots are uploaded.
+        capture = None
+        if scraped.engine == "static" and not scraped.screenshot:
+            if deadline.budget(reserve=settings.DEADLINE_PERSIST_RESERVE) >= settings.DEADLINE_SCREENSHOT_MIN:
+                capture = asyncio.create_task(capture_deferred(scraped))
+            else:
+                logger.warning("screenshot_skipped", analysis_id=analysis_id, reason="deadline")
+
+        result = None
+        if not batch:
+            result = await _run_analysis(supabase, analysis, scraped, deadline, capture)
+
+        if capture is not None:
+            try:
+                scraped = await asyncio.wait_for(
+                    capture, timeout=deadline.budget(reserve=settings.DEADLINE_PERSIST_RESERVE)
+                )
+                scraped.spill(artifacts)
+            except asyncio.TimeoutError:
+                logger.warning("screenshot_skipped", analysis_id=analysis_id, reason="deadline")
+
+        # 5. Upload screenshots, unless saving the report needs all the time left
         screenshot_url = None
+        fold_screenshot_url = None
+        mobile_screenshot_url = None
         try:
-            screenshot_url = await supabase.upload_screenshot(
-                analysis_id,
-                scraped.screenshot,
-            )
-            logger.info("screenshot_uploaded", analysis_id=analysis_id)
+            with deadline.stage("upload", reserve=settings.DEADLINE_PERSIST_RESERVE) as stage:
+                if stage.seconds < settings.DEADLINE_PERSIST_RESERVE:
+                    raise TimeoutError("not enough time left before the task deadline")
+                if scraped.screenshot:
+                    screenshot_url = await supabase.upload_screenshot(
+                        analysis_id,
+                        scraped.screenshot,
+                        content_type=scraped.screenshot_content_type,
+                    )
+                if scraped.fold_screenshot:
+                    fold_screenshot_url = await supabase.upload_screenshot(
+                        analysis_id,
+                        scraped.fold_screenshot,
+                        content_type=scraped.screenshot_content_type,
+                        suffix="_fold",
+                    )
+                if scraped.mobile_screenshot:
+                    mobile_screenshot_url = await supabase.upload_screenshot(
+                        analysis_id,
+                        scraped.mobile_screenshot,
+                        content_type=scraped.screenshot_content_type,
+                        suffix="_mobile",
+                    )
+                logger.info("screenshot_uploaded", analysis_id=analysis_id)
         except Exception as e:
             logger.warning("screenshot_upload_failed", error=str(e))
             # Continue without screenshot
 
-        # 5. Analyze with Claude
-        try:
-            result = await analyze_with_claude(scraped)
-        except Exception as e:
-            logger.error("analysis_failed", analysis_id=analysis_id, error=str(e))
-            await supabase.update_analysis_status(
-                analysis_id,
-                status="failed",
-                error_code="ANALYSIS_FAILED",
-                error_message=str(e),
-            )
-            raise  # Retry
-
-        # 6. Create report
-        report = await supabase.create_report(
-            analysis_id=analysis_id,
-            score=result["score"],
-            summary=result["summary"],
-            categories=result["categories"],
-            screenshot_url=screenshot_url,
-            page_metadata={
-                "title": scraped.title,
-                "load_time_ms": scraped.load_time_ms,
-                "word_count": scraped.word_count,
-                "image_count": scraped.image_count,
-            },
-        )
+        page_metadata = {
+            "title": scraped.title,
+            "load_time_ms": scraped.load_time_ms,
+            "word_count": scraped.word_count,
+            "image_count": scraped.image_count,
+            "scrape_mode": scraped.scrape_mode,
+            "blocked_requests": scraped.blocked_requests,
+            "fold_screenshot_url": fold_screenshot_url,
+            "readiness": scraped.readiness,
+            "mobile": scraped.mobile,
+            "mobile_screenshot_url": mobile_screenshot_url,
+            "performance": scraped.performance,
+            "engine": scraped.engine,
+        }
 
-        # 7. Send email notification
-        try:
-            profile = await supabase.get_profile(analysis["user_id"])
-            if profile and profile.get("email"):
-                critical_issues = sum(
-                    1 for cat in result.get("categories", [])
-                    for issue in cat.get("issues", [])
-                    if issue.get("severity") == "critical"
-                )
-                await send_analysis_complete_email(
-                    email=profile["email"],
-                    name=profile.get("full_name"),
+        if batch:
+            request = prepare_request(scraped)
+            result = await load_cached_result(request)
+            if result is None:
+                await _publish_progress(supabase, analysis_id, [], request.checks.preview())
+                await analysis_batches.enqueue(BatchItem(
+                    analysis_id=analysis_id,
+                    user_id=analysis["user_id"],
                     url=url,
-                    score=result["score"],
-                    report_id=report["id"],
-                    critical_count=critical_issues,
-                    remaining=max(0, profile["analyses_limit"] - profile["analyses_used"]),
-                )
-        except Exception as e:
-            logger.warning("analysis_email_failed", error=str(e))
-            # Don't fail the task if email fails
-
-        # 8. Update analysis status to completed
-        await supabase.update_analysis_status(analysis_id, "completed")
-
-        logger.info(
-            "task_completed",
-            analysis_id=analysis_id,
-            report_id=report["id"],
-            score=result["score"],
-        )
+                    params=request.params,
+                    cache_key=request.cache_key,
+                    page_metadata=page_metadata,
+                    screenshot_url=screenshot_url,
+                    budget=request.budget,
+                ))
+                return {"queued_for_batch": True}
+            await log_result_usage(supabase, analysis["user_id"], analysis_id, result, duration_ms=0, batch=True)
+
+        # 6-8. Create report, notify, mark completed
+        with deadline.stage("persist"):
+            report = await complete_analysis(
+                supabase,
+                analysis_id=analysis_id,
+                user_id=analysis["user_id"],
+                url=url,
+                result=result,
+                screenshot_url=screenshot_url,
+                page_metadata=page_metadata,
+            )
 
         return {
             "report_id": report["id"],
@@ -211,10 +307,158 @@ async def _analyze_page_async(task, analysis_id: str) -> Dict[str, Any]:
         raise
 
     finally:
+        artifacts.close()
+        rss_mb, peak_rss_mb = process_memory_mb()
+        logger.info(
+            "task_memory",
+            analysis_id=analysis_id,
+            rss_mb=rss_mb,
+            peak_rss_mb=peak_rss_mb,
+            spilled_bytes=artifacts.spilled_bytes,
+        )
+
         # Close the async client to prevent connection leaks in Celery workers
         service = get_supabase_service()
         await service.close()
 
 
+async def _run_analysis(
+    supabase,
+    analysis: Dict[str, Any],
+    scraped,
+    deadline: Deadline,
+    capture: Optional[asyncio.Task],
+) -> Dict[str, Any]:
+    """Analyze the page with Claude now, publishing categories as they complete."""
+    analysis_id = analysis["id"]
+
+    # Publish the instant preview, then categories as the model finishes them;
+    # they stay if it fails later
+    categories_done: List[Dict[str, Any]] = []
+    preview: List[Dict[str, Any]] = []
+
+    async def publish_preview(categories: List[Dict[str, Any]]) -> None:
+        preview.extend(categories)
+        await _publish_progress(supabase, analysis_id, categories_done, preview)
+
+    async def publish_category(category: Dict[str, Any]) -> None:
+        categories_done.append(category)
+        await _publish_progress(supabase, analysis_id, categories_done, preview)
+
+    analysis_started = time.monotonic()
+    try:
+        with deadline.stage("analysis", reserve=settings.DEADLINE_PERSIST_RESERVE):
+            result = await analyze_with_claude(
+                scraped, on_category=publish_category, on_preview=publish_preview
+            )
+    except Exception as e:
+        if capture is not None:
+            capture.cancel()
+            await asyncio.gather(capture, return_exceptions=True)
+        logger.error("analysis_failed", analysis_id=analysis_id, error=str(e))
+        await log_analysis_cost(
+            supabase,
+            user_id=analysis["user_id"],
+            analysis_id=analysis_id,
+            tokens_input=0,
+            tokens_output=0,
+            duration_ms=int((time.monotonic() - analysis_started) * 1000),
+            success=False,
+        )
+        await supabase.update_analysis_status(
+            analysis_id,
+            status="failed",
+            error_code="ANALYSIS_FAILED",
+            error_message=str(e),
+        )
+        raise  # Retry
+
+    await log_result_usage(
+        supabase,
+        analysis["user_id"],
+        analysis_id,
+        result,
+        duration_ms=int((time.monotonic() - analysis_started) * 1000),
+    )
+    return result
+
+
+async def _publish_progress(
+    supabase,
+    analysis_id: str,
+    categories: List[Dict[str, Any]],
+    preview: List[Dict[str, Any]],
+) -> None:
+    """Save partial results: the rule-based preview and the categories written so far."""
+    try:
+        await supabase.update_analysis_progress(analysis_id, {
+            "categories_done": len(categories),
+            "categories_total": CATEGORY_COUNT,
+            "categories": categories,
+            "preview": preview,
+        })
+    except Exception as e:
+        logger.warning("analysis_progress_failed", analysis_id=analysis_id, error=str(e))
+
+
+async def complete_analysis(
+    supabase,
+    analysis_id: str,
+    user_id: str,
+    url: str,
+    result: Dict[str, Any],
+    screenshot_url: Optional[str],
+    page_metadata: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Save the report for a finished analysis, email the user and mark it completed.
+
+    Used both here and when a batched analysis's result arrives.
+
+    Returns:
+        The created report
+    """
+    report = await supabase.create_report(
+        analysis_id=analysis_id,
+        score=result["score"],
+        summary=result["summary"],
+        categories=result["categories"],
+        screenshot_url=screenshot_url,
+        page_metadata=page_metadata,
+    )
+
+    # Send email notification
+    try:
+        profile = await supabase.get_profile(user_id)
+        if profile and profile.get("email"):
+            critical_issues = sum(
+                1 for cat in result.get("categories", [])
+                for issue in cat.get("issues", [])
+                if issue.get("severity") == "critical"
+            )
+            await send_analysis_complete_email(
+                email=profile["email"],
+                name=profile.get("full_name"),
+                url=url,
+                score=result["score"],
+                report_id=report["id"],
+                critical_count=critical_issues,
+                remaining=max(0, profile["analyses_limit"] - profile["analyses_used"]),
+            )
+    except Exception as e:
+        logger.warning("analysis_email_failed", error=str(e))
+        # Don't fail the task if email fails
+
+    await supabase.update_analysis_status(analysis_id, "completed")
+
+    logger.info(
+        "task_completed",
+        analysis_id=analysis_id,
+        report_id=report["id"],
+        score=result["score"],
+    )
+    return report
+
+
 # Alias for cleaner imports
 analyze_page = analyze_page_task
@@ -0,0 +1,126 @@
+"""
+Batch tasks - Periodic tasks that run low-priority analyses through Message Batches.
+"""
+
+import time
+from typing import Any, Dict
+
+from app.workers.celery import celery_app
+from app.workers.loop import run_async
+from app.services import analysis_batches
+from app.services.analysis_batches import BatchItem, BatchOutcome, BatchRejectedError
+from app.services.analyzer import AnalysisRequest, result_from_message, store_result
+from app.services.supabase import get_supabase_service
+from app.services.usage import log_analysis_cost, log_result_usage
+from app.workers.tasks.analyze import complete_analysis
+from app.core.errors import AnalysisError
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@celery_app.task
+def submit_analysis_batch() -> Dict[str, Any]:
+    """Submit the queued analyses as one message batch."""
+    return run_async(_submit_analysis_batch_async())
+
+
+async def _submit_analysis_batch_async() -> Dict[str, Any]:
+    try:
+        batch_id = await analysis_batches.submit_pending()
+    except BatchRejectedError as e:
+        # Resubmitting would be rejected again and hold up the queue
+        supabase = get_supabase_service()
+        try:
+            for item in e.items:
+                await _fail_batched_analysis(supabase, item, e.message)
+        finally:
+            await supabase.close()
+        return {"error": e.message, "failed": len(e.items)}
+    except Exception as e:
+        # The analyses were put back on the queue for the next run
+        logger.error("analysis_batch_submit_failed", error=str(e))
+        return {"error": str(e)}
+    return {"batch_id": batch_id}
+
+
+@celery_app.task
+def poll_analysis_batches() -> Dict[str, Any]:
+    """Finish the analyses of every message batch that has ended."""
+    return run_async(_poll_analysis_batches_async())
+
+
+async def _poll_analysis_batches_async() -> Dict[str, Any]:
+    supabase = get_supabase_service()
+    completed = failed = 0
+    try:
+        async for outcome in analysis_batches.collect_results():
+            if await _finish_batched_analysis(supabase, outcome):
+                completed += 1
+            else:
+                failed += 1
+    finally:
+        # Close the async client to prevent connection leaks in Celery workers
+        await supabase.close()
+
+    if completed or failed:
+        logger.info("analysis_batches_collected", completed=completed, failed=failed)
+    return {"completed": completed, "failed": failed}
+
+
+async def _finish_batched_analysis(supabase, outcome: BatchOutcome) -> bool:
+    """Turn one batch result into a report, or mark the analysis failed."""
+    item = outcome.item
+    request = AnalysisRequest(url=item.url, params=item.params, cache_key=item.cache_key, budget=item.budget)
+    duration_ms = int((time.time() - item.queued_at) * 1000)
+    try:
+        if outcome.message is None:
+            raise AnalysisError(f"Batch request failed: {outcome.error}")
+        result = result_from_message(outcome.message, request)
+    except AnalysisError as e:
+        await _fail_batched_analysis(supabase, item, str(e))
+        return False
+
+    await store_result(request, result)
+    await log_result_usage(supabase, item.user_id, item.analysis_id, result, duration_ms, batch=True)
+    try:
+        await complete_analysis(
+            supabase,
+            analysis_id=item.analysis_id,
+            user_id=item.user_id,
+            url=item.url,
+            result=result,
+            screenshot_url=item.screenshot_url,
+            page_metadata=item.page_metadata,
+        )
+    except Exception as e:
+        logger.error("batch_analysis_save_failed", analysis_id=item.analysis_id, error=str(e))
+        await supabase.update_analysis_status(
+            item.analysis_id,
+            status="failed",
+            error_code="TASK_FAILED",
+            error_message=str(e),
+        )
+        return False
+    return True
+
+
+async def _fail_batched_analysis(supabase, item: BatchItem, error: str) -> None:
+    """Mark a batched analysis failed and log it as unbilled."""
+    logger.error("batch_analysis_failed", analysis_id=item.analysis_id, error=error)
+    await log_analysis_cost(
+        supabase,
+        user_id=item.user_id,
+        analysis_id=item.analysis_id,
+        tokens_input=0,
+        tokens_output=0,
+        duration_ms=int((time.time() - item.queued_at) * 1000),
+        success=False,
+        batch=True,
+    )
+    await supabase.update_analysis_status(
+        item.analysis_id,
+        status="failed",
+        error_code="ANALYSIS_FAILED",
+        error_message=error,
+    )
@@ -0,0 +1,176 @@
+"""
+Benchmark parse_analysis_response against the previous json.loads implementation.
+
+Usage (from backend/):
+    python -m benchmarks.bench_parse_analysis [response.txt ...]
+
+Without arguments it runs on generated responses shaped like real analysis
+output (8 categories, 2-4 issues each, prose of realistic length) plus the
+malformed variants seen in production: code fences, a sentence around the
+JSON, smart quotes, stray control characters and output truncated by
+max_tokens at several points. Save raw responses (the logged
+response_preview is too short) and pass them to benchmark those instead.
+"""
+
+import json
+import logging
+import random
+import re
+import string
+import sys
+import timeit
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import structlog
+
+from app.core.errors import AnalysisError
+from app.services.analyzer import REPORT_TOOL, parse_analysis_response
+
+# The category names the analysis is asked for
+CATEGORIES = REPORT_TOOL["input_schema"]["properties"]["categories"]["items"]["properties"]["name"]["enum"]
+
+
+def parse_analysis_response_legacy(response_text: str) -> Dict[str, Any]:
+    """The previous implementation, kept for comparison."""
+    text = response_text.strip()
+    if text.startswith("```json"):
+        text = text[7:]
+    if text.startswith("```"):
+        text = text[3:]
+    if text.endswith("```"):
+        text = text[:-3]
+    text = text.strip()
+
+    result = None
+    try:
+        result = json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    if result is None:
+        try:
+            match = re.search(r'\{[\s\S]*\}', text)
+            if match:
+                result = json.loads(match.group())
+        except json.JSONDecodeError:
+            pass
+    if result is None:
+        try:
+            cleaned = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]', '', text)
+            result = json.loads(cleaned)
+        except json.JSONDecodeError as e:
+            raise AnalysisError(f"Failed to parse analysis response: {e}")
+
+    result["score"] = max(0, min(100, int(result["score"])))
+    categories = []
+    for cat in result["categories"]:
+        issues = []
+        for issue in cat.get("issues", []):
+            cleaned_issue = {
+                "severity": issue.get("severity", "info"),
+                "title": issue.get("title", "Issue"),
+                "description": issue.get("description", ""),
+                "recommendation": issue.get("recommendation", ""),
+            }
+            if cleaned_issue["severity"] not in ("critical", "warning", "info"):
+                cleaned_issue["severity"] = "info"
+            issues.append(cleaned_issue)
+        categories.append({
+            "name": cat.get("name", "unknown"),
+            "label": cat.get("label", cat.get("name", "Unknown")),
+            "score": max(0, min(100, int(cat.get("score", 50)))),
+            "issues": issues,
+        })
+    result["categories"] = categories
+    return result
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    text = " ".join(
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 9))) for _ in range(words)
+    )
+    return text.capitalize() + "."
+
+
+def generate_response(rng: random.Random) -> str:
+    """A well-formed response as Claude writes it: indented JSON."""
+    return json.dumps({
+        "score": rng.randint(30, 90),
+        "summary": " ".join(_sentence(rng, 14) for _ in range(3)),
+        "categories": [
+            {
+                "name": name,
+                "label": name.replace("_", " ").title(),
+                "score": rng.randint(20, 95),
+                "issues": [
+                    {
+                        "severity": rng.choice(["critical", "warning", "info"]),
+                        "title": _sentence(rng, 5),
+                        "description": " ".join(_sentence(rng, 12) for _ in range(2)),
+                        "recommendation": " ".join(_sentence(rng, 12) for _ in range(2)),
+                    }
+                    for _ in range(rng.randint(2, 4))
+                ],
+            }
+            for name in CATEGORIES
+        ],
+    }, indent=2)
+
+
+def build_corpus(rng: random.Random) -> List[Tuple[str, str]]:
+    corpus = []
+    for i in range(5):
+        response = generate_response(rng)
+        corpus.append((f"valid #{i}", response))
+        corpus.append((f"fenced #{i}", f"```json\n{response}\n```"))
+        corpus.append((f"with prose #{i}", f"Here is the analysis:\n{response}\nLet me know!"))
+        corpus.append((f"control chars #{i}", response.replace("Cta", "C\x0bta")))
+        corpus.append((f"smart quotes #{i}", response.replace('"score"', "“score”", 1)))
+        for share in (0.3, 0.6, 0.95):
+            cut = int(len(response) * share)
+            corpus.append((f"truncated {int(share * 100)}% #{i}", response[:cut]))
+    return corpus
+
+
+def _try(parse, text: str):
+    try:
+        return parse(text)
+    except (AnalysisError, ValueError, KeyError, TypeError):
+        return None
+
+
+def run(corpus: List[Tuple[str, str]]) -> None:
+    kinds: Dict[str, List[str]] = {}
+    for name, text in corpus:
+        kinds.setdefault(name.split(" #")[0], []).append(text)
+
+    print(f"{'kind':<18}{'n':>3}{'legacy ok':>11}{'new ok':>8}{'legacy µs':>11}{'new µs':>9}")
+    for kind, texts in kinds.items():
+        legacy_ok = sum(_try(parse_analysis_response_legacy, t) is not None for t in texts)
+        new_ok = sum(_try(parse_analysis_response, t) is not None for t in texts)
+        number = 200
+        legacy = min(timeit.repeat(
+            lambda: [_try(parse_analysis_response_legacy, t) for t in texts], number=number, repeat=3,
+        ))
+        new = min(timeit.repeat(
+            lambda: [_try(parse_analysis_response, t) for t in texts], number=number, repeat=3,
+        ))
+        per_call = number * len(texts)
+        print(
+            f"{kind:<18}{len(texts):>3}{legacy_ok:>11}{new_ok:>8}"
+            f"{legacy / per_call * 1e6:>11.1f}{new / per_call * 1e6:>9.1f}"
+        )
+
+
+def main() -> None:
+    # Malformed responses log warnings and errors; keep them out of the timings
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.CRITICAL))
+    if len(sys.argv) > 1:
+        corpus = [(Path(p).name, Path(p).read_text(errors="replace")) for p in sys.argv[1:]]
+    else:
+        corpus = build_corpus(random.Random(0))
+    run(corpus)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark summarize_html against the previous regex implementation.
+
+Usage (from backend/):
+    python -m benchmarks.bench_summarize_html [page.html ...]
+
+Without arguments it runs on generated pages shaped like large real-world
+landing pages: SPA bundles inlined as <script> tags, big inline styles,
+JSON hydration state and long server-rendered bodies. Save real pages
+(e.g. with "curl -o page.html") and pass them to benchmark those instead.
+"""
+
+import random
+import re
+import string
+import sys
+import timeit
+from pathlib import Path
+
+from app.services.scraper import summarize_html
+
+MAX_LENGTH = 2000
+
+
+def summarize_html_regex(html: str, max_length: int = 5000) -> str:
+    """The previous implementation, kept for comparison and as the reference in tests/test_scraper.py."""
+    html = re.sub(r'<script[^>]*>.*?</script>', '', html, flags=re.DOTALL | re.IGNORECASE)
+    html = re.sub(r'<style[^>]*>.*?</style>', '', html, flags=re.DOTALL | re.IGNORECASE)
+    html = re.sub(r'<!--.*?-->', '', html, flags=re.DOTALL)
+    html = re.sub(r'\s+', ' ', html)
+    if len(html) > max_length:
+        html = html[:max_length] + "... [truncated]"
+    return html
+
+
+def _words(rng: random.Random, count: int) -> str:
+    return " ".join(
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 10))) for _ in range(count)
+    )
+
+
+def generate_page(rng: random.Random, scripts: int, script_kb: int, sections: int) -> str:
+    """A landing page with inline bundles up front and a long body after."""
+    head = ["<!doctype html><html><head><title>Landing</title>"]
+    head.append("<style>" + ".c{color:red}\n" * (script_kb * 40) + "</style>")
+    for _ in range(scripts):
+        head.append('<script type="module">' + "var a=1;\n" * (script_kb * 110) + "</script>")
+    head.append("</head><body>")
+    body = []
+    for index in range(sections):
+        body.append(
+            f'<section id="s{index}">\n  <!-- section {index} -->\n'
+            f"  <h2>{_words(rng, 6)}</h2>\n  <p>{_words(rng, 80)}</p>\n"
+            f'  <a class="btn" href="/signup">Start</a>\n</section>\n'
+        )
+    state = '<script id="__NEXT_DATA__" type="application/json">' + '{"k":"v"}' * 20000 + "</script>"
+    return "".join(head) + "".join(body) + state + "</body></html>"
+
+
+def run(name: str, html: str) -> None:
+    legacy = summarize_html_regex(html, MAX_LENGTH)
+    current = summarize_html(html, MAX_LENGTH)
+    number = 5
+    legacy_s = min(timeit.repeat(lambda: summarize_html_regex(html, MAX_LENGTH), number=number, repeat=3)) / number
+    current_s = min(timeit.repeat(lambda: summarize_html(html, MAX_LENGTH), number=number, repeat=3)) / number
+    print(
+        f"{name:<28} {len(html) / 1e6:>6.2f} MB  regex {legacy_s * 1000:>8.2f} ms  "
+        f"streaming {current_s * 1000:>7.2f} ms  x{legacy_s / current_s:>6.1f}  "
+        f"{'same output' if legacy == current else 'OUTPUT DIFFERS'}"
+    )
+
+
+def main() -> None:
+    if len(sys.argv) > 1:
+        pages = [(Path(p).name, Path(p).read_text(errors="replace")) for p in sys.argv[1:]]
+    else:
+        rng = random.Random(0)
+        pages = [
+            ("server-rendered, 0.3 MB", generate_page(rng, scripts=1, script_kb=20, sections=300)),
+            ("SPA bundles, 2 MB", generate_page(rng, scripts=8, script_kb=200, sections=50)),
+            ("SPA bundles, 6 MB", generate_page(rng, scripts=12, script_kb=450, sections=200)),
+        ]
+    for name, html in pages:
+        run(name, html)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""Tests for the Message Batches analyzer backend, against a local stand-in batch server."""
+
+import asyncio
+import json
+
+import anthropic
+import httpx
+import pytest
+
+from app.services import analysis_batches, analysis_cache
+from app.services.analysis_batches import BatchItem, collect_results, enqueue, submit_pending
+from app.services.analyzer import prepare_request, result_from_message
+from app.workers.tasks import batches as batch_tasks
+from tests.test_analyzer import VALID_RESPONSE, _scraped
+
+
+class _FakeRedis:
+    """The few Redis commands the batch queue uses."""
+
+    def __init__(self):
+        self.lists = {}
+        self.hashes = {}
+        self.strings = {}
+
+    async def rpush(self, key, *values):
+        self.lists.setdefault(key, []).extend(_b(v) for v in values)
+
+    async def lpush(self, key, *values):
+        for value in values:
+            self.lists.setdefault(key, []).insert(0, _b(value))
+
+    async def lpop(self, key, count):
+        items = self.lists.get(key, [])
+        popped, self.lists[key] = items[:count], items[count:]
+        return popped or None
+
+    async def hset(self, key, field=None, value=None, mapping=None):
+        entries = self.hashes.setdefault(key, {})
+        for f, v in {**(mapping or {}), **({field: value} if field is not None else {})}.items():
+            entries[_b(f)] = _b(v)
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    async def hdel(self, key, field):
+        removed = int(self.hashes.get(key, {}).pop(_b(field), None) is not None)
+        if key in self.hashes and not self.hashes[key]:
+            del self.hashes[key]
+        return removed
+
+    async def hlen(self, key):
+        return len(self.hashes.get(key, {}))
+
+    async def get(self, key):
+        return None
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.strings:
+            return None
+        if nx:
+            self.strings[key] = value
+        return True
+
+    async def expire(self, key, seconds):
+        return key in self.strings
+
+    async def delete(self, key):
+        return int(self.strings.pop(key, None) is not None)
+
+
+def _b(value):
+    return value if isinstance(value, bytes) else str(value).encode()
+
+
+class _BatchServer:
+    """Stand-in for the Message Batches endpoints, served through httpx.MockTransport."""
+
+    def __init__(self):
+        self.batches = {}
+        self.fail_create = None  # Status code to answer batch creation with
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if request.method == "POST" and path == "/v1/messages/batches":
+            if self.fail_create:
+                error_type = "api_error" if self.fail_create >= 500 else "invalid_request_error"
+                error = {"type": "error", "error": {"type": error_type, "message": "refused"}}
+                return httpx.Response(self.fail_create, json=error)
+            batch_id = f"msgbatch_{len(self.batches) + 1}"
+            self.batches[batch_id] = {"requests": json.loads(request.content)["requests"], "ended": False}
+            return httpx.Response(200, json=self._batch(batch_id))
+        if path.endswith("/results"):
+            batch_id = path.split("/")[-2]
+            lines = [json.dumps(self._result(r)) for r in self.batches[batch_id]["requests"]]
+            return httpx.Response(200, content="\n".join(lines).encode())
+        batch_id = path.rsplit("/", 1)[-1]
+        return httpx.Response(200, json=self._batch(batch_id))
+
+    def _batch(self, batch_id):
+        ended = self.batches[batch_id]["ended"]
+        return {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {"processing": 0, "succeeded": 0, "errored": 0, "canceled": 0, "expired": 0},
+            "results_url": f"http://batches.test/v1/messages/batches/{batch_id}/results" if ended else None,
+            "created_at": "2026-01-01T00:00:00Z",
+            "expires_at": "2026-01-02T00:00:00Z",
+        }
+
+    @staticmethod
+    def _result(request):
+        if request["custom_id"].startswith("bad"):
+            return {
+                "custom_id": request["custom_id"],
+                "result": {
+                    "type": "errored",
+                    "error": {"type": "error", "error": {"type": "invalid_request_error", "message": "prompt too long"}},
+                },
+            }
+        return {
+            "custom_id": request["custom_id"],
+            "result": {
+                "type": "succeeded",
+                "message": {
+                    "id": "msg_1",
+                    "type": "message",
+                    "role": "assistant",
+                    "model": request["params"]["model"],
+                    "content": [{"type": "text", "text": VALID_RESPONSE.strip()[1:]}],
+                    "stop_reason": "end_turn",
+                    "usage": {"input_tokens": 900, "output_tokens": 400},
+                },
+            },
+        }
+
+
+class _FakeSupabase:
+    """Records the calls the batch poller makes."""
+
+    def __init__(self):
+        self.statuses = {}
+        self.reports = []
+        self.usage_logs = []
+
+    async def create_report(self, **report):
+        self.reports.append(report)
+        return {"id": f"report-{len(self.reports)}"}
+
+    async def get_profile(self, user_id):
+        return None
+
+    async def update_analysis_status(self, analysis_id, status, error_code=None, error_message=None):
+        self.statuses[analysis_id] = status
+
+    async def _post(self, table, data):
+        self.usage_logs.append(data["metadata"])
+
+    async def close(self):
+        pass
+
+
+def _drop_results_after(client, count):
+    """Make the results of a batch fail with a dropped connection after count entries."""
+    results = client.messages.batches.results
+
+    async def broken(batch_id):
+        entries = await results(batch_id)
+
+        async def read():
+            seen = 0
+            async for entry in entries:
+                if seen == count:
+                    raise httpx.ReadError("connection reset")
+                seen += 1
+                yield entry
+
+        return read()
+
+    client.messages.batches.results = broken
+
+
+def _item(analysis_id):
+    request = prepare_request(_scraped())
+    return BatchItem(
+        analysis_id=analysis_id,
+        user_id="user-1",
+        url="https://example.com",
+        params=request.params,
+        cache_key=request.cache_key,
+        page_metadata={"title": "Example"},
+    )
+
+
+class TestAnalysisBatches:
+    """Tests for queueing, submitting and collecting batched analyses."""
+
+    @pytest.fixture
+    def redis(self, monkeypatch):
+        redis = _FakeRedis()
+        monkeypatch.setattr(analysis_batches, "get_redis", lambda: redis)
+        monkeypatch.setattr(analysis_cache, "get_redis", lambda: redis)
+        return redis
+
+    @pytest.fixture
+    def server(self):
+        return _BatchServer()
+
+    def _client(self, server):
+        return anthropic.AsyncAnthropic(
+            api_key="test",
+            base_url="http://batches.test",
+            max_retries=0,
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(server.handler)),
+        )
+
+    def test_submit_then_collect_when_ended(self, redis, server):
+        async def run():
+            client = self._client(server)
+            await enqueue(_item("a1"))
+            await enqueue(_item("bad1"))
+            batch_id = await submit_pending(client)
+
+            still_running = [o async for o in collect_results(client)]
+            server.batches[batch_id]["ended"] = True
+            outcomes = [o async for o in collect_results(client)]
+            again = [o async for o in collect_results(client)]
+            return batch_id, still_running, outcomes, again
+
+        batch_id, still_running, outcomes, again = asyncio.run(run())
+
+        submitted = server.batches[batch_id]["requests"]
+        assert [r["custom_id"] for r in submitted] == ["a1", "bad1"]
+        assert submitted[0]["params"]["system"][0]["cache_control"] == {"type": "ephemeral"}
+        assert still_running == [] and again == []
+        assert not redis.lists[analysis_batches.QUEUE_KEY]
+
+        by_id = {o.item.analysis_id: o for o in outcomes}
+        assert by_id["bad1"].error == "prompt too long"
+        assert by_id["a1"].item.page_metadata == {"title": "Example"}
+        result = result_from_message(by_id["a1"].message)
+        assert result["score"] == 72
+        assert result["_usage"]["input_tokens"] == 900
+
+    @pytest.mark.parametrize("status", [500, 529, 429])
+    def test_failed_submission_requeues_in_order(self, redis, server, status):
+        server.fail_create = status
+
+        async def run():
+            for analysis_id in ("a1", "a2"):
+                await enqueue(_item(analysis_id))
+            with pytest.raises(anthropic.APIError):
+                await submit_pending(self._client(server))
+
+        asyncio.run(run())
+        queued = [json.loads(v)["analysis_id"] for v in redis.lists[analysis_batches.QUEUE_KEY]]
+        assert queued == ["a1", "a2"]
+        assert analysis_batches.ACTIVE_KEY not in redis.hashes
+
+    def test_rejected_batch_fails_its_analyses(self, redis, server, monkeypatch):
+        server.fail_create = 400
+        supabase = _FakeSupabase()
+        monkeypatch.setattr(batch_tasks, "get_supabase_service", lambda: supabase)
+        real_submit = analysis_batches.submit_pending
+        monkeypatch.setattr(analysis_batches, "submit_pending", lambda: real_submit(self._client(server)))
+
+        async def run():
+            for analysis_id in ("a1", "a2"):
+                await enqueue(_item(analysis_id))
+            return await batch_tasks._submit_analysis_batch_async()
+
+        result = asyncio.run(run())
+        assert result["failed"] == 2
+        assert supabase.statuses == {"a1": "failed", "a2": "failed"}
+        assert not redis.lists.get(analysis_batches.QUEUE_KEY)
+        assert [log["batch"] for log in supabase.usage_logs] == [True, True]
+
+    def test_poller_creates_reports_and_fails_errored_requests(self, redis, server, monkeypatch):
+        supabase = _FakeSupabase()
+        client = None
+
+        async def run():
+            nonlocal client
+            client = self._client(server)
+            await enqueue(_item("a1"))
+            await enqueue(_item("bad1"))
+            batch_id = await submit_pending(client)
+            server.batches[batch_id]["ended"] = True
+            return await batch_tasks._poll_analysis_batches_async()
+
+        monkeypatch.setattr(batch_tasks, "get_supabase_service", lambda: supabase)
+        real_collect = analysis_batches.collect_results
+        monkeypatch.setattr(analysis_batches, "collect_results", lambda: real_collect(client))
+
+        assert asyncio.run(run()) == {"completed": 1, "failed": 1}
+        assert supabase.statuses == {"a1": "completed", "bad1": "failed"}
+        assert supabase.reports[0]["score"] == 72
+        assert supabase.reports[0]["page_metadata"] == {"title": "Example"}
+        assert all(log["batch"] for log in supabase.usage_logs)
+
+    def test_failed_results_read_resumes_with_unfinished_analyses(self, redis, server):
+        handled = []
+
+        async def run():
+            client = self._client(server)
+            for analysis_id in ("a1", "a2", "a3"):
+                await enqueue(_item(analysis_id))
+            batch_id = await submit_pending(client)
+            server.batches[batch_id]["ended"] = True
+
+            failing = self._client(server)
+            _drop_results_after(failing, 2)
+            async for outcome in collect_results(failing):
+                handled.append(outcome.item.analysis_id)
+            first = list(handled)
+            items_key = analysis_batches.ITEMS_KEY.format(batch_id=batch_id)
+            remaining = sorted(k.decode() for k in redis.hashes[items_key])
+
+            async for outcome in collect_results(client):
+                handled.append(outcome.item.analysis_id)
+            return first, remaining
+
+        first, remaining = asyncio.run(run())
+        assert first == ["a1", "a2"]
+        assert remaining == ["a3"]
+        assert handled[2:] == ["a3"]
+        assert analysis_batches.ACTIVE_KEY not in redis.hashes
+        assert not redis.strings
+
+    def test_claimed_batch_is_skipped(self, redis, server):
+        async def run():
+            client = self._client(server)
+            await enqueue(_item("a1"))
+            batch_id = await submit_pending(client)
+            server.batches[batch_id]["ended"] = True
+            redis.strings[analysis_batches.CLAIM_KEY.format(batch_id=batch_id)] = "1"
+            return [o async for o in collect_results(client)]
+
+        assert asyncio.run(run()) == []
+        assert analysis_batches.ACTIVE_KEY in redis.hashes
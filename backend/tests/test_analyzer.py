@@ -1,8 +1,28 @@
 """Tests for the analyzer service — JSON parsing and validation."""
 
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
 import pytest
-from app.services.analyzer import parse_analysis_response, calculate_overall_score
+from app.core.deadline import Deadline
+from app.services import analysis_cache, analyzer
+from app.services.analyzer import (
+    CategoryStreamParser,
+    analyze_page,
+    calculate_overall_score,
+    format_blocked_requests,
+    format_dom_digest,
+    format_mobile_stats,
+    format_performance,
+    parse_analysis_response,
+    repair_truncated_json,
+)
 from app.core.errors import AnalysisError
+from app.services.prompt_budget import estimate_tokens
+from app.services.artifacts import Artifact, ArtifactStore
+from app.services.scraper import ScrapedPage
 
 
 # --- Fixtures ---
@@ -103,6 +123,72 @@ class TestParseAnalysisResponse:
         result = parse_analysis_response(response)
         assert result["categories"][0]["score"] == 100
 
+    def test_text_around_json(self):
+        result = parse_analysis_response(f"Here is the analysis:\n{VALID_RESPONSE}\nHope it helps!")
+        assert result["score"] == 72
+
+    def test_smart_quotes_and_control_chars(self):
+        response = '{\u201cscore\u201d: 50, "summary": "te\x0bst", "categories": []}'
+        result = parse_analysis_response(response)
+        assert result["score"] == 50 and result["summary"] == "test"
+
+    def test_null_fields_get_defaults(self):
+        response = '''{
+            "score": 50, "summary": "test",
+            "categories": [{"name": "cta", "label": null, "score": null, "issues": [{"title": null}]}]
+        }'''
+        category = parse_analysis_response(response)["categories"][0]
+        assert category["label"] == "cta" and category["score"] == 50
+        assert category["issues"] == [
+            {"severity": "info", "title": "Issue", "description": "", "recommendation": ""}
+        ]
+
+    def test_truncated_response_keeps_complete_categories(self, monkeypatch):
+        monkeypatch.setattr(analyzer.settings, "ANALYSIS_MIN_CATEGORIES", 1)
+        cut = VALID_RESPONSE.index('"name": "cta"') + 10
+        result = parse_analysis_response(VALID_RESPONSE[:cut])
+        assert result["_truncated"] is True
+        assert [c["name"] for c in result["categories"]] == ["headline"]
+        assert result["categories"][0]["issues"][0]["title"] == "Headline too long"
+
+    def test_truncated_between_categories(self, monkeypatch):
+        monkeypatch.setattr(analyzer.settings, "ANALYSIS_MIN_CATEGORIES", 1)
+        cut = VALID_RESPONSE.index('"name": "cta"') - 12
+        result = parse_analysis_response(VALID_RESPONSE[:cut])
+        assert [c["name"] for c in result["categories"]] == ["headline"]
+
+    def test_truncated_to_too_few_categories_raises(self):
+        # Cut inside the first category: nothing complete survives the repair
+        with pytest.raises(AnalysisError, match="cut off after 0 of 8 categories"):
+            parse_analysis_response(VALID_RESPONSE[:150])
+        # One complete category is below the default minimum
+        with pytest.raises(AnalysisError, match="cut off after 1 of 8 categories"):
+            parse_analysis_response(VALID_RESPONSE[:VALID_RESPONSE.index('"name": "cta"') - 12])
+
+    def test_truncated_before_summary_raises(self):
+        with pytest.raises(AnalysisError, match="Missing or invalid summary"):
+            parse_analysis_response('{"score": 72, "summ')
+
+
+class TestRepairTruncatedJson:
+    """Tests for repair_truncated_json()."""
+
+    def test_drops_partial_string_and_closes_containers(self):
+        repaired, closed = repair_truncated_json('{"a": [1, "x\\"y", {"b": "unfin')
+        assert json.loads(repaired) == {"a": [1, 'x"y']}
+        assert closed == 2
+
+    def test_drops_dangling_key_and_partial_literal(self):
+        assert json.loads(repair_truncated_json('{"a": 1, "b": tr')[0]) == {"a": 1}
+        assert json.loads(repair_truncated_json('{"a": 1, "b')[0]) == {"a": 1}
+
+    def test_complete_document_is_returned_whole(self):
+        assert repair_truncated_json('{"a": {"b": [1]}} trailing') == ('{"a": {"b": [1]}}', 0)
+
+    def test_nothing_to_keep(self):
+        assert repair_truncated_json("no json here") is None
+        assert repair_truncated_json('{"a": "never closed') is None
+
 
 class TestCalculateOverallScore:
     """Tests for calculate_overall_score()."""
@@ -130,3 +216,501 @@ class TestCalculateOverallScore:
         ]
         result = calculate_overall_score(categories)
         assert 0 <= result <= 100
+
+
+class TestFormatBlockedRequests:
+    """Tests for format_blocked_requests()."""
+
+    def test_nothing_blocked(self):
+        assert format_blocked_requests({}) == "None"
+        assert format_blocked_requests({"total": 0, "by_category": {}}) == "None"
+
+    def test_summary_lists_categories_and_domains(self):
+        text = format_blocked_requests({
+            "total": 5,
+            "by_category": {"analytics": 3, "chat": 2},
+            "top_domains": ["www.google-analytics.com", "widget.intercom.io"],
+        })
+        assert text.startswith("5 (3 analytics, 2 chat)")
+        assert "widget.intercom.io" in text
+
+
+class TestFormatMobileStats:
+    """Tests for format_mobile_stats()."""
+
+    def test_not_captured(self):
+        assert format_mobile_stats(None) == "Not captured"
+
+    def test_reports_overflow_and_small_targets(self):
+        text = format_mobile_stats({
+            "viewportWidth": 390,
+            "scrollWidth": 620,
+            "horizontalScroll": True,
+            "hasViewportMeta": False,
+            "tapTargets": 40,
+            "smallTapTargets": 12,
+            "textElements": 200,
+            "smallTextElements": 8,
+            "loadTimeMs": 2100,
+        })
+        assert "viewport meta tag MISSING" in text
+        assert "horizontal scrolling (620px wide)" in text
+        assert "12 of 40 tap targets" in text
+
+
+class TestFormatPerformance:
+    """Tests for format_performance()."""
+
+    def test_not_measured(self):
+        assert format_performance({}) == "Not measured"
+
+    def test_rates_vitals_and_lists_heaviest_types(self):
+        text = format_performance({
+            "ttfb_ms": 300,
+            "lcp_ms": 5200,
+            "cls": 0.15,
+            "tbt_ms": 0,
+            "request_count": 48,
+            "transfer_bytes": 2048 * 1024,
+            "bytes_by_type": {"image": 1500 * 1024, "script": 500 * 1024, "font": 0},
+        })
+        assert "LCP 5200ms (poor)" in text
+        assert "CLS 0.15 (needs improvement)" in text
+        assert "TTFB 300ms (good)" in text
+        assert "48 requests, 2048 KB transferred" in text
+        assert "heaviest: image 1500 KB, script 500 KB" in text
+
+    def test_skips_unmeasured_metrics(self):
+        text = format_performance({"lcp_ms": None, "cls": 0.0, "request_count": 1})
+        assert "LCP" not in text
+        assert "CLS 0.0 (good)" in text
+
+
+class TestFormatDomDigest:
+    """Tests for format_dom_digest()."""
+
+    def test_outline(self):
+        text = format_dom_digest({
+            "headings": [
+                {"level": 1, "text": "Get paid faster", "fold": True},
+                {"level": 2, "text": "Why us", "fold": False},
+            ],
+            "ctas": [{"text": "Start free trial", "href": "/signup", "fold": True}],
+            "forms": [{
+                "fields": [{"type": "email", "label": "Work email", "required": True}],
+                "submit": "Request demo",
+                "fold": False,
+            }],
+            "testimonials": [],
+            "logoCount": 0,
+            "styles": {"primaryCta": {"fontSize": 16, "fontWeight": "600", "contrast": 2.1}},
+        })
+        assert "- H1: Get paid faster [above fold]" in text
+        assert "  - H2: Why us" in text
+        assert '- "Start free trial" -> /signup [above fold]' in text
+        assert 'Form 1: Work email (required); submit "Request demo"' in text
+        assert "Primary CTA style: 16px, weight 600, contrast 2.1:1" in text
+
+    def test_no_ctas_is_called_out(self):
+        assert "Buttons and CTA links: none found" in format_dom_digest({"headings": []})
+
+
+class _FakeStream:
+    """Stands in for a MessageStream, yielding the response in small chunks."""
+
+    def __init__(self, messages, tool_output):
+        self.messages = messages
+        self.tool_output = tool_output
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def __aiter__(self):
+        await asyncio.sleep(self.messages.delay)
+        # The tool input is streamed whole; text follows the "{" prefill
+        text = "{" + self.messages.text if self.tool_output else self.messages.text
+        for start in range(0, len(text), 7):
+            if self.messages.fail_at is not None and start >= self.messages.fail_at:
+                raise RuntimeError("connection reset")
+            chunk = text[start:start + 7]
+            if self.tool_output:
+                yield SimpleNamespace(type="input_json", partial_json=chunk)
+            else:
+                yield SimpleNamespace(type="text", text=chunk)
+
+    async def get_final_message(self):
+        return _message(self.messages.text, self.messages.usage, self.tool_output)
+
+
+def _message(text, usage, tool_output=False):
+    """A Message answering the analysis prompt, as text after the prefill or as a tool call."""
+    if tool_output:
+        block = SimpleNamespace(type="tool_use", name=analyzer.REPORT_TOOL_NAME, input=json.loads("{" + text))
+    else:
+        block = SimpleNamespace(type="text", text=text)
+    return SimpleNamespace(content=[block], usage=usage, stop_reason="end_turn")
+
+
+class _FakeMessages:
+    """Stands in for AsyncAnthropic.messages, answering after a delay."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = []
+        self.text = VALID_RESPONSE.strip()[1:]
+        self.usage = SimpleNamespace(input_tokens=100, output_tokens=50)
+        self.fail_at = None
+
+    def stream(self, **kwargs):
+        self.calls.append(kwargs)
+        return _FakeStream(self, tool_output="tools" in kwargs)
+
+
+def _scraped(url="https://example.com"):
+    return ScrapedPage(
+        url=url,
+        final_url=url,
+        title="Example",
+        meta_description=None,
+        html="<html><h1>Hi</h1></html>",
+        text_content="Hi",
+        screenshot=b"",
+        load_time_ms=900,
+        word_count=1,
+        image_count=0,
+        link_count=0,
+        has_form=False,
+    )
+
+
+class TestAnalyzePage:
+    """Tests for analyze_page() on the shared async client."""
+
+    @pytest.fixture
+    def messages(self, monkeypatch):
+        messages = _FakeMessages(delay=0.2)
+        monkeypatch.setattr(analyzer, "get_anthropic", lambda: SimpleNamespace(messages=messages))
+        return messages
+
+    @pytest.fixture(autouse=True)
+    def cache(self, monkeypatch):
+        """Replace the Redis-backed analysis cache with a dict."""
+        entries, stats = {}, {"hits": 0, "misses": 0, "tokens_saved": 0}
+
+        async def load(key):
+            return json.loads(entries[key]) if key in entries else None
+
+        async def store(key, result):
+            entries[key] = json.dumps(result)
+
+        async def record_hit(tokens_saved):
+            stats["hits"] += 1
+            stats["tokens_saved"] += tokens_saved
+
+        async def record_miss():
+            stats["misses"] += 1
+
+        for name, fn in (("load", load), ("store", store), ("record_hit", record_hit), ("record_miss", record_miss)):
+            monkeypatch.setattr(analysis_cache, name, fn)
+        return stats
+
+    def test_analyses_run_concurrently_on_one_loop(self, messages):
+        async def run():
+            return await asyncio.gather(
+                *(analyze_page(_scraped(f"https://example.com/{i}")) for i in range(5))
+            )
+
+        start = time.monotonic()
+        results = asyncio.run(run())
+        assert time.monotonic() - start < 0.6
+        assert [r["score"] for r in results] == [72] * 5
+        assert results[0]["_usage"] == {
+            "input_tokens": 100,
+            "output_tokens": 50,
+            "cache_read_input_tokens": 0,
+            "cache_creation_input_tokens": 0,
+        }
+
+    def test_system_prompt_is_cacheable_and_cache_usage_recorded(self, messages):
+        messages.usage = SimpleNamespace(
+            input_tokens=40,
+            output_tokens=50,
+            cache_read_input_tokens=1200,
+            cache_creation_input_tokens=0,
+        )
+        result = asyncio.run(analyze_page(_scraped()))
+
+        system = messages.calls[0]["system"]
+        assert system[-1]["cache_control"] == {"type": "ephemeral"}
+        assert system[-1]["text"] == analyzer.TOOL_SYSTEM_PROMPT
+        assert result["_usage"]["cache_read_input_tokens"] == 1200
+
+    def test_report_is_requested_as_a_tool_call(self, messages):
+        published = []
+
+        async def on_category(category):
+            published.append(category["name"])
+
+        result = asyncio.run(analyze_page(_scraped(), on_category=on_category))
+        call = messages.calls[0]
+        assert call["tools"] == [analyzer.REPORT_TOOL]
+        assert call["tool_choice"] == {"type": "tool", "name": "submit_analysis"}
+        assert [m["role"] for m in call["messages"]] == ["user"]
+        assert call["messages"][0]["content"].endswith(analyzer.TOOL_CLOSING)
+        assert published == ["headline", "cta"]
+        assert result["score"] == 72 and result["categories"][0]["issues"][0]["title"] == "Headline too long"
+
+    def test_json_mode_prefills_the_response(self, messages, monkeypatch):
+        monkeypatch.setattr(analyzer.settings, "ANALYSIS_TOOL_OUTPUT", False)
+        published = []
+
+        async def on_category(category):
+            published.append(category["name"])
+
+        result = asyncio.run(analyze_page(_scraped(), on_category=on_category))
+        call = messages.calls[0]
+        assert "tools" not in call
+        assert call["system"][-1]["text"] == analyzer.SYSTEM_PROMPT
+        assert call["messages"][-1] == {"role": "assistant", "content": "{"}
+        assert call["messages"][0]["content"].endswith(analyzer.JSON_CLOSING)
+        assert published == ["headline", "cta"]
+        assert result["score"] == 72
+
+    def test_call_is_bounded_by_the_deadline(self, messages):
+        messages.delay = 5
+
+        async def run():
+            with Deadline(0.1).activate():
+                await analyze_page(_scraped())
+
+        with pytest.raises(AnalysisError, match="did not respond"):
+            asyncio.run(run())
+        assert messages.calls[0]["timeout"] <= 0.1
+
+    def test_repeat_analysis_is_served_from_cache(self, messages, cache):
+        first = asyncio.run(analyze_page(_scraped()))
+        second = asyncio.run(analyze_page(_scraped()))
+
+        assert len(messages.calls) == 1
+        assert second["categories"] == first["categories"]
+        assert first["_cache"] == {"hit": False, "tokens_saved": 0}
+        assert second["_cache"] == {"hit": True, "tokens_saved": 150}
+        assert second["_usage"]["input_tokens"] == 0
+        assert cache == {"hits": 1, "misses": 1, "tokens_saved": 150}
+
+    def test_categories_are_published_as_they_complete(self, messages):
+        published = []
+
+        async def on_category(category):
+            published.append(category["name"])
+
+        result = asyncio.run(analyze_page(_scraped(), on_category=on_category))
+        assert published == ["headline", "cta"]
+        assert [c["name"] for c in result["categories"]] == published
+
+    def test_rule_preview_comes_before_the_model(self, messages):
+        events = []
+
+        async def on_preview(categories):
+            events.append(("preview", [c["name"] for c in categories]))
+
+        async def on_category(category):
+            events.append(("category", category["name"]))
+
+        asyncio.run(analyze_page(_scraped(), on_category=on_category, on_preview=on_preview))
+        assert events[0] == ("preview", ["trust", "speed"])
+        assert events[1:] == [("category", "headline"), ("category", "cta")]
+        assert "**Automated checks**" in messages.calls[0]["messages"][0]["content"]
+        assert "[trust] PASS: Served over HTTPS" in messages.calls[0]["messages"][0]["content"]
+
+    def test_late_failure_keeps_published_categories(self, messages):
+        messages.fail_at = messages.text.index('"name": "cta"')
+        published = []
+
+        async def on_category(category):
+            published.append(category)
+
+        with pytest.raises(AnalysisError):
+            asyncio.run(analyze_page(_scraped(), on_category=on_category))
+        assert [c["name"] for c in published] == ["headline"]
+        assert published[0]["issues"][0]["severity"] == "warning"
+
+
+class TestParseToolInput:
+    """Tests for reading the report from a tool call."""
+
+    def test_input_is_normalized(self):
+        result = analyzer.parse_tool_input({
+            "score": 140, "summary": "s",
+            "categories": [{"name": "cta", "score": 40, "issues": [{"severity": "high", "title": "t"}]}],
+        })
+        assert result["score"] == 100
+        assert result["categories"][0]["label"] == "cta"
+        assert result["categories"][0]["issues"][0]["severity"] == "info"
+
+    def test_truncated_input_drops_the_last_category(self, monkeypatch):
+        monkeypatch.setattr(analyzer.settings, "ANALYSIS_MIN_CATEGORIES", 1)
+        tool_input = json.loads(VALID_RESPONSE)
+        tool_input["categories"][1]["issues"] = [{"severity": "warning"}]
+        result = analyzer.parse_tool_input(tool_input, truncated=True)
+        assert [c["name"] for c in result["categories"]] == ["headline"]
+        assert result["_truncated"] is True
+        assert len(tool_input["categories"]) == 2
+
+    def test_truncated_input_keeps_a_complete_last_category(self, monkeypatch):
+        monkeypatch.setattr(analyzer.settings, "ANALYSIS_MIN_CATEGORIES", 1)
+        result = analyzer.parse_tool_input(json.loads(VALID_RESPONSE), truncated=True)
+        assert [c["name"] for c in result["categories"]] == ["headline", "cta"]
+
+    def test_truncated_input_with_too_few_categories_raises(self):
+        tool_input = {"score": 70, "summary": "s", "categories": [{"name": "headline", "score": 8}]}
+        with pytest.raises(AnalysisError, match="cut off after 0 of 8 categories"):
+            analyzer.parse_tool_input(tool_input, truncated=True)
+
+    def test_invalid_input_raises(self):
+        with pytest.raises(AnalysisError, match="Missing or invalid summary"):
+            analyzer.parse_tool_input({"score": 50, "categories": []})
+
+    def test_message_without_report_raises(self):
+        message = SimpleNamespace(content=[], usage=None, stop_reason="end_turn")
+        with pytest.raises(AnalysisError, match="no report"):
+            analyzer.parse_message(message)
+
+
+class TestCategoryStreamParser:
+    """Tests for incremental category parsing."""
+
+    def _feed_all(self, text, size):
+        parser = CategoryStreamParser()
+        done = []
+        for start in range(0, len(text), size):
+            done.extend(parser.feed(text[start:start + size]))
+        return done
+
+    def test_matches_full_parse_at_any_chunk_size(self):
+        expected = parse_analysis_response(VALID_RESPONSE)["categories"]
+        for size in (1, 2, 5, 64, len(VALID_RESPONSE)):
+            assert self._feed_all(VALID_RESPONSE, size) == expected
+
+    def test_ignores_braces_and_keys_inside_strings(self):
+        text = (
+            '{"summary": "a \\"categories\\": [{ trap }", "categories": ['
+            '{"name": "cta", "score": 40, "issues": [{"severity": "critical", '
+            '"title": "}]", "description": "x", "recommendation": "y"}]}'
+            '], "extra": [{"name": "not a category"}]}'
+        )
+        done = self._feed_all(text, 3)
+        assert [c["name"] for c in done] == ["cta"]
+        assert done[0]["issues"][0]["title"] == "}]"
+
+    def test_skips_malformed_category(self):
+        text = '{"categories": [{"name": "cta", "score": "high"}, {"name": "form"}]}'
+        assert [c["name"] for c in self._feed_all(text, 4)] == ["form"]
+
+
+class TestAnalysisCache:
+    """Tests for the analysis result cache in front of analyze_page()."""
+
+    def test_cache_inputs_ignore_timing_noise(self):
+        a, b = _scraped(), _scraped()
+        a.load_time_ms, b.load_time_ms = 1210, 1390
+        a.performance = {"lcp_ms": 1800, "cls": 0.01}
+        b.performance = {"lcp_ms": 2100, "cls": 0.02}
+        b.url = "https://EXAMPLE.com/?utm_source=ad"
+
+        def key(page):
+            return analysis_cache.cache_key(analyzer._cache_inputs(page, "Hi  there", "h1", 2000))
+
+        assert key(a) == key(b)
+
+        b.performance = {"lcp_ms": 5000, "cls": 0.02}
+        assert key(a) != key(b)
+
+    def test_prompt_version_changes_the_key(self, monkeypatch):
+        def key():
+            return analysis_cache.cache_key(analyzer._cache_inputs(_scraped(), "Hi", "h1", 2000))
+
+        before = key()
+        monkeypatch.setattr(analyzer, "PROMPT_VERSION", "next")
+        assert key() != before
+
+
+def _no_full_read(self):
+    raise AssertionError("spilled artifact read back whole")
+
+
+class TestPrepareRequest:
+    """Tests for the token-budgeted prompt."""
+
+    def test_prompt_stays_within_budget(self):
+        page = _scraped()
+        page.text_content = "Start your free trial today.   \n\n\n" * 2000
+        page.html = "<html><body>" + "<h2>Feature</h2><p>Does things</p>" * 2000 + "</body></html>"
+        request = analyzer.prepare_request(page, input_budget=1500)
+
+        prompt = request.params["messages"][0]["content"]
+        assert estimate_tokens(prompt) <= 1500
+        assert "   " not in prompt
+        assert set(request.budget["allocated"]) == {"page_structure", "text_content"}
+
+    def test_spilled_page_is_read_only_as_far_as_the_prompt_needs(self, monkeypatch):
+        reads = []
+        monkeypatch.setattr(Artifact, "read", _no_full_read)
+        real_read_text = Artifact.read_text
+
+        def read_text(self, limit=None):
+            reads.append((self.name, limit))
+            return real_read_text(self, limit)
+
+        monkeypatch.setattr(Artifact, "read_text", read_text)
+        page = _scraped()
+        with ArtifactStore(spill_bytes=0) as store:
+            page.html = store.put("html", "<p>" + "Does things. " * 200_000 + '</p><a href="/terms">T</a>')
+            page.text_content = store.put("text", "Does things. " * 200_000)
+            analyzer.prepare_request(page, input_budget=1500)
+        assert reads == [("html", 1500 * 8 * analyzer.HTML_READ_FACTOR), ("text", 1500 * 8)]
+
+    def test_max_tokens_grows_with_measured_problems(self):
+        clean, messy = _scraped(), _scraped()
+        clean.meta_description = "A page"
+        messy.load_time_ms = 9000
+        messy.mobile = {
+            "viewportWidth": 390, "hasViewportMeta": False, "horizontalScroll": True, "scrollWidth": 800,
+            "smallTapTargets": 9, "tapTargets": 20, "smallTextElements": 0, "textElements": 50,
+        }
+        messy.performance = {"lcp_ms": 6000, "cls": 0.4}
+        assert (
+            analyzer.prepare_request(messy).params["max_tokens"]
+            > analyzer.prepare_request(clean).params["max_tokens"]
+        )
+
+    def test_static_scrape_leaves_out_browser_measurements(self):
+        page = _scraped()
+        page.engine = "static"
+        captured = _scraped()
+        captured.engine = "static"
+        captured.load_time_ms = 9000
+        captured.performance = {"lcp_ms": 6000}
+        captured.mobile = {"viewportWidth": 390, "horizontalScroll": True}
+
+        before, after = analyzer.prepare_request(page), analyzer.prepare_request(captured)
+        prompt = after.params["messages"][0]["content"]
+        assert analyzer.STATIC_MEASUREMENTS in prompt
+        assert "**Load time**" not in prompt and "**Mobile rendering**" not in prompt
+        assert not [f for f in after.checks.findings if f.check == "load_time"]
+        assert after.cache_key == before.cache_key
+        assert after.params == before.params
+
+    def test_budget_is_compared_with_usage(self):
+        request = analyzer.prepare_request(_scraped())
+        message = _message(
+            VALID_RESPONSE.strip()[1:],
+            SimpleNamespace(input_tokens=100, output_tokens=700, cache_read_input_tokens=800),
+            tool_output=True,
+        )
+        budget = analyzer.result_from_message(message, request)["_budget"]
+        assert budget["input_tokens"] == 900 and budget["output_tokens"] == 700
+        assert budget["max_tokens"] == request.params["max_tokens"]
@@ -0,0 +1,86 @@
+"""Tests for the artifact store — spilling, lazy reads, cleanup."""
+
+import asyncio
+
+from app.services.artifacts import Artifact, ArtifactStore, iter_text, read_bytes, read_text
+from app.services.scraper import ScrapedPage
+
+
+async def _collect(artifact, chunk_size):
+    return [chunk async for chunk in artifact.iter_chunks(chunk_size)]
+
+
+class TestArtifactStore:
+    """Tests for ArtifactStore and Artifact."""
+
+    def test_small_values_stay_in_memory(self):
+        with ArtifactStore(spill_bytes=100) as store:
+            artifact = store.put("text", "short")
+            assert not artifact.spilled
+            assert artifact.read_text() == "short"
+            assert store.spilled_bytes == 0
+
+    def test_large_values_spill_and_are_removed_on_close(self):
+        store = ArtifactStore(spill_bytes=10)
+        artifact = store.put("screenshot", b"x" * 100)
+        assert artifact.spilled
+        assert artifact.size == 100 and store.spilled_bytes == 100
+        assert artifact.read() == b"x" * 100
+
+        path = artifact._path
+        store.close()
+        assert not path.exists()
+
+    def test_read_text_limit_reads_a_prefix(self):
+        with ArtifactStore(spill_bytes=0) as store:
+            artifact = store.put("text", "héllo wörld " * 1000)
+            assert artifact.read_text(limit=11) == "héllo wörld"
+
+    def test_iter_chunks(self):
+        with ArtifactStore(spill_bytes=0) as store:
+            artifact = store.put("screenshot", bytes(range(10)))
+            chunks = asyncio.run(_collect(artifact, 4))
+        assert [len(c) for c in chunks] == [4, 4, 2]
+        assert b"".join(chunks) == bytes(range(10))
+
+    def test_iter_text_windows_overlap(self):
+        with ArtifactStore(spill_bytes=0) as store:
+            artifact = store.put("text", "é" * 5 + "abcdef")
+            windows = list(artifact.iter_text(chunk_size=4, overlap=3))
+        # Each window repeats the previous one's last 3 characters, and a
+        # character split between two reads is decoded whole
+        assert windows == ["éé", "éééé", "ééééab", "éabcdef"]
+
+    def test_helpers_accept_plain_values(self):
+        assert read_text("abcdef", limit=3) == "abc"
+        assert read_text(None) == ""
+        assert list(iter_text("abc")) == ["abc"]
+        assert read_bytes(b"png") == b"png"
+        assert read_bytes(Artifact("x", 3, data=b"png")) == b"png"
+
+
+class TestScrapedPageSpill:
+    """Tests for ScrapedPage.spill()."""
+
+    def test_spills_large_fields_only(self):
+        page = ScrapedPage(
+            url="https://example.com",
+            final_url="https://example.com/",
+            title="Example",
+            meta_description=None,
+            html="<html>" + "x" * 1000 + "</html>",
+            text_content="Hello",
+            screenshot=b"\xff\xd8" * 1000,
+            load_time_ms=1200,
+            word_count=1,
+            image_count=0,
+            link_count=0,
+            has_form=False,
+        )
+        with ArtifactStore(spill_bytes=500) as store:
+            page.spill(store)
+            assert page.html.spilled and page.screenshot.spilled
+            assert not page.text_content.spilled
+            assert page.fold_screenshot is None
+            assert read_text(page.html).startswith("<html>x")
+            assert page.title == "Example"
@@ -0,0 +1,206 @@
+"""Tests for the browser pool and the worker's persistent event loop."""
+
+import asyncio
+
+import pytest
+
+from app.services import browser_pool
+from app.services.browser_pool import BrowserPool, get_browser_pool
+from app.workers import loop as worker_loop
+
+
+class _FakeBrowser:
+    """Stands in for a Playwright Browser."""
+
+    def __init__(self):
+        self.connected = True
+        self.closed = False
+        self.contexts = 0
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **kwargs):
+        self.contexts += 1
+        return object()
+
+    async def close(self):
+        self.closed = True
+        self.connected = False
+
+
+class _FakePlaywright:
+    """Stands in for async_playwright(): start() returns itself."""
+
+    def __init__(self):
+        self.browsers = []
+        self.chromium = self
+        self.stopped = False
+
+    async def start(self):
+        return self
+
+    async def launch(self, headless=True):
+        browser = _FakeBrowser()
+        self.browsers.append(browser)
+        return browser
+
+    async def stop(self):
+        self.stopped = True
+
+
+@pytest.fixture
+def playwright(monkeypatch):
+    fake = _FakePlaywright()
+    monkeypatch.setattr(browser_pool, "async_playwright", lambda: fake)
+    return fake
+
+
+def _run(make_pool, work):
+    """Run work(pool) on a fresh loop with a pool made on it."""
+    async def main():
+        pool = make_pool()
+        try:
+            return pool, await work(pool)
+        finally:
+            await pool.close()
+
+    return asyncio.run(main())
+
+
+class TestBrowserPool:
+    """Tests for leasing and recycling pooled browsers."""
+
+    def test_browser_is_reused_between_leases(self, playwright):
+        async def work(pool):
+            browsers = []
+            for _ in range(3):
+                async with pool.lease() as pooled:
+                    await pooled.new_context()
+                    browsers.append(pooled.browser)
+            return browsers
+
+        pool, browsers = _run(lambda: BrowserPool(size=2, max_pages=10, max_rss_mb=0), work)
+        assert browsers[0] is browsers[1] is browsers[2]
+        stats = pool.stats()
+        assert (stats.launched, stats.recycled, stats.in_use) == (1, 0, 0)
+        assert playwright.stopped and browsers[0].closed
+
+    def test_leases_wait_for_a_free_slot(self, playwright):
+        async def work(pool):
+            active, peak = 0, 0
+
+            async def scrape():
+                nonlocal active, peak
+                async with pool.lease():
+                    active += 1
+                    peak = max(peak, active)
+                    await asyncio.sleep(0.01)
+                    active -= 1
+
+            await asyncio.gather(*(scrape() for _ in range(5)))
+            return peak
+
+        pool, peak = _run(lambda: BrowserPool(size=2, max_pages=100, max_rss_mb=0), work)
+        assert peak == 2
+        assert pool.stats().launched == 2
+
+    def test_recycled_after_max_pages(self, playwright):
+        async def work(pool):
+            for _ in range(3):
+                async with pool.lease() as pooled:
+                    await pooled.new_context()
+
+        pool, _ = _run(lambda: BrowserPool(size=1, max_pages=2, max_rss_mb=0), work)
+        first, second = playwright.browsers
+        assert first.closed and first.contexts == 2
+        assert second.contexts == 1
+        assert (pool.stats().launched, pool.stats().recycled) == (2, 1)
+
+    def test_recycled_over_the_memory_limit(self, playwright, monkeypatch):
+        async def rss_mb(browser):
+            return 900
+
+        monkeypatch.setattr(browser_pool, "_browser_rss_mb", rss_mb)
+
+        async def work(pool):
+            async with pool.lease():
+                pass
+            return pool.stats()
+
+        _, stats = _run(lambda: BrowserPool(size=1, max_pages=100, max_rss_mb=500), work)
+        assert (stats.recycled, stats.idle) == (1, 0)
+
+    def test_disconnected_idle_browser_is_replaced(self, playwright):
+        async def work(pool):
+            async with pool.lease() as pooled:
+                first = pooled.browser
+            first.connected = False
+            async with pool.lease() as pooled:
+                return first, pooled.browser
+
+        pool, (first, second) = _run(lambda: BrowserPool(size=1, max_pages=100, max_rss_mb=0), work)
+        assert second is not first
+        assert pool.stats().recycled == 1
+
+    def test_pool_is_per_loop(self, playwright, monkeypatch):
+        monkeypatch.setattr(browser_pool, "_browser_pool", None)
+
+        async def pools():
+            return get_browser_pool(), get_browser_pool()
+
+        first = asyncio.run(pools())
+        second = asyncio.run(pools())
+        assert first[0] is first[1]
+        assert second[0] is not first[0]
+        assert second[0].loop is not first[0].loop
+
+
+class TestRunAsync:
+    """Tests for run_async() on the persistent worker loop."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_loop(self, monkeypatch):
+        monkeypatch.setattr(worker_loop, "_worker_loop", None)
+        yield
+        if worker_loop._worker_loop is not None:
+            worker_loop._worker_loop.close()
+
+    def test_loop_persists_between_tasks(self):
+        async def current():
+            return asyncio.get_running_loop()
+
+        assert worker_loop.run_async(current()) is worker_loop.run_async(current())
+
+    def test_interrupted_task_is_cancelled_before_the_next_one(self):
+        events = []
+
+        def interrupt():
+            # Like SoftTimeLimitExceeded, raised outside the task while the loop waits
+            raise KeyboardInterrupt
+
+        async def child():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                events.append("child released")
+                raise
+
+        async def task():
+            asyncio.get_running_loop().create_task(child())
+            asyncio.get_running_loop().call_later(0.01, interrupt)
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                events.append("task released")
+                raise
+
+        with pytest.raises(KeyboardInterrupt):
+            worker_loop.run_async(task())
+        assert sorted(events) == ["child released", "task released"]
+        assert not asyncio.all_tasks(worker_loop._worker_loop)
+
+        async def next_task():
+            return "ok"
+
+        assert worker_loop.run_async(next_task()) == "ok"
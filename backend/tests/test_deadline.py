@@ -0,0 +1,44 @@
+"""Tests for task deadlines — budgets, stages and the active deadline."""
+
+import time
+
+from app.core.deadline import MIN_BUDGET_S, Deadline, current_deadline, remaining_budget
+
+
+class TestDeadline:
+    """Tests for Deadline."""
+
+    def test_budget_keeps_reserve_and_cap(self):
+        deadline = Deadline(100)
+        assert 89 < deadline.budget(reserve=10) <= 90
+        assert deadline.budget(cap=5) == 5
+
+    def test_budget_never_zero(self):
+        deadline = Deadline(1)
+        assert deadline.budget(reserve=60) == MIN_BUDGET_S
+
+    def test_expired(self):
+        deadline = Deadline(0.01)
+        time.sleep(0.02)
+        assert deadline.expired and deadline.remaining == 0
+
+    def test_stage_activates_its_share(self):
+        deadline = Deadline(100)
+        with deadline.stage("scrape", reserve=60) as stage:
+            assert current_deadline() is stage
+            assert 39 < stage.seconds <= 40
+            assert remaining_budget(30) == 30
+            assert remaining_budget(300) <= 40
+        assert current_deadline() is None
+
+
+class TestRemainingBudget:
+    """Tests for remaining_budget()."""
+
+    def test_without_deadline_returns_cap(self):
+        assert remaining_budget(30) == 30
+
+    def test_shortened_by_active_deadline(self):
+        with Deadline(5).activate():
+            assert remaining_budget(30) <= 5
+            assert remaining_budget(30, reserve=10) == MIN_BUDGET_S
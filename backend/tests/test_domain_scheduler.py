@@ -0,0 +1,147 @@
+"""Tests for the per-domain scrape scheduler, run against fakeredis's Lua engine."""
+
+import asyncio
+import time
+
+import fakeredis
+import pytest
+
+from app.config import settings
+from app.services import domain_scheduler
+from app.services.domain_scheduler import ACQUIRE_SCRIPT, DomainBusyError, domain_slot
+
+SLOTS = "domain_scheduler:example.com:slots"
+NEXT = "domain_scheduler:example.com:next"
+
+
+async def _acquire(redis, lease_id, lease_ms=60_000, limit=2, interval_ms=0):
+    return await redis.eval(ACQUIRE_SCRIPT, 2, SLOTS, NEXT, lease_id, lease_ms, limit, interval_ms)
+
+
+class TestAcquireScript:
+    """Tests for ACQUIRE_SCRIPT."""
+
+    def test_acquires_up_to_the_limit(self):
+        async def run():
+            redis = fakeredis.FakeAsyncRedis()
+            results = [await _acquire(redis, f"lease-{i}") for i in range(3)]
+            return results, await redis.zcard(SLOTS)
+
+        results, held = asyncio.run(run())
+        # Full: no estimate, the lease expiry only bounds crashed holders
+        assert results == [0, 0, -1]
+        assert held == 2
+
+    def test_stale_holders_expire(self):
+        async def run():
+            redis = fakeredis.FakeAsyncRedis()
+            # Leases of crashed workers, already past their expiry
+            await redis.zadd(SLOTS, {"crashed-1": 1, "crashed-2": 2})
+            result = await _acquire(redis, "fresh")
+            return result, await redis.zrange(SLOTS, 0, -1)
+
+        result, holders = asyncio.run(run())
+        assert result == 0
+        assert holders == [b"fresh"]
+
+    def test_release_frees_the_slot(self):
+        async def run():
+            redis = fakeredis.FakeAsyncRedis()
+            await _acquire(redis, "a", limit=1)
+            busy = await _acquire(redis, "b", limit=1)
+            await redis.zrem(SLOTS, "a")
+            return busy, await _acquire(redis, "b", limit=1)
+
+        busy, after_release = asyncio.run(run())
+        assert busy == -1
+        assert after_release == 0
+
+    def test_min_interval_spaces_scrapes(self):
+        async def run():
+            redis = fakeredis.FakeAsyncRedis()
+            first = await _acquire(redis, "a", interval_ms=5000)
+            second = await _acquire(redis, "b", interval_ms=5000)
+            return first, second, await redis.zcard(SLOTS)
+
+        first, second, held = asyncio.run(run())
+        assert first == 0
+        assert 4000 < second <= 5000
+        assert held == 1
+
+
+class TestDomainSlot:
+    """Tests for the domain_slot() context manager, with the default limits."""
+
+    @pytest.fixture
+    def redis(self, monkeypatch):
+        redis = fakeredis.FakeAsyncRedis()
+        monkeypatch.setattr(domain_scheduler, "get_redis", lambda: redis)
+        monkeypatch.setattr(settings, "SCRAPER_DOMAIN_MIN_INTERVAL_MS", 0)
+        return redis
+
+    def test_holds_the_slot_until_the_block_exits(self, redis):
+        async def run():
+            async with domain_slot("https://www.example.com/pricing"):
+                held = await redis.zcard(SLOTS)
+            return held, await redis.zcard(SLOTS)
+
+        assert asyncio.run(run()) == (1, 0)
+
+    def test_waits_for_a_released_slot(self, redis):
+        async def run():
+            order = []
+
+            async def scrape(name, hold):
+                async with domain_slot("https://example.com"):
+                    order.append(name)
+                    await asyncio.sleep(hold)
+
+            start = time.monotonic()
+            await asyncio.gather(scrape("first", 0.3), scrape("second", 0.3), scrape("third", 0))
+            return order, time.monotonic() - start, await redis.zcard(SLOTS)
+
+        order, elapsed, held = asyncio.run(run())
+        assert order == ["first", "second", "third"]
+        # Picked up by the next poll, not after the lease TTL
+        assert elapsed < 1.5
+        assert held == 0
+
+    def test_busy_domain_raises_once_max_wait_runs_out(self, redis):
+        async def run():
+            async with domain_slot("https://example.com/a"), domain_slot("https://example.com/b"):
+                async with domain_slot("https://shop.example.com/c", max_wait=0.6):
+                    pass
+
+        start = time.monotonic()
+        with pytest.raises(DomainBusyError) as exc:
+            asyncio.run(run())
+        # Polled for the slot instead of failing on the first attempt
+        assert time.monotonic() - start >= 0.4
+        assert exc.value.retry_after == settings.SCRAPER_DOMAIN_RETRY_AFTER
+        assert exc.value.details == {"retry_after": settings.SCRAPER_DOMAIN_RETRY_AFTER}
+
+    def test_spacing_sets_retry_after(self, redis, monkeypatch):
+        monkeypatch.setattr(settings, "SCRAPER_DOMAIN_MIN_INTERVAL_MS", 5000)
+
+        async def run():
+            async with domain_slot("https://example.com/a"):
+                pass
+            async with domain_slot("https://example.com/b", max_wait=1):
+                pass
+
+        with pytest.raises(DomainBusyError) as exc:
+            asyncio.run(run())
+        assert exc.value.retry_after == 5
+
+    def test_fails_open_without_redis(self, monkeypatch):
+        class _DownRedis:
+            async def eval(self, *args):
+                raise ConnectionError("redis down")
+
+        monkeypatch.setattr(domain_scheduler, "get_redis", _DownRedis)
+
+        async def run():
+            async with domain_slot("https://example.com", max_wait=1):
+                return "scraped"
+
+        assert asyncio.run(run()) == "scraped"
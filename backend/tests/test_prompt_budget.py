@@ -0,0 +1,76 @@
+"""Tests for the prompt token budgeter."""
+
+from app.services.prompt_budget import (
+    Section,
+    allocate,
+    compact,
+    estimate_tokens,
+    expected_issues,
+    fit,
+    response_max_tokens,
+    truncate_to_tokens,
+)
+
+
+class TestEstimateTokens:
+    """Tests for estimate_tokens() and truncate_to_tokens()."""
+
+    def test_whitespace_is_free(self):
+        assert estimate_tokens("buy now") == estimate_tokens("buy \n\n\t   now")
+
+    def test_close_to_four_chars_per_token_on_prose(self):
+        text = "Start your free trial today and see why teams choose our platform. " * 20
+        assert 0.8 < estimate_tokens(text) / (len(text) / 4) < 1.3
+
+    def test_truncate_respects_the_limit(self):
+        text = "one two three four five six"
+        assert truncate_to_tokens(text, 3) == "one two three"
+        assert truncate_to_tokens(text, 100) == text
+        assert estimate_tokens(truncate_to_tokens(text * 50, 40)) <= 40
+
+    def test_compact_keeps_paragraphs(self):
+        assert compact("  a   b \n\n\n\n  c  ") == "a b \n\nc"
+
+
+class TestAllocate:
+    """Tests for allocate() and fit()."""
+
+    def test_short_section_leaves_room_for_the_other(self):
+        sections = [
+            Section("structure", "word " * 1000, priority=0, min_tokens=100, max_share=0.5),
+            Section("text", "word " * 10, priority=1, min_tokens=100, max_share=0.5),
+        ]
+        assert allocate(sections, 600) == {"structure": 590, "text": 10}
+
+    def test_shares_apply_when_both_are_large(self):
+        sections = [
+            Section("structure", "word " * 1000, priority=0, max_share=0.5),
+            Section("text", "word " * 1000, priority=1, max_share=0.5),
+        ]
+        assert allocate(sections, 600) == {"structure": 300, "text": 300}
+
+    def test_minimums_come_before_priority(self):
+        sections = [
+            Section("structure", "word " * 1000, priority=0, min_tokens=50),
+            Section("text", "word " * 1000, priority=1, min_tokens=50),
+        ]
+        assert allocate(sections, 200) == {"structure": 150, "text": 50}
+
+    def test_fit_cuts_texts_to_allocation(self):
+        prompt = fit([Section("text", "word " * 100, priority=0)], 20)
+        assert estimate_tokens(prompt.texts["text"]) == 20
+        assert prompt.needed == {"text": 100}
+
+
+class TestResponseMaxTokens:
+    """Tests for sizing max_tokens."""
+
+    def test_more_problems_more_tokens(self):
+        clean = expected_issues(8, [False] * 5, word_count=300)
+        messy = expected_issues(8, [True] * 5, word_count=3000)
+        assert messy > clean
+        assert response_max_tokens(messy, 8, 0, 100000) > response_max_tokens(clean, 8, 0, 100000)
+
+    def test_bounds(self):
+        assert response_max_tokens(0, 0, floor=2000, ceiling=8000) == 2000
+        assert response_max_tokens(500, 8, floor=2000, ceiling=8000) == 8000
@@ -0,0 +1,110 @@
+"""Tests for the deterministic rule engine."""
+
+import time
+
+from app.services.artifacts import Artifact, ArtifactStore
+from app.services.rules import check_forms, check_headline, check_speed, check_trust, evaluate
+from app.services.scraper import ScrapedPage
+
+
+def _page(**overrides):
+    fields = dict(
+        url="https://example.com",
+        final_url="https://example.com/",
+        title="Example",
+        meta_description=None,
+        html='<a href="/privacy-policy">Privacy</a><a href="mailto:hi@example.com">Mail</a>',
+        text_content="Call us",
+        screenshot=b"",
+        load_time_ms=1200,
+        word_count=2,
+        image_count=0,
+        link_count=2,
+        has_form=True,
+        dom_digest={
+            "headings": [{"level": 1, "text": "Ship landing pages that convert twice as well", "fold": True}],
+            "forms": [{
+                "fields": [
+                    {"type": "email", "label": "Work email", "required": True},
+                    {"type": "text", "label": "Company", "required": False},
+                ],
+                "submit": "Start free trial",
+                "fold": True,
+            }],
+        },
+    )
+    fields.update(overrides)
+    return ScrapedPage(**fields)
+
+
+def _failed(findings):
+    return {f.check for f in findings if not f.passed}
+
+
+def _no_full_read(self):
+    raise AssertionError("spilled artifact read back whole")
+
+
+class TestChecks:
+    """Tests for the individual checks."""
+
+    def test_trust(self):
+        assert _failed(check_trust("https://a.com", '<a href="/terms">T</a>', "Mail sales@a.com")) == set()
+        failed = _failed(check_trust("http://a.com", "<a href='/about'>About</a>", "Welcome"))
+        assert failed == {"https", "contact", "legal"}
+
+    def test_phone_counts_as_contact(self):
+        assert "contact" not in _failed(check_trust("https://a.com", "", "Call +33 1 23 45 67 89"))
+
+    def test_forms(self):
+        long_form = {
+            "fields": [{"type": "text", "label": "", "required": False}] * 9,
+            "submit": "Submit",
+        }
+        findings = check_forms([long_form])
+        assert _failed(findings) == {"field_count", "labels", "required_markers", "submit_text"}
+        assert next(f for f in findings if f.check == "field_count").severity == "critical"
+        assert check_forms([]) == []
+
+    def test_speed(self):
+        assert _failed(check_speed(1500, {"bytes_by_type": {"image": 400_000}})) == set()
+        findings = check_speed(7000, {"bytes_by_type": {"image": 4_000_000}})
+        assert [f.severity for f in findings] == ["critical", "critical"]
+
+    def test_headline(self):
+        assert _failed(check_headline([{"level": 1, "text": "Grow faster with fewer clicks today"}])) == set()
+        assert _failed(check_headline([{"level": 2, "text": "Only a subheading"}])) == {"h1"}
+        assert check_headline(None) == []
+
+
+class TestRuleReport:
+    """Tests for evaluate() and the report it builds."""
+
+    def test_good_page_previews_full_scores(self):
+        report = evaluate(_page())
+        assert report.scores == {"trust": 100, "form": 100, "speed": 100, "headline": 100}
+        assert [c["name"] for c in report.preview()] == ["headline", "form", "trust", "speed"]
+
+    def test_failures_lower_scores_and_become_issues(self):
+        report = evaluate(_page(final_url="http://example.com/", html="", text_content=""))
+        trust = next(c for c in report.preview() if c["name"] == "trust")
+        assert trust["score"] == 100 - 40 - 15 - 15
+        assert {i["severity"] for i in trust["issues"]} == {"critical", "warning"}
+        assert "[trust] FAIL (critical)" in report.to_prompt()
+
+    def test_runs_in_milliseconds_on_a_large_page(self):
+        html = "<div><p>Plenty of copy here.</p><a href='/features'>More</a></div>" * 20000
+        page = _page(html=html + '<a href="/legal">Legal</a>', text_content="word " * 50000)
+        start = time.perf_counter()
+        report = evaluate(page)
+        assert time.perf_counter() - start < 0.5
+        assert "legal" not in _failed(report.findings)
+
+    def test_spilled_page_is_scanned_without_reading_it_whole(self, monkeypatch):
+        html = "<div><p>Plenty of copy here.</p></div>" * 20000 + '<footer><a href="/legal">Legal</a></footer>'
+        monkeypatch.setattr(Artifact, "read", _no_full_read)
+        with ArtifactStore(spill_bytes=0) as store:
+            page = _page(html=store.put("html", html), text_content=store.put("text", "word " * 50000))
+            report = evaluate(page)
+        assert "legal" not in _failed(report.findings)
+
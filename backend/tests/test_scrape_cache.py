@@ -0,0 +1,84 @@
+"""Tests for the scrape cache — URL normalization, packing, freshness."""
+
+from app.services.scrape_cache import CacheEntry, _pack, _unpack, cache_key, normalize_url
+from app.services.scraper import PreflightResult, ScrapedPage, _cache_is_fresh
+
+
+def _page(**overrides):
+    fields = dict(
+        url="https://example.com",
+        final_url="https://example.com/",
+        title="Example",
+        meta_description=None,
+        html="<html></html>",
+        text_content="Hello",
+        screenshot=b"\xff\xd8jpeg",
+        load_time_ms=1200,
+        word_count=1,
+        image_count=0,
+        link_count=0,
+        has_form=False,
+    )
+    fields.update(overrides)
+    return ScrapedPage(**fields)
+
+
+def _probe(**overrides):
+    fields = dict(
+        final_url="https://example.com/",
+        status=200,
+        content_type="text/html",
+        redirects=0,
+        elapsed_ms=50,
+    )
+    fields.update(overrides)
+    return PreflightResult(**fields)
+
+
+class TestNormalizeUrl:
+    def test_case_and_default_port(self):
+        assert normalize_url("HTTPS://Example.COM:443/Pricing") == "https://example.com/Pricing"
+
+    def test_trailing_slash_and_fragment(self):
+        assert normalize_url("https://example.com/pricing/#plans") == "https://example.com/pricing"
+        assert normalize_url("https://example.com") == "https://example.com/"
+
+    def test_tracking_params_stripped_and_sorted(self):
+        url = "https://example.com/?utm_source=x&b=2&gclid=abc&a=1"
+        assert normalize_url(url) == "https://example.com/?a=1&b=2"
+
+    def test_ambiguous_params_kept(self):
+        url = "https://example.com/pricing?ref=partner-plan"
+        assert normalize_url(url) == "https://example.com/pricing?ref=partner-plan"
+
+    def test_cache_key_depends_on_variant(self):
+        assert cache_key("https://example.com/") == cache_key("https://EXAMPLE.com")
+        assert cache_key("https://example.com", "fast") != cache_key("https://example.com", "full")
+
+
+class TestPacking:
+    def test_round_trip_keeps_bytes_and_fields(self):
+        page = _page(blocked_requests={"total": 2})
+        mapping = {key.encode(): value if isinstance(value, bytes) else value.encode()
+                   for key, value in _pack(page).items()}
+        assert _unpack(ScrapedPage, mapping) == page
+
+
+class TestCacheIsFresh:
+    def _entry(self, **validators):
+        return CacheEntry(value=_page(), validators=validators, size=100)
+
+    def test_not_modified(self):
+        assert _cache_is_fresh(self._entry(etag='"v1"'), _probe(status=304, not_modified=True))
+
+    def test_matching_etag(self):
+        assert _cache_is_fresh(self._entry(etag='"v1"'), _probe(etag='"v1"'))
+
+    def test_matching_content_hash(self):
+        assert _cache_is_fresh(self._entry(content_hash="abc"), _probe(content_hash="abc"))
+
+    def test_changed_content(self):
+        assert not _cache_is_fresh(self._entry(content_hash="abc"), _probe(content_hash="def"))
+
+    def test_inconclusive_preflight(self):
+        assert not _cache_is_fresh(self._entry(etag='"v1"'), None)
@@ -0,0 +1,382 @@
+"""Tests for the scraping helpers — preflight, request blocking, screenshots, readiness, scheduling, static extraction."""
+
+import asyncio
+import io
+import random
+import socket
+from contextlib import asynccontextmanager
+
+import fakeredis
+import httpx
+import pytest
+from PIL import Image
+
+from app.config import settings
+from app.services import domain_scheduler
+from app.services.domain_scheduler import domain_slot, registrable_domain
+from app.services.page_readiness import _wait_network_quiet
+from app.services.request_blocker import RequestBlocker
+from app.services import scraper
+from app.services.scraper import (
+    PageNotFoundError,
+    ScrapingError,
+    _is_bot_challenge,
+    _is_dns_failure,
+    summarize_html,
+)
+from app.services.screenshot import _reencode
+from app.services.static_scraper import is_representative, parse_static
+from benchmarks.bench_summarize_html import summarize_html_regex
+
+
+class TestRequestBlocker:
+    """Tests for RequestBlocker.classify()."""
+
+    def test_known_tracker_subdomain_blocked(self):
+        blocker = RequestBlocker(resource_types=[], extra_domains=[])
+        assert blocker.classify("https://www.google-analytics.com/g/collect", "ping") == "analytics"
+        assert blocker.classify("https://js.intercomcdn.com/app.js", "script") == "chat"
+
+    def test_first_party_script_allowed(self):
+        blocker = RequestBlocker(resource_types=["font"], extra_domains=[])
+        assert blocker.classify("https://example.com/app.js", "script") is None
+
+    def test_resource_type_blocked(self):
+        blocker = RequestBlocker(resource_types=["font", "media"], extra_domains=[])
+        assert blocker.classify("https://example.com/hero.mp4", "media") == "media"
+        assert blocker.classify("https://fonts.gstatic.com/x.woff2", "font") == "font"
+
+    def test_extra_domains(self):
+        blocker = RequestBlocker(resource_types=[], extra_domains=["widgets.example.net"])
+        assert blocker.classify("https://cdn.widgets.example.net/w.js", "script") == "custom"
+        assert blocker.classify("https://example.net/w.js", "script") is None
+
+    def test_summary_counts(self):
+        blocker = RequestBlocker(resource_types=[], extra_domains=[])
+        assert blocker.summary() == {"total": 0, "by_category": {}, "top_domains": []}
+
+
+class TestReencodeScreenshot:
+    """Tests for the screenshot re-encoding step."""
+
+    def _png(self, width, height):
+        out = io.BytesIO()
+        Image.new("RGBA", (width, height), (200, 30, 30, 255)).save(out, format="PNG")
+        return out.getvalue()
+
+    def test_downscales_to_width(self):
+        data = _reencode(self._png(1280, 2000), "jpeg", 75, 640)
+        image = Image.open(io.BytesIO(data))
+        assert image.format == "JPEG"
+        assert image.size == (640, 1000)
+
+    def test_webp_keeps_narrow_images(self):
+        data = _reencode(self._png(320, 200), "webp", 75, 640)
+        image = Image.open(io.BytesIO(data))
+        assert image.format == "WEBP"
+        assert image.size == (320, 200)
+
+
+class _FakeTracker:
+    def __init__(self, inflight):
+        self.inflight = inflight
+
+
+class TestWaitNetworkQuiet:
+    """Tests for the adaptive readiness quiet-network phase."""
+
+    def test_quiet_network_resolves(self):
+        assert asyncio.run(_wait_network_quiet(_FakeTracker(0), quiet_ms=50, budget_ms=1000))
+
+    def test_busy_network_stops_at_budget(self):
+        assert not asyncio.run(_wait_network_quiet(_FakeTracker(10), quiet_ms=50, budget_ms=200))
+
+
+class TestIsBotChallenge:
+    """Tests for _is_bot_challenge()."""
+
+    def test_cloudflare_challenge(self):
+        response = httpx.Response(403, headers={"server": "cloudflare"})
+        assert _is_bot_challenge(response)
+
+    def test_cf_mitigated_header(self):
+        response = httpx.Response(200, headers={"cf-mitigated": "challenge"})
+        assert _is_bot_challenge(response)
+
+    def test_plain_forbidden(self):
+        response = httpx.Response(403, headers={"server": "nginx"})
+        assert not _is_bot_challenge(response)
+
+    def test_cdn_not_found_is_not_a_challenge(self):
+        response = httpx.Response(404, headers={"server": "cloudflare"})
+        assert not _is_bot_challenge(response)
+
+
+class TestIsDnsFailure:
+    """Tests for _is_dns_failure()."""
+
+    def test_gaierror_in_chain(self):
+        try:
+            try:
+                raise socket.gaierror(-2, "Name or service not known")
+            except socket.gaierror as e:
+                raise httpx.ConnectError("connect failed") from e
+        except httpx.ConnectError as error:
+            assert _is_dns_failure(error)
+
+    def test_connection_refused(self):
+        error = httpx.ConnectError("connect failed")
+        error.__cause__ = ConnectionRefusedError()
+        assert not _is_dns_failure(error)
+
+
+class TestPreflight:
+    """Tests for preflight()."""
+
+    @pytest.fixture
+    def respond(self, monkeypatch):
+        """Serve preflight requests with the given response."""
+        real_client = httpx.AsyncClient
+
+        def respond(status, **headers):
+            def handler(request):
+                return httpx.Response(status, headers={"content-type": "text/html", **headers}, text="<p>x</p>")
+
+            def client(**kwargs):
+                return real_client(transport=httpx.MockTransport(handler), **kwargs)
+
+            monkeypatch.setattr(httpx, "AsyncClient", client)
+
+        return respond
+
+    @pytest.mark.parametrize("status", [401, 403, 404, 410, 429])
+    def test_client_errors_are_left_to_the_browser(self, respond, status):
+        respond(status, server="nginx")
+        assert asyncio.run(scraper.preflight("https://example.com/")) is None
+
+    def test_server_error_fails_fast(self, respond):
+        respond(500, server="nginx")
+        with pytest.raises(ScrapingError, match="error status 500"):
+            asyncio.run(scraper.preflight("https://example.com/"))
+
+    def test_ok_page_is_probed(self, respond):
+        respond(200)
+        assert asyncio.run(scraper.preflight("https://example.com/")).status == 200
+
+    @pytest.mark.parametrize("url", [
+        "https://exa\x01mple.com/",
+        "https://xn--.com/",
+        "https://" + "a" * 70 + "\u00fc.com/",
+    ])
+    def test_malformed_url_is_a_scraping_error(self, url):
+        with pytest.raises(ScrapingError) as exc:
+            asyncio.run(scraper.preflight(url))
+        assert exc.value.code == "INVALID_URL"
+
+
+class TestRegistrableDomain:
+    """Tests for registrable_domain()."""
+
+    def test_subdomains_grouped(self):
+        assert registrable_domain("www.example.com") == "example.com"
+        assert registrable_domain("shop.eu.example.com") == "example.com"
+
+    def test_multi_label_suffix(self):
+        assert registrable_domain("www.shop.example.co.uk") == "example.co.uk"
+        assert registrable_domain("example.co.uk") == "example.co.uk"
+
+    def test_ip_address_unchanged(self):
+        assert registrable_domain("127.0.0.1") == "127.0.0.1"
+
+    def test_case_and_trailing_dot(self):
+        assert registrable_domain("WWW.Example.COM.") == "example.com"
+
+
+class TestStaticScraper:
+    """Tests for parse_static() and is_representative()."""
+
+    ARTICLE = " ".join(["Grow your revenue with our platform."] * 40)
+
+    def test_server_rendered_page(self):
+        page = parse_static(f"""<!doctype html><html><head>
+            <title> Acme  Analytics </title>
+            <meta name="description" content="Analytics for teams">
+            <script>var hidden = "not text";</script>
+            <style>.x {{ color: red }}</style>
+        </head><body>
+            <h1>Know your customers</h1><p>{self.ARTICLE}</p>
+            <img src="a.png"><a href="/pricing">Pricing</a>
+            <form><input name="email"><button>Start</button></form>
+        </body></html>""")
+        assert page.title == "Acme Analytics"
+        assert page.meta_description == "Analytics for teams"
+        assert page.text.startswith("Know your customers\nGrow your revenue")
+        assert "not text" not in page.text
+        assert (page.image_count, page.link_count, page.has_form) == (1, 1, True)
+        assert is_representative(page) == (True, "ok")
+
+    def test_unclosed_head_ends_at_the_body(self):
+        for html in (
+            f"<html><head><title>T</title><body><p>{self.ARTICLE}</p>",
+            f"<html><head><title>T</title><meta name='description' content='d'><h1>Hi</h1><p>{self.ARTICLE}</p>",
+        ):
+            page = parse_static(html)
+            assert page.title == "T"
+            assert page.word_count > 200
+            assert is_representative(page) == (True, "ok")
+
+    def test_empty_app_root_is_a_shell(self):
+        page = parse_static(f"""<html><body>
+            <div id="root"><div class="spinner"></div></div>
+            <footer>{self.ARTICLE}</footer>
+            <script src="/static/js/main.js"></script>
+        </body></html>""")
+        assert page.empty_app_root
+        assert is_representative(page) == (False, "app_shell")
+
+    def test_rendered_app_root_is_kept(self):
+        page = parse_static(f'<div id="__next"><main><p>{self.ARTICLE}</p></main></div>')
+        assert not page.empty_app_root
+        assert is_representative(page)[0]
+
+    def test_noscript_warning(self):
+        page = parse_static(
+            f"<body><noscript>You need to enable JavaScript to run this app.</noscript>"
+            f"<p>{self.ARTICLE}</p></body>"
+        )
+        assert is_representative(page) == (False, "requires_javascript")
+
+    def test_too_little_text(self):
+        page = parse_static("<body><h1>Coming soon</h1></body>")
+        assert is_representative(page) == (False, "too_little_text")
+
+    def test_dom_digest(self):
+        digest = parse_static("""
+            <h1>Get paid faster</h1><h2>Why us</h2>
+            <a class="btn primary" href="/signup">Start free trial</a><a href="/about">About</a>
+            <form>
+                <label for="email">Work email</label><input id="email" type="email" required>
+                <label>Company <input name="company"></label>
+                <input type="hidden" name="token"><button>Request demo</button>
+            </form>
+            <blockquote>We cut invoicing time in half, the best tool we use.</blockquote>
+            <img alt="Acme logo" src="acme.png">
+        """).dom_digest
+        assert [h["text"] for h in digest["headings"]] == ["Get paid faster", "Why us"]
+        assert [c["text"] for c in digest["ctas"]] == ["Start free trial", "Request demo"]
+        assert digest["forms"] == [{
+            "fields": [
+                {"type": "email", "label": "Work email", "required": True},
+                {"type": "text", "label": "Company", "required": False},
+            ],
+            "submit": "Request demo",
+            "fold": None,
+        }]
+        assert len(digest["testimonials"]) == 1
+        assert digest["logoNames"] == ["Acme logo"]
+
+
+class TestSummarizeHtml:
+    """Tests for summarize_html()."""
+
+    def test_drops_scripts_styles_comments_and_whitespace(self):
+        html = (
+            "<html>\n  <head><STYLE>.a { color: red }</STYLE>"
+            '<script type="module">if (a < b) {}</script></head>'
+            "<body>  <!-- nav -->\n\n<h1>Hello</h1>  <p>World</p>\n</body></html>"
+        )
+        assert summarize_html(html) == "<html> <head></head><body> <h1>Hello</h1> <p>World</p> </body></html>"
+
+    def test_truncates(self):
+        assert summarize_html("<p>" + "word " * 1000 + "</p>", max_length=20) == "<p>word word word wo... [truncated]"
+
+    def test_unterminated_script_is_kept(self):
+        assert summarize_html("<p>a</p><script>var x") == "<p>a</p><script>var x"
+
+    def test_matches_regex_implementation(self):
+        # Well-formed regions only: the regex passes disagree with a real
+        # tokenizer on overlapping ones (a comment that opens inside a script)
+        rng = random.Random(7)
+        parts = ["<script>if (a < b) {}</script>", "<SCRIPT src=a></SCRIPT>", "<style>p {}</style>",
+                 "<!-- <b> -->", "<p>", "</p>", "text", "  ", "\n\t", "<scripts>", "<", ">", "<br/>"]
+        for _ in range(500):
+            html = "".join(rng.choices(parts, k=rng.randint(0, 40)))
+            for max_length in (5, 40, 5000):
+                assert summarize_html(html, max_length) == summarize_html_regex(html, max_length), html
+
+
+class _FakePool:
+    def __init__(self):
+        self.leases = 0
+
+    @asynccontextmanager
+    async def lease(self):
+        self.leases += 1
+        yield "browser"
+
+
+class TestScrapeMany:
+    """Tests for scrape_many()."""
+
+    def test_shares_one_lease_and_isolates_failures(self, monkeypatch):
+        pool = _FakePool()
+        running = []
+        peak = []
+
+        async def fake_scrape_page(url, mode=None, use_cache=True, browser=None):
+            assert browser == "browser"
+            running.append(url)
+            peak.append(len(running))
+            await asyncio.sleep(0.01 if "slow" in url else 0)
+            running.remove(url)
+            if "missing" in url:
+                raise PageNotFoundError()
+            if "broken" in url:
+                raise RuntimeError("boom")
+            return url
+
+        monkeypatch.setattr(scraper, "get_browser_pool", lambda: pool)
+        monkeypatch.setattr(scraper, "scrape_page", fake_scrape_page)
+
+        async def collect():
+            urls = ["https://a/slow", "https://b/", "https://c/missing", "https://d/broken"]
+            return [result async for result in scraper.scrape_many(urls, concurrency=2)]
+
+        results = asyncio.run(collect())
+        by_url = {result.url: result for result in results}
+        assert pool.leases == 1
+        assert max(peak) == 2
+        assert results[-1].url == "https://a/slow"
+        assert by_url["https://b/"].ok and by_url["https://b/"].page == "https://b/"
+        assert by_url["https://c/missing"].error.code == "PAGE_NOT_FOUND"
+        assert by_url["https://d/broken"].error.code == "SCRAPING_ERROR"
+
+    def test_same_domain_urls_queue_within_the_batch(self, monkeypatch):
+        redis = fakeredis.FakeAsyncRedis()
+        monkeypatch.setattr(domain_scheduler, "get_redis", lambda: redis)
+        monkeypatch.setattr(settings, "SCRAPER_DOMAIN_MIN_INTERVAL_MS", 0)
+        pool = _FakePool()
+        running = []
+        peak = []
+
+        async def fake_scrape_page(url, mode=None, use_cache=True, browser=None):
+            async with domain_slot(url):
+                running.append(url)
+                peak.append(sum("shop.com" in u for u in running))
+                await asyncio.sleep(0 if "other" in url else 0.1)
+                running.remove(url)
+            return url
+
+        monkeypatch.setattr(scraper, "get_browser_pool", lambda: pool)
+        monkeypatch.setattr(scraper, "scrape_page", fake_scrape_page)
+
+        async def collect():
+            urls = [f"https://www.shop.com/p{i}" for i in range(5)] + ["https://other.com/"]
+            return [result async for result in scraper.scrape_many(urls, concurrency=3)]
+
+        results = asyncio.run(collect())
+        assert all(result.ok for result in results)
+        assert max(peak) == settings.SCRAPER_DOMAIN_MAX_CONCURRENCY
+        # Queued shop.com pages left a render slot free for the other domain
+        assert results[0].url == "https://other.com/"
+
@@ -51,6 +51,9 @@ CREATE TABLE IF NOT EXISTS public.analyses (
         CHECK (status IN ('pending', 'processing', 'completed', 'failed')),
     error_code TEXT,
     error_message TEXT,
+
+    -- Partial results while the analysis runs (kept if it fails late)
+    progress JSONB,
     
     -- Timing
     created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
@@ -58,6 +61,8 @@ CREATE TABLE IF NOT EXISTS public.analyses (
     completed_at TIMESTAMPTZ
 );
 
+ALTER TABLE analyses ADD COLUMN IF NOT EXISTS progress JSONB;
+
 -- Index
 CREATE INDEX IF NOT EXISTS idx_analyses_user_id ON analyses(user_id);
 CREATE INDEX IF NOT EXISTS idx_analyses_status ON analyses(status);
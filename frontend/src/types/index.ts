@@ -98,6 +98,14 @@ export interface Analysis {
   created_at: string;
   started_at: string | null;
   completed_at: string | null;
+  progress?: AnalysisProgress | null;
+}
+
+export interface AnalysisProgress {
+  categories_done: number;
+  categories_total: number;
+  categories: ReportCategory[];
+  preview?: ReportCategory[]; // Provisional scores from automated checks
 }
 
 // ============================================================================